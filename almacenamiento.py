@@ -0,0 +1,836 @@
+"""Capa de almacenamiento: historial CSV/JSON o backend SQLite opcional"""
+import argparse
+import bisect
+import copy
+import csv
+import hashlib
+import io
+import itertools
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from escritor import anexar, bloqueo, reescribir_atomico
+from rendimiento import medir_io
+
+# ==================== CONFIGURACIÓN ====================
+
+# Carpeta de datos: junto al código salvo que QPP_DATA_DIR indique otra
+# (p. ej. los datos sintéticos de benchmarks/)
+BASE_DIR = Path(os.environ.get('QPP_DATA_DIR') or Path(__file__).parent)
+ARCHIVO_RESULTADOS = BASE_DIR / 'resultados_evaluacion.csv'
+ARCHIVO_MAQUINAS = BASE_DIR / 'maquinas.json'  # Cambiado a JSON para más flexibilidad
+ARCHIVO_TAREAS = BASE_DIR / 'tareas.json'
+ARCHIVO_PAYOUT = BASE_DIR / 'historial_payout.csv'
+ARCHIVO_METAS = BASE_DIR / 'metas_payout.csv'
+ARCHIVO_DB = BASE_DIR / 'evaluaciones.db'
+ARCHIVO_BAJAS = BASE_DIR / 'maquinas_eliminadas.json'
+UPLOAD_FOLDER = BASE_DIR / 'static' / 'uploads'
+
+# Backend de datos: 'csv' (archivos planos, por defecto) o 'sqlite'
+BACKEND = os.environ.get('QPP_BACKEND', 'csv').strip().lower()
+
+COLUMNAS_RESULTADOS = [
+    'Maquina', 'Usuario', 'Criterio_ID', 'Criterio',
+    'Peso', 'Calificacion', 'Comentarios', 'Fecha'
+]
+COLUMNAS_PAYOUT = ['Maquina', 'Fecha', 'Semana', 'Venta', 'Payout', 'Cambios']
+# Rango ideal de payout de cada máquina; la última fila de una máquina es la vigente
+COLUMNAS_METAS = ['Maquina', 'Meta_Min', 'Meta_Max', 'Usuario', 'Fecha']
+# Semana con la que versiones anteriores guardaban el rango en el historial de payout
+SEMANA_META_RANGO = 'META_RANGO'
+
+# Tipos fijos: un bloque nuevo del log debe parsearse igual que el archivo completo
+# (p. ej. Criterio_ID es texto aunque el bloque no traiga filas 'MISION')
+TIPOS_RESULTADOS = {
+    'Maquina': str, 'Usuario': str, 'Criterio_ID': str, 'Criterio': str,
+    'Peso': 'float64', 'Comentarios': str, 'Fecha': str
+}
+TIPOS_PAYOUT = {
+    'Maquina': str, 'Fecha': str, 'Semana': str,
+    'Venta': 'float64', 'Payout': 'float64', 'Cambios': str
+}
+TIPOS_METAS = {
+    'Maquina': str, 'Meta_Min': 'float64', 'Meta_Max': 'float64', 'Usuario': str, 'Fecha': str
+}
+
+
+# pandas se importa dentro de las funciones que lo usan: las páginas que solo
+# leen máquinas y tareas (login, menú) no pagan su importación
+
+def usa_sqlite():
+    """Indica si el backend activo es SQLite"""
+    return BACKEND == 'sqlite'
+
+
+# ==================== CACHÉ DE LECTURA ====================
+# Streamlit re-ejecuta el script en cada clic, pero los módulos importados
+# viven lo que dura el proceso: esta caché la comparten todas las sesiones.
+# Cada archivo se parsea una vez por versión (mtime, tamaño) y las funciones
+# de escritura de este módulo la invalidan explícitamente.
+
+_CACHE = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def _firma_archivo(ruta):
+    """Versión de un archivo en disco: (mtime en ns, tamaño); None si no existe"""
+    try:
+        info = ruta.stat()
+    except FileNotFoundError:
+        return None
+    return (info.st_mtime_ns, info.st_size)
+
+
+def _cargar_cacheado(ruta, parser):
+    """Devuelve el contenido parseado de ``ruta``, reparseando solo si cambió.
+
+    El valor devuelto es compartido entre sesiones y no debe modificarse.
+    """
+    firma = _firma_archivo(ruta)
+    with _CACHE_LOCK:
+        entrada = _CACHE.get(ruta)
+    if entrada is not None and entrada[0] == firma:
+        return entrada[1]
+
+    with medir_io('leer', ruta) as io_:
+        valor = parser(ruta)
+        io_['bytes'] = firma[1] if firma else None
+        io_['filas'] = len(valor) if hasattr(valor, '__len__') else None
+    with _CACHE_LOCK:
+        _CACHE[ruta] = (firma, valor)
+    return valor
+
+
+def invalidar_cache(ruta=None):
+    """Descarta la versión cacheada de un archivo (o de todos)"""
+    with _CACHE_LOCK:
+        if ruta is None:
+            _CACHE.clear()
+            _LECTORES.clear()
+        else:
+            _CACHE.pop(ruta, None)
+            _LECTORES.pop(ruta, None)
+
+
+def _leer_json(ruta):
+    """Parser de los archivos JSON de máquinas/tareas"""
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+# ==================== LECTURA INCREMENTAL ====================
+# resultados_evaluacion.csv e historial_payout.csv solo crecen por el final.
+# Cada lector recuerda hasta qué byte consumió y, cuando el archivo crece,
+# parsea únicamente las filas nuevas y las concatena al DataFrame residente.
+# Si el archivo se truncó o se reescribió (otro inodo, o los bytes previos al
+# offset ya no coinciden) se recarga completo.
+
+_LECTORES = {}
+_BYTES_TESTIGO = 64
+# Cada recarga completa abre una generación nueva: los cursores anteriores dejan de valer
+_GENERACIONES = itertools.count(1)
+
+
+def _leer_log(ruta, columnas, tipos):
+    """DataFrame residente de un CSV de solo-anexado, leyendo solo lo nuevo.
+
+    El DataFrame devuelto es compartido entre sesiones y no debe modificarse.
+    """
+    import pandas as pd
+
+    info = ruta.stat()
+    firma = (info.st_mtime_ns, info.st_size)
+
+    with _CACHE_LOCK:
+        lector = _LECTORES.get(ruta)
+        if lector is None:
+            lector = {'lock': threading.Lock(), 'df': None, 'firma': None}
+            _LECTORES[ruta] = lector
+
+    with lector['lock']:
+        if lector['df'] is not None and lector['firma'] == firma:
+            return lector['df']
+
+        with open(ruta, 'rb') as f, medir_io('leer', ruta) as io_:
+            if lector['df'] is not None and _solo_crecio(f, lector, info):
+                io_['operacion'] = 'leer (incremental)'
+                f.seek(lector['offset'])
+                nuevos = f.read()
+                io_['bytes'], io_['filas'] = len(nuevos), 0
+                completos = nuevos[:nuevos.rfind(b'\n') + 1]
+                if completos:
+                    try:
+                        bloque = pd.read_csv(
+                            io.BytesIO(completos), header=None, names=columnas,
+                            dtype=tipos, encoding='utf-8-sig'
+                        )
+                    except pd.errors.ParserError:
+                        # Fila a medio escribir: se reintenta en la próxima lectura
+                        return lector['df']
+                    if lector['df'].empty:
+                        lector['df'] = bloque
+                    else:
+                        lector['df'] = pd.concat([lector['df'], bloque], ignore_index=True)
+                    lector['offset'] += len(completos)
+                    io_['filas'] = len(bloque)
+            else:
+                # _solo_crecio pudo dejar el puntero a mitad de archivo
+                f.seek(0)
+                contenido = f.read()
+                completos = contenido[:contenido.rfind(b'\n') + 1]
+                lector['df'] = _parsear_csv_completo(completos, columnas, tipos)
+                lector['offset'] = len(completos)
+                lector['ino'] = info.st_ino
+                lector['generacion'] = next(_GENERACIONES)
+                io_['bytes'], io_['filas'] = len(contenido), len(lector['df'])
+            f.seek(max(0, lector['offset'] - _BYTES_TESTIGO))
+            lector['testigo'] = f.read(min(lector['offset'], _BYTES_TESTIGO))
+
+        lector['firma'] = firma
+        return lector['df']
+
+
+def _solo_crecio(f, lector, info):
+    """True si el archivo conserva intactos los bytes ya consumidos"""
+    if info.st_ino != lector['ino'] or info.st_size < lector['offset']:
+        return False
+    f.seek(max(0, lector['offset'] - _BYTES_TESTIGO))
+    return f.read(len(lector['testigo'])) == lector['testigo']
+
+
+def _parsear_csv_completo(contenido, columnas, tipos):
+    """Parsea un CSV completo (con encabezado) del historial"""
+    import pandas as pd
+
+    if not contenido:
+        return pd.DataFrame(columns=columnas)
+    return pd.read_csv(io.BytesIO(contenido), dtype=tipos, encoding='utf-8-sig')
+
+
+def _escribir_json(ruta, lista):
+    """Reescribe un archivo JSON de forma atómica e invalida su caché"""
+    with medir_io('reescribir', ruta) as io_:
+        reescribir_atomico(
+            ruta, lambda f: json.dump(lista, f, indent=4, ensure_ascii=False),
+            encoding='utf-8'
+        )
+        io_['bytes'], io_['filas'] = _firma_archivo(ruta)[1], len(lista)
+    invalidar_cache(ruta)
+
+
+# ==================== INICIALIZACIÓN ====================
+
+def iniciar_archivos():
+    """Inicializa archivos si no existen"""
+    UPLOAD_FOLDER.mkdir(parents=True, exist_ok=True)
+
+    if usa_sqlite():
+        import backend_sqlite
+        backend_sqlite.iniciar_db()
+        return
+
+    for ruta, columnas in (
+        (ARCHIVO_RESULTADOS, COLUMNAS_RESULTADOS),
+        (ARCHIVO_PAYOUT, COLUMNAS_PAYOUT),
+        (ARCHIVO_METAS, COLUMNAS_METAS),
+    ):
+        if not ruta.exists():
+            with open(ruta, 'w', encoding='utf-8-sig', newline='') as f:
+                csv.writer(f, lineterminator='\n').writerow(columnas)
+
+    if not ARCHIVO_MAQUINAS.exists():
+        _escribir_json(ARCHIVO_MAQUINAS, maquinas_por_defecto())
+
+    if not ARCHIVO_TAREAS.exists():
+        _escribir_json(ARCHIVO_TAREAS, [])
+
+
+def faltantes_almacenamiento():
+    """Archivos (o tablas SQLite) de datos que aún no existen; vacío si está listo"""
+    if usa_sqlite():
+        import backend_sqlite
+        return backend_sqlite.tablas_faltantes()
+    return [
+        ruta.name
+        for ruta in (ARCHIVO_RESULTADOS, ARCHIVO_PAYOUT, ARCHIVO_METAS, ARCHIVO_MAQUINAS, ARCHIVO_TAREAS)
+        if not ruta.exists()
+    ]
+
+
+def maquinas_por_defecto():
+    """Máquina de ejemplo para una instalación nueva"""
+    return [
+        {
+            "nombre": "Clip Machine 4P - #001",
+            "asignada_a": ["Leonel", "Gina"],  # Nueva propiedad
+            "foto": None,
+            "activa": True
+        }
+    ]
+
+
+# ==================== MÁQUINAS Y TAREAS ====================
+
+def get_maquinas(usuario=None):
+    """Obtiene lista de máquinas, filtradas por usuario si se especifica"""
+    if usa_sqlite():
+        import backend_sqlite
+        maquinas = backend_sqlite.cargar_maquinas()
+    else:
+        # Copia: quien llama suele modificar los dicts antes de save_maquinas
+        maquinas = copy.deepcopy(_cargar_cacheado(ARCHIVO_MAQUINAS, _leer_json))
+
+    if usuario and usuario != "ADMIN":
+        # Filtrar solo máquinas asignadas al usuario
+        maquinas = [m for m in maquinas if usuario in m.get('asignada_a', [])]
+
+    return [m for m in maquinas if m.get('activa', True)]
+
+
+def save_maquinas(lista):
+    """Guarda lista de máquinas"""
+    if usa_sqlite():
+        import backend_sqlite
+        backend_sqlite.guardar_maquinas(lista)
+        return
+
+    _escribir_json(ARCHIVO_MAQUINAS, lista)
+
+
+def cargar_tareas():
+    """Carga tareas desde archivo"""
+    if usa_sqlite():
+        import backend_sqlite
+        return backend_sqlite.cargar_tareas()
+
+    if not ARCHIVO_TAREAS.exists():
+        return []
+    return copy.deepcopy(_cargar_cacheado(ARCHIVO_TAREAS, _leer_json))
+
+
+def guardar_tareas(lista):
+    """Guarda tareas en archivo"""
+    if usa_sqlite():
+        import backend_sqlite
+        backend_sqlite.guardar_tareas(lista)
+        return
+
+    _escribir_json(ARCHIVO_TAREAS, lista)
+
+
+def actualizar_tareas(funcion):
+    """Lee, modifica y guarda las tareas como una sola operación bloqueada.
+
+    ``funcion(lista)`` modifica la lista en sitio. A diferencia de
+    cargar_tareas + guardar_tareas, dos sesiones que completan tareas a la
+    vez no se pisan los cambios.
+    """
+    if usa_sqlite():
+        import backend_sqlite
+        backend_sqlite.actualizar_tareas(funcion)
+        return
+
+    with bloqueo(ARCHIVO_TAREAS):
+        tareas = _leer_json(ARCHIVO_TAREAS) if ARCHIVO_TAREAS.exists() else []
+        funcion(tareas)
+        _escribir_json(ARCHIVO_TAREAS, tareas)
+
+
+def agregar_tarea(tarea):
+    """Agrega una tarea nueva"""
+    actualizar_tareas(lambda tareas: tareas.append(tarea))
+
+
+def completar_tarea(tarea_id):
+    """Marca una tarea como completada"""
+    def marcar(tareas):
+        for t in tareas:
+            if t['id'] == tarea_id:
+                t['completada'] = True
+    actualizar_tareas(marcar)
+
+
+# ==================== RESULTADOS Y PAYOUT ====================
+
+def leer_resultados(maquina=None):
+    """Lee las evaluaciones, opcionalmente solo las de una máquina"""
+    if usa_sqlite():
+        import backend_sqlite
+        return backend_sqlite.leer_tabla('resultados', maquina)
+    return _leer_csv(
+        ARCHIVO_RESULTADOS, COLUMNAS_RESULTADOS, TIPOS_RESULTADOS, 'filas_resultados', maquina
+    )
+
+
+def hay_resultados():
+    """Indica si el historial tiene alguna evaluación, sin leerlo completo en SQLite"""
+    if usa_sqlite():
+        import backend_sqlite
+        return backend_sqlite.hay_filas('resultados')
+    # En CSV el DataFrame residente ya está en memoria (caché compartida)
+    return not leer_resultados().empty
+
+
+def leer_payout(maquina=None):
+    """Lee el historial de payout, opcionalmente solo el de una máquina"""
+    if usa_sqlite():
+        import backend_sqlite
+        return backend_sqlite.leer_tabla('payout', maquina)
+    return _leer_csv(ARCHIVO_PAYOUT, COLUMNAS_PAYOUT, TIPOS_PAYOUT, 'filas_payout', maquina)
+
+
+def leer_metas_payout(maquina=None):
+    """Lee el historial de rangos meta de payout; la última fila de cada máquina es la vigente"""
+    if usa_sqlite():
+        import backend_sqlite
+        return backend_sqlite.leer_tabla('metas_payout', maquina)
+    return _leer_csv(ARCHIVO_METAS, COLUMNAS_METAS, TIPOS_METAS, 'filas_metas', maquina)
+
+
+def resultados_desde(cursor=None):
+    """Evaluaciones agregadas al historial desde ``cursor``.
+
+    Devuelve ``(df, cursor_nuevo, completo)``. Con un cursor vigente ``df``
+    trae solo las filas nuevas; si el cursor ya no vale (recarga del archivo,
+    nueva baja, primera llamada) trae el historial completo y ``completo`` es
+    True, señal para que quien mantiene un agregado lo reconstruya.
+    """
+    if usa_sqlite():
+        import backend_sqlite
+        return backend_sqlite.filas_desde('resultados', cursor)
+    return _filas_desde(ARCHIVO_RESULTADOS, COLUMNAS_RESULTADOS, TIPOS_RESULTADOS, 'filas_resultados', cursor)
+
+
+def payout_desde(cursor=None):
+    """Filas de payout agregadas desde ``cursor``; mismo contrato que resultados_desde"""
+    if usa_sqlite():
+        import backend_sqlite
+        return backend_sqlite.filas_desde('payout', cursor)
+    return _filas_desde(ARCHIVO_PAYOUT, COLUMNAS_PAYOUT, TIPOS_PAYOUT, 'filas_payout', cursor)
+
+
+def metas_payout_desde(cursor=None):
+    """Metas de payout agregadas desde ``cursor``; mismo contrato que resultados_desde"""
+    if usa_sqlite():
+        import backend_sqlite
+        return backend_sqlite.filas_desde('metas_payout', cursor)
+    return _filas_desde(ARCHIVO_METAS, COLUMNAS_METAS, TIPOS_METAS, 'filas_metas', cursor)
+
+
+def _filas_desde(ruta, columnas, tipos, clave_baja, cursor):
+    """Filas vivas de un historial CSV desde ``cursor`` (ver resultados_desde)"""
+    import pandas as pd
+
+    if not ruta.exists():
+        return pd.DataFrame(columns=columnas), None, True
+
+    crudo = _leer_log(ruta, columnas, tipos)
+    vista = _aplicar_bajas(ruta, crudo, clave_baja)
+    lector = _LECTORES[ruta]
+    nuevo = (
+        lector['generacion'],
+        tuple(sorted(_limites_baja(clave_baja).items())),
+        len(crudo),
+    )
+    if cursor is not None and cursor[:2] == nuevo[:2] and cursor[2] <= nuevo[2]:
+        # El índice de la vista es la posición en el archivo, siempre creciente
+        return vista.iloc[vista.index.searchsorted(cursor[2]):], nuevo, False
+    return vista, nuevo, True
+
+
+def huella_datos(*dfs):
+    """Huella del contenido de uno o más DataFrames, para claves de caché"""
+    import pandas as pd
+
+    h = hashlib.blake2b(digest_size=16)
+    for df in dfs:
+        h.update(str(df.shape).encode())
+        if not df.empty:
+            h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+
+def agregar_resultados(filas):
+    """Agrega filas de evaluación (lista de dicts) al historial"""
+    if not filas:
+        return
+    if usa_sqlite():
+        import backend_sqlite
+        backend_sqlite.insertar_filas('resultados', filas)
+        return
+    _anexar_csv(ARCHIVO_RESULTADOS, COLUMNAS_RESULTADOS, filas)
+
+
+def agregar_payout(filas):
+    """Agrega filas de corte (lista de dicts) al historial de payout"""
+    if not filas:
+        return
+    if usa_sqlite():
+        import backend_sqlite
+        backend_sqlite.insertar_filas('payout', filas)
+        return
+    _anexar_csv(ARCHIVO_PAYOUT, COLUMNAS_PAYOUT, filas)
+
+
+def agregar_metas_payout(filas):
+    """Agrega rangos meta de payout (lista de dicts con Meta_Min/Meta_Max) al almacén de metas"""
+    if not filas:
+        return
+    if usa_sqlite():
+        import backend_sqlite
+        backend_sqlite.insertar_filas('metas_payout', filas)
+        return
+    _anexar_csv(ARCHIVO_METAS, COLUMNAS_METAS, filas)
+
+
+def eliminar_datos_maquina(nombre):
+    """Borra evaluaciones, payout y metas de una máquina.
+
+    Con CSV no reescribe nada: registra una baja (tombstone) con el número de
+    filas que tenía cada historial, y los lectores ocultan desde ya las filas
+    anteriores de esa máquina. ``compactar`` las elimina físicamente después.
+    """
+    if usa_sqlite():
+        import backend_sqlite
+        backend_sqlite.eliminar_maquina(nombre)
+        return
+
+    # Los límites se cuentan bajo el bloqueo: una compactación no puede moverlos en medio
+    with bloqueo(ARCHIVO_BAJAS):
+        baja = {
+            'maquina': nombre,
+            'fecha': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'filas_resultados': _filas_en_log(ARCHIVO_RESULTADOS, COLUMNAS_RESULTADOS, TIPOS_RESULTADOS),
+            'filas_payout': _filas_en_log(ARCHIVO_PAYOUT, COLUMNAS_PAYOUT, TIPOS_PAYOUT),
+            'filas_metas': _filas_en_log(ARCHIVO_METAS, COLUMNAS_METAS, TIPOS_METAS),
+        }
+        bajas = _leer_json(ARCHIVO_BAJAS) if ARCHIVO_BAJAS.exists() else []
+        bajas.append(baja)
+        _escribir_json(ARCHIVO_BAJAS, bajas)
+
+
+def _leer_csv(ruta, columnas, tipos, clave_baja, maquina=None):
+    """Lee un CSV del historial (incremental, sin máquinas dadas de baja).
+
+    DataFrame vacío si no existe. Sin ``maquina`` devuelve el DataFrame
+    residente compartido: no modificarlo.
+    """
+    import pandas as pd
+
+    if not ruta.exists():
+        return pd.DataFrame(columns=columnas)
+    df = _aplicar_bajas(ruta, _leer_log(ruta, columnas, tipos), clave_baja)
+    if maquina is not None:
+        df = df[df['Maquina'] == maquina]
+    return df
+
+
+def _anexar_csv(ruta, columnas, filas):
+    """Anexa filas al final de un CSV respetando el orden de columnas.
+
+    La escritura pasa por el hilo escritor del archivo, que la agrupa con las
+    de otras sesiones; la llamada vuelve cuando las filas ya están en disco.
+    """
+    import pandas as pd
+
+    with medir_io('anexar', ruta) as io_:
+        datos = pd.DataFrame(filas, columns=columnas).to_csv(header=False, index=False).encode('utf-8')
+        anexar(ruta, datos)
+        io_['bytes'], io_['filas'] = len(datos), len(filas)
+
+
+# ==================== BAJAS Y COMPACTACIÓN ====================
+# Una baja registra {maquina, fecha, filas_resultados, filas_payout, filas_metas}: las filas
+# de esa máquina con posición menor al límite quedan ocultas. Si la máquina se
+# vuelve a crear con el mismo nombre, sus filas nuevas quedan más allá del
+# límite y se ven normalmente.
+
+_VISTAS = {}
+
+# Compactar solo compensa si las filas muertas son una fracción relevante
+UMBRAL_COMPACTACION_FRACCION = 0.10
+UMBRAL_COMPACTACION_FILAS = 10000
+
+
+def cargar_bajas():
+    """Bajas pendientes de compactar"""
+    if not ARCHIVO_BAJAS.exists():
+        return []
+    return copy.deepcopy(_cargar_cacheado(ARCHIVO_BAJAS, _leer_json))
+
+
+def _limites_baja(clave_baja):
+    """{maquina: límite de filas ocultas} para uno de los historiales"""
+    limites = {}
+    for baja in cargar_bajas():
+        limite = baja.get(clave_baja, 0)
+        if limite > limites.get(baja['maquina'], 0):
+            limites[baja['maquina']] = limite
+    return limites
+
+
+def _mascara_muertas(df, limites):
+    """Serie booleana con las filas ocultas por alguna baja"""
+    import pandas as pd
+
+    limite_fila = df['Maquina'].map(limites).fillna(0)
+    return pd.Series(df.index, index=df.index) < limite_fila
+
+
+def _aplicar_bajas(ruta, df, clave_baja):
+    """Vista de ``df`` sin las filas dadas de baja (cacheada por versión)"""
+    limites = _limites_baja(clave_baja)
+    if not limites or df.empty:
+        return df
+
+    clave = tuple(sorted(limites.items()))
+    with _CACHE_LOCK:
+        cacheada = _VISTAS.get(ruta)
+    if cacheada is not None and cacheada[0] is df and cacheada[1] == clave:
+        return cacheada[2]
+
+    vista = df[~_mascara_muertas(df, limites)]
+    with _CACHE_LOCK:
+        _VISTAS[ruta] = (df, clave, vista)
+    return vista
+
+
+def _filas_en_log(ruta, columnas, tipos):
+    """Número de filas físicas (vivas o no) de un historial"""
+    if not ruta.exists():
+        return 0
+    return len(_leer_log(ruta, columnas, tipos))
+
+
+def estado_compactacion():
+    """Resumen de bajas pendientes y si conviene compactar"""
+    bajas = cargar_bajas()
+    muertas = 0
+    totales = 0
+    for ruta, columnas, tipos, clave in _HISTORIALES:
+        if not ruta.exists():
+            continue
+        df = _leer_log(ruta, columnas, tipos)
+        totales += len(df)
+        limites = _limites_baja(clave)
+        if limites and not df.empty:
+            muertas += int(_mascara_muertas(df, limites).sum())
+
+    conviene = bool(bajas) and (
+        muertas >= UMBRAL_COMPACTACION_FILAS
+        or (totales > 0 and muertas / totales >= UMBRAL_COMPACTACION_FRACCION)
+    )
+    return {
+        'bajas': len(bajas),
+        'filas_muertas': muertas,
+        'filas_totales': totales,
+        'conviene': conviene,
+    }
+
+
+def compactar(forzar=False):
+    """Elimina físicamente las filas de máquinas dadas de baja.
+
+    Cada historial se reescribe en una sola pasada en streaming a un archivo
+    temporal que luego reemplaza al original de forma atómica. Todo ocurre
+    con las bajas bloqueadas y, tras cada historial, sus límites se corrigen
+    por las filas quitadas, como en ``compactar_metas_rango``. Sin ``forzar``
+    solo actúa si ``estado_compactacion`` indica que conviene. Devuelve el
+    número de filas eliminadas, o None si no se compactó.
+    """
+    if usa_sqlite():
+        return None
+    if not forzar and not estado_compactacion()['conviene']:
+        return None
+
+    with bloqueo(ARCHIVO_BAJAS):
+        bajas = _leer_json(ARCHIVO_BAJAS) if ARCHIVO_BAJAS.exists() else []
+        if not bajas:
+            return 0
+
+        eliminadas = 0
+        for ruta, _, _, clave in _HISTORIALES:
+            if not ruta.exists():
+                continue
+            limites = {}
+            for baja in bajas:
+                limites[baja['maquina']] = max(limites.get(baja['maquina'], 0), baja.get(clave, 0))
+            with medir_io('compactar', ruta) as io_:
+                quitadas = reescribir_atomico(
+                    ruta, lambda destino: _copiar_sin_bajas(ruta, destino, limites),
+                    encoding='utf-8-sig', newline=''
+                )
+                io_['filas'], io_['bytes'] = len(quitadas), _firma_archivo(ruta)[1]
+            eliminadas += len(quitadas)
+            invalidar_cache(ruta)
+
+            # Los límites pasan a la numeración del archivo nuevo: los lectores
+            # no ocultan filas que no correspondan mientras se compacta el resto
+            for baja in bajas:
+                limite = baja.get(clave, 0)
+                baja[clave] = limite - bisect.bisect_left(quitadas, limite)
+            _escribir_json(ARCHIVO_BAJAS, bajas)
+
+        # Con el bloqueo tomado no se registraron bajas nuevas: todas quedaron aplicadas
+        _escribir_json(ARCHIVO_BAJAS, [])
+    return eliminadas
+
+
+def _copiar_sin_bajas(ruta, destino, limites):
+    """Copia el CSV fila a fila a ``destino`` omitiendo las filas muertas.
+
+    Devuelve las posiciones quitadas, en orden y con la numeración del DataFrame.
+    """
+    quitadas = []
+    with open(ruta, 'r', encoding='utf-8-sig', newline='') as origen:
+        lector = csv.reader(origen)
+        salida = csv.writer(destino, lineterminator='\n')
+        encabezado = next(lector, None)
+        if encabezado is None:
+            return quitadas
+        salida.writerow(encabezado)
+        col_maquina = encabezado.index('Maquina')
+        posicion = 0  # misma numeración que el DataFrame (sin líneas en blanco)
+        for fila in lector:
+            if not fila:
+                continue
+            if posicion < limites.get(fila[col_maquina], 0):
+                quitadas.append(posicion)
+            else:
+                salida.writerow(fila)
+            posicion += 1
+    return quitadas
+
+
+_HISTORIALES = [
+    (ARCHIVO_RESULTADOS, COLUMNAS_RESULTADOS, TIPOS_RESULTADOS, 'filas_resultados'),
+    (ARCHIVO_PAYOUT, COLUMNAS_PAYOUT, TIPOS_PAYOUT, 'filas_payout'),
+    (ARCHIVO_METAS, COLUMNAS_METAS, TIPOS_METAS, 'filas_metas'),
+]
+
+
+# ==================== METAS HEREDADAS (META_RANGO) ====================
+# Versiones anteriores guardaban el rango meta como una fila 'META_RANGO' del
+# historial de payout (Venta = mínimo, Payout = máximo), anexada en cada render
+# del formulario de evaluación. ``compactar_metas_rango`` pasa la última de cada
+# máquina al almacén de metas y las quita todas del historial de payout.
+
+def contar_metas_rango():
+    """Filas META_RANGO que quedan en el historial de payout"""
+    if usa_sqlite():
+        import backend_sqlite
+        return backend_sqlite.contar_metas_rango()
+    if not ARCHIVO_PAYOUT.exists():
+        return 0
+    df = _leer_log(ARCHIVO_PAYOUT, COLUMNAS_PAYOUT, TIPOS_PAYOUT)
+    return int((df['Semana'] == SEMANA_META_RANGO).sum())
+
+
+def compactar_metas_rango():
+    """Migra la última META_RANGO viva de cada máquina sin meta y elimina todas del historial.
+
+    Las máquinas que ya tienen meta en el almacén conservan la suya. El
+    historial se reescribe de forma atómica y los límites de las bajas
+    pendientes se corrigen por las filas quitadas. Devuelve
+    (filas eliminadas, metas migradas).
+    """
+    if usa_sqlite():
+        import backend_sqlite
+        return backend_sqlite.compactar_metas_rango()
+    if not ARCHIVO_PAYOUT.exists():
+        return 0, 0
+
+    if not contar_metas_rango():
+        return 0, 0
+    vivas = leer_payout()
+    vivas = vivas[vivas['Semana'] == SEMANA_META_RANGO]
+
+    # Primero las metas: si algo falla después, el rango ya está a salvo
+    con_meta = set(leer_metas_payout()['Maquina'])
+    migradas = [
+        {
+            'Maquina': fila['Maquina'], 'Meta_Min': fila['Venta'], 'Meta_Max': fila['Payout'],
+            'Usuario': '', 'Fecha': fila['Fecha']
+        }
+        for _, fila in vivas.groupby('Maquina', sort=False).tail(1).iterrows()
+        if fila['Maquina'] not in con_meta
+    ]
+    agregar_metas_payout(migradas)
+
+    # Con las bajas bloqueadas nadie registra límites mientras cambian las posiciones
+    with bloqueo(ARCHIVO_BAJAS):
+        with medir_io('compactar', ARCHIVO_PAYOUT) as io_:
+            quitadas = reescribir_atomico(
+                ARCHIVO_PAYOUT, _copiar_sin_metas_rango, encoding='utf-8-sig', newline=''
+            )
+            io_['filas'], io_['bytes'] = len(quitadas), _firma_archivo(ARCHIVO_PAYOUT)[1]
+        invalidar_cache(ARCHIVO_PAYOUT)
+
+        if quitadas and ARCHIVO_BAJAS.exists():
+            bajas = _leer_json(ARCHIVO_BAJAS)
+            for baja in bajas:
+                limite = baja.get('filas_payout', 0)
+                baja['filas_payout'] = limite - bisect.bisect_left(quitadas, limite)
+            _escribir_json(ARCHIVO_BAJAS, bajas)
+    return len(quitadas), len(migradas)
+
+
+def _copiar_sin_metas_rango(destino):
+    """Copia el historial de payout a ``destino`` sin las filas META_RANGO.
+
+    Devuelve las posiciones quitadas, en orden y con la numeración del DataFrame.
+    """
+    quitadas = []
+    with open(ARCHIVO_PAYOUT, 'r', encoding='utf-8-sig', newline='') as origen:
+        lector = csv.reader(origen)
+        salida = csv.writer(destino, lineterminator='\n')
+        encabezado = next(lector, None)
+        if encabezado is None:
+            return quitadas
+        salida.writerow(encabezado)
+        col_semana = encabezado.index('Semana')
+        posicion = 0
+        for fila in lector:
+            if not fila:
+                continue
+            if fila[col_semana] == SEMANA_META_RANGO:
+                quitadas.append(posicion)
+            else:
+                salida.writerow(fila)
+            posicion += 1
+    return quitadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mantenimiento del historial CSV")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    comp = sub.add_parser('compactar', help="Elimina físicamente las filas de máquinas dadas de baja")
+    comp.add_argument('--forzar', action='store_true', help="Compacta aunque no supere el umbral")
+    sub.add_parser(
+        'compactar-metas',
+        help="Pasa las filas META_RANGO del historial de payout al almacén de metas (la última por máquina)"
+    )
+    args = parser.parse_args()
+
+    if args.comando == 'compactar':
+        estado = estado_compactacion()
+        print(
+            f"Bajas pendientes: {estado['bajas']} | "
+            f"filas muertas: {estado['filas_muertas']} de {estado['filas_totales']}"
+        )
+        eliminadas = compactar(forzar=args.forzar)
+        if eliminadas is None:
+            print("No conviene compactar todavía (usa --forzar para hacerlo igual)")
+        else:
+            print(f"✅ Compactado: {eliminadas} filas eliminadas")
+    elif args.comando == 'compactar-metas':
+        print(f"Filas META_RANGO en el historial de payout: {contar_metas_rango()}")
+        eliminadas, migradas = compactar_metas_rango()
+        print(f"✅ {eliminadas} filas eliminadas, {migradas} metas migradas al almacén de metas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,454 @@
+"""Cálculos agregados sobre el historial, en pasadas vectorizadas de pandas"""
+import threading
+
+import pandas as pd
+
+from almacenamiento import (
+    SEMANA_META_RANGO, leer_resultados, metas_payout_desde, payout_desde, resultados_desde
+)
+from calificacion import CLAVE_EVALUACION, porcentaje_aprobacion
+
+
+# ==================== PROGRESO DE EVALUACIÓN ====================
+
+def _criterios_esperados(maquinas, criterios):
+    """Producto máquina × criterio con el responsable de cada criterio"""
+    df_criterios = pd.DataFrame({
+        'Criterio_ID': [str(c['id']) for c in criterios],
+        'Criterio': [c['criterio'] for c in criterios],
+        'Usuario': [c['responsable'] for c in criterios],
+    })
+    df_maquinas = pd.DataFrame({'Maquina': list(maquinas)})
+    return df_maquinas.merge(df_criterios, how='cross')
+
+
+def estado_criterios(df, maquinas, criterios):
+    """Estado de cada criterio esperado por máquina.
+
+    Una fila por (Maquina, Usuario responsable, Criterio_ID) con la fecha de
+    la última evaluación (NaN si nunca se evaluó) y ``Evaluado``.
+    """
+    esperados = _criterios_esperados(maquinas, criterios)
+    if df.empty:
+        esperados['Ultima_Fecha'] = pd.Series(dtype=object)
+    else:
+        df_std = df[df['Criterio_ID'] != 'MISION']
+        ultimas = (
+            df_std.assign(Criterio_ID=df_std['Criterio_ID'].astype(str))
+            .groupby(['Maquina', 'Usuario', 'Criterio_ID'], sort=False)['Fecha']
+            .max()
+            .rename('Ultima_Fecha')
+            .reset_index()
+        )
+        esperados = esperados.merge(ultimas, on=['Maquina', 'Usuario', 'Criterio_ID'], how='left')
+    esperados['Evaluado'] = esperados['Ultima_Fecha'].notna()
+    return esperados
+
+
+def matriz_progreso(df, maquinas, usuarios, criterios):
+    """Progreso por máquina × usuario en una sola pasada agrupada.
+
+    Devuelve un DataFrame largo con Maquina, Usuario, Evaluados, Esperados,
+    Porcentaje (NaN si el usuario no tiene criterios) y Ultima_Fecha.
+    """
+    estado = estado_criterios(df, maquinas, criterios)
+    progreso = (
+        estado.groupby(['Maquina', 'Usuario'], sort=False)
+        .agg(
+            Evaluados=('Evaluado', 'sum'),
+            Esperados=('Evaluado', 'size'),
+            Ultima_Fecha=('Ultima_Fecha', 'max'),
+        )
+        .reset_index()
+    )
+
+    # Completar usuarios sin criterios asignados para que aparezcan en la matriz
+    completa = pd.MultiIndex.from_product(
+        [list(maquinas), list(usuarios)], names=['Maquina', 'Usuario']
+    ).to_frame(index=False)
+    progreso = completa.merge(progreso, on=['Maquina', 'Usuario'], how='left')
+    progreso['Evaluados'] = progreso['Evaluados'].fillna(0).astype(int)
+    progreso['Esperados'] = progreso['Esperados'].fillna(0).astype(int)
+    progreso['Porcentaje'] = (
+        progreso['Evaluados'] / progreso['Esperados'].where(progreso['Esperados'] > 0) * 100
+    )
+    return progreso
+
+
+def tabla_matriz_progreso(progreso):
+    """Pivotea el progreso a la vista Máquina × Usuario con ✅ / ⏳"""
+    if progreso.empty:
+        return pd.DataFrame()
+
+    fecha = progreso['Ultima_Fecha'].fillna('').astype(str).str[:10]
+    completo = progreso['Porcentaje'] >= 100
+    celda = (
+        '⏳ ' + progreso['Porcentaje'].fillna(0).round().astype(int).astype(str) + '%'
+    ).where(~completo, '✅ ' + fecha)
+    celda = celda.where(progreso['Esperados'] > 0, '—')
+
+    tabla = (
+        progreso.assign(Celda=celda)
+        .pivot(index='Maquina', columns='Usuario', values='Celda')
+        .reindex(index=progreso['Maquina'].unique(), columns=progreso['Usuario'].unique())
+    )
+    tabla.index.name = 'Máquina'
+    tabla.columns.name = None
+    return tabla.reset_index()
+
+
+def criterios_pendientes(df, maquinas, criterios, usuario=None):
+    """Criterios que cada responsable aún debe por máquina"""
+    estado = estado_criterios(df, maquinas, criterios)
+    pendientes = estado[~estado['Evaluado']]
+    if usuario is not None:
+        pendientes = pendientes[pendientes['Usuario'] == usuario]
+    return pendientes[['Maquina', 'Usuario', 'Criterio_ID', 'Criterio']].reset_index(drop=True)
+
+
+# ==================== ÚLTIMA EVALUACIÓN Y AGREGADOS ====================
+# Una evaluación repetida reemplaza a la anterior: solo la última fila de
+# cada (Maquina, Usuario, Criterio_ID) cuenta para el puntaje y el radar. El
+# índice de últimas filas y la tabla de agregados por (Maquina, Criterio)
+# viven en memoria y se sincronizan con el historial en cada lectura,
+# aplicando solo las filas nuevas (resultados_desde); si el cursor deja de
+# valer se reconstruyen completos. Las misiones no entran en el índice.
+
+_ESTADO_LOCK = threading.Lock()
+_ESTADO = {'cursor': None, 'ultimas': None, 'tabla': None}
+_MATRIZ = {'ultimas': None, 'matriz': None, 'criterios': None}
+
+_COLUMNAS_SUMA = ['Suma_Calificacion', 'Puntaje_Ponderado', 'Vigentes', 'Evaluaciones']
+
+
+def _ultimas_de(df_std):
+    """Última fila (por orden del historial) de cada clave de evaluación"""
+    return df_std.drop_duplicates(CLAVE_EVALUACION, keep='last').set_index(CLAVE_EVALUACION)
+
+
+def _acumular(ultimas, signo=1):
+    """Aporte de un conjunto de últimas filas a los agregados por (Maquina, Criterio)"""
+    return (
+        ultimas.reset_index()
+        .assign(
+            Suma_Calificacion=lambda d: d['Calificacion'] * signo,
+            Puntaje_Ponderado=lambda d: d['Calificacion'] * d['Peso'] * signo,
+            Vigentes=signo,
+        )
+        .groupby(['Maquina', 'Criterio'])
+        .agg(
+            Suma_Calificacion=('Suma_Calificacion', 'sum'),
+            Puntaje_Ponderado=('Puntaje_Ponderado', 'sum'),
+            Vigentes=('Vigentes', 'sum'),
+            Ultima_Fecha=('Fecha', 'max'),
+        )
+    )
+
+
+def _conteo(df_std):
+    """Número de evaluaciones registradas (todo el historial) por (Maquina, Criterio)"""
+    return df_std.groupby(['Maquina', 'Criterio']).size().rename('Evaluaciones').to_frame()
+
+
+def _combinar(*partes):
+    """Suma tablas de agregados; la fecha se combina con max"""
+    partes = [p for p in partes if not p.empty]
+    if not partes:
+        return pd.DataFrame(
+            columns=_COLUMNAS_SUMA + ['Ultima_Fecha'],
+            index=pd.MultiIndex.from_arrays([[], []], names=['Maquina', 'Criterio'])
+        )
+    tabla = (
+        pd.concat(partes)
+        .groupby(level=['Maquina', 'Criterio'])
+        .agg({**{c: 'sum' for c in _COLUMNAS_SUMA}, 'Ultima_Fecha': 'max'})
+    )
+    # Un criterio cuyo único aporte se restó queda sin filas vigentes
+    return tabla[(tabla['Vigentes'] > 0) | (tabla['Evaluaciones'] > 0)]
+
+
+def _sincronizar():
+    """Pone el índice de últimas evaluaciones y los agregados al día"""
+    with _ESTADO_LOCK:
+        df, cursor, completo = resultados_desde(_ESTADO['cursor'])
+        df_std = df[df['Criterio_ID'] != 'MISION']
+        nuevas = _ultimas_de(df_std)
+
+        if completo or _ESTADO['ultimas'] is None:
+            ultimas = nuevas
+            tabla = _combinar(_acumular(nuevas), _conteo(df_std))
+        elif df_std.empty:
+            ultimas, tabla = _ESTADO['ultimas'], _ESTADO['tabla']
+        else:
+            anteriores = _ESTADO['ultimas']
+            reemplazadas = anteriores.loc[anteriores.index.intersection(nuevas.index)]
+            ultimas = pd.concat([anteriores.drop(reemplazadas.index), nuevas])
+            tabla = _combinar(
+                _ESTADO['tabla'],
+                _acumular(nuevas),
+                _acumular(reemplazadas, signo=-1).drop(columns='Ultima_Fecha'),
+                _conteo(df_std),
+            )
+
+        _ESTADO.update(cursor=cursor, ultimas=ultimas, tabla=tabla)
+        return ultimas, tabla
+
+
+def reconstruir_agregados():
+    """Descarta el estado residente y lo recalcula desde el historial"""
+    with _ESTADO_LOCK:
+        _ESTADO.update(cursor=None, ultimas=None, tabla=None)
+    return _sincronizar()
+
+
+def ultimas_evaluaciones(maquina=None):
+    """Última evaluación vigente por (Maquina, Usuario, Criterio_ID)"""
+    ultimas, _ = _sincronizar()
+    resultado = ultimas.reset_index()
+    if maquina is not None:
+        resultado = resultado[resultado['Maquina'] == maquina]
+    return resultado
+
+
+def historial_evaluaciones(maquina, usuario=None, criterio_id=None):
+    """Todas las evaluaciones registradas de una máquina, incluidas las reemplazadas"""
+    df = leer_resultados(maquina)
+    if usuario is not None:
+        df = df[df['Usuario'] == usuario]
+    if criterio_id is not None:
+        df = df[df['Criterio_ID'].astype(str) == str(criterio_id)]
+    return df
+
+
+def agregados_por_criterio(maquina=None):
+    """Puntaje ponderado, promedio (radar), evaluaciones y última fecha por criterio"""
+    _, tabla = _sincronizar()
+    if maquina is not None:
+        if maquina not in tabla.index.get_level_values('Maquina'):
+            tabla = tabla.iloc[0:0]
+        else:
+            tabla = tabla.xs(maquina, level='Maquina', drop_level=False)
+    tabla = tabla[tabla['Vigentes'] > 0]
+    resultado = tabla.reset_index()
+    resultado['Promedio'] = resultado['Suma_Calificacion'] / resultado['Vigentes']
+    resultado['Evaluaciones'] = resultado['Evaluaciones'].astype(int)
+    return resultado[['Maquina', 'Criterio', 'Puntaje_Ponderado', 'Promedio', 'Evaluaciones', 'Ultima_Fecha']]
+
+
+def matriz_calificaciones():
+    """Matriz máquina × criterio para simular pesos sin reagrupar el historial.
+
+    Devuelve ``(matriz, criterios)``: ``matriz`` (índice Maquina, columnas
+    Criterio_ID) suma las últimas calificaciones de cada criterio, de modo
+    que ``matriz @ pesos`` es el puntaje ponderado; ``criterios`` trae por
+    Criterio_ID el nombre y el peso vigentes. Se recalcula solo cuando
+    cambian las últimas evaluaciones.
+    """
+    ultimas, _ = _sincronizar()
+    with _ESTADO_LOCK:
+        if _MATRIZ['ultimas'] is not ultimas:
+            vigentes = ultimas.reset_index()
+            vigentes['Criterio_ID'] = vigentes['Criterio_ID'].astype(str)
+            matriz = vigentes.pivot_table(
+                index='Maquina', columns='Criterio_ID', values='Calificacion',
+                aggfunc='sum', fill_value=0
+            )
+            criterios = vigentes.groupby('Criterio_ID').agg(
+                Criterio=('Criterio', 'last'), Peso=('Peso', 'last')
+            ).reindex(matriz.columns)
+            _MATRIZ.update(ultimas=ultimas, matriz=matriz, criterios=criterios)
+        return _MATRIZ['matriz'], _MATRIZ['criterios']
+
+
+def agregados_por_maquina():
+    """Puntaje ponderado, % de aprobación, evaluaciones y última fecha por máquina"""
+    _, tabla = _sincronizar()
+    resumen = (
+        tabla[tabla['Vigentes'] > 0]
+        .groupby(level='Maquina')
+        .agg(
+            Puntaje_Ponderado=('Puntaje_Ponderado', 'sum'),
+            Evaluaciones=('Evaluaciones', 'sum'),
+            Ultima_Fecha=('Ultima_Fecha', 'max'),
+        )
+        .reset_index()
+    )
+    resumen['Evaluaciones'] = resumen['Evaluaciones'].astype(int)
+    resumen['Porcentaje'] = porcentaje_aprobacion(resumen['Puntaje_Ponderado'])
+    return resumen
+
+
+# ==================== PAYOUT DE LA FLOTA ====================
+# Indicadores de payout de todas las máquinas en una sola pasada agrupada
+# sobre el historial de cortes, en lugar de revisar máquina por máquina.
+
+RANGO_PAYOUT_DEFECTO = (18.0, 22.0)
+VENTANA_PAYOUT = 4
+
+
+# Índice máquina → meta vigente (Meta_Min, Meta_Max, Usuario, Fecha) y su
+# historial, en memoria y compartido por las sesiones. Se sincroniza con el
+# almacén de metas en cada consulta aplicando solo las filas nuevas
+# (metas_payout_desde); si el cursor deja de valer se reconstruye. Las máquinas
+# sin meta guardada usan su última fila META_RANGO heredada del historial de
+# payout, seguida igual con payout_desde, hasta que se compacten.
+
+_METAS_LOCK = threading.Lock()
+_METAS = {
+    'cursor_metas': None, 'cursor_payout': None,
+    'metas': {}, 'legado': {}, 'historial': {}, 'vigentes': {}
+}
+
+
+def _meta(minimo, maximo, usuario, fecha):
+    return (
+        float(minimo), float(maximo),
+        '' if pd.isna(usuario) else str(usuario), '' if pd.isna(fecha) else str(fecha)
+    )
+
+
+def _sincronizar_metas():
+    """Aplica al índice las metas nuevas; devuelve el estado (no modificarlo)"""
+    with _METAS_LOCK:
+        df, cursor, completo = metas_payout_desde(_METAS['cursor_metas'])
+        if completo:
+            _METAS['metas'], _METAS['historial'] = {}, {}
+        nuevas = {}
+        for fila in df[['Maquina', 'Meta_Min', 'Meta_Max', 'Usuario', 'Fecha']].itertuples(index=False):
+            meta = _meta(fila.Meta_Min, fila.Meta_Max, fila.Usuario, fila.Fecha)
+            nuevas[fila.Maquina] = meta
+            _METAS['historial'].setdefault(fila.Maquina, []).append(meta)
+        _METAS['metas'].update(nuevas)
+        _METAS['cursor_metas'] = cursor
+
+        df, cursor, completo_payout = payout_desde(_METAS['cursor_payout'])
+        if completo_payout:
+            _METAS['legado'] = {}
+        legado = df[df['Semana'] == SEMANA_META_RANGO]
+        heredadas = {
+            fila.Maquina: _meta(fila.Venta, fila.Payout, None, fila.Fecha)
+            for fila in legado[['Maquina', 'Venta', 'Payout', 'Fecha']].itertuples(index=False)
+        }
+        _METAS['legado'].update(heredadas)
+        _METAS['cursor_payout'] = cursor
+
+        if completo or completo_payout:
+            _METAS['vigentes'] = {**_METAS['legado'], **_METAS['metas']}
+        else:
+            vigentes = dict(_METAS['vigentes'])
+            vigentes.update({m: v for m, v in heredadas.items() if m not in _METAS['metas']})
+            vigentes.update(nuevas)
+            _METAS['vigentes'] = vigentes
+        return _METAS
+
+
+def indice_metas_payout():
+    """{maquina: (Meta_Min, Meta_Max, Usuario, Fecha)} con la meta vigente de cada máquina.
+
+    El dict es compartido entre sesiones y no debe modificarse.
+    """
+    return _sincronizar_metas()['vigentes']
+
+
+def meta_payout(maquina):
+    """(Meta_Min, Meta_Max, Usuario, Fecha) vigente de una máquina, o None si no tiene"""
+    return indice_metas_payout().get(maquina)
+
+
+def rango_payout(maquina):
+    """(mínimo, máximo) del rango ideal de una máquina; RANGO_PAYOUT_DEFECTO si no tiene meta"""
+    meta = meta_payout(maquina)
+    return RANGO_PAYOUT_DEFECTO if meta is None else meta[:2]
+
+
+def historial_metas_payout(maquina):
+    """Metas guardadas de una máquina, de la más antigua a la vigente"""
+    return list(_sincronizar_metas()['historial'].get(maquina, []))
+
+
+def rangos_payout(maquinas=None):
+    """Rango vigente (Meta_Min, Meta_Max) por máquina con meta, indexado por Maquina"""
+    vigentes = indice_metas_payout()
+    if maquinas is not None:
+        vigentes = {m: vigentes[m] for m in maquinas if m in vigentes}
+    return pd.DataFrame(
+        [meta[:2] for meta in vigentes.values()],
+        index=pd.Index(list(vigentes), name='Maquina'), columns=['Meta_Min', 'Meta_Max'],
+        dtype='float64'
+    )
+
+
+def analitica_payout(df_pay, maquinas=None, ventana=VENTANA_PAYOUT):
+    """Indicadores de payout por máquina, ordenados de mayor a menor desviación.
+
+    Una fila por máquina con cortes: Cortes, Payout_Promedio (media de los
+    últimos ``ventana`` cortes), Meta_Min/Meta_Max, Semanas_Fuera y Pct_Fuera
+    (cortes fuera del rango), Tendencia_Venta (pendiente de la venta por
+    corte), el último corte y Desviacion (distancia del promedio al rango,
+    0 si está dentro). Los rangos salen del índice de metas.
+    """
+    columnas = [
+        'Ranking', 'Maquina', 'Cortes', 'Payout_Promedio', 'Meta_Min', 'Meta_Max',
+        'Desviacion', 'Semanas_Fuera', 'Pct_Fuera', 'Tendencia_Venta',
+        'Ultimo_Corte', 'Ultima_Fecha', 'Ultimo_Payout', 'Ultima_Venta'
+    ]
+    if maquinas is not None:
+        df_pay = df_pay[df_pay['Maquina'].isin(maquinas)]
+    cortes = df_pay[df_pay['Semana'] != SEMANA_META_RANGO]
+    if cortes.empty:
+        return pd.DataFrame(columns=columnas)
+
+    minimo, maximo = RANGO_PAYOUT_DEFECTO
+    cortes = (
+        cortes.assign(
+            Payout=pd.to_numeric(cortes['Payout'], errors='coerce'),
+            Venta=pd.to_numeric(cortes['Venta'], errors='coerce'),
+            _fecha=pd.to_datetime(cortes['Fecha'], errors='coerce'),
+        )
+        .sort_values(['Maquina', '_fecha'], kind='stable')
+        .join(rangos_payout(maquinas), on='Maquina')
+    )
+    cortes['Meta_Min'] = cortes['Meta_Min'].fillna(minimo)
+    cortes['Meta_Max'] = cortes['Meta_Max'].fillna(maximo)
+
+    # Sumas para la pendiente de mínimos cuadrados de Venta contra el n.º de corte
+    x = cortes.groupby('Maquina', sort=False).cumcount().astype(float)
+    cortes = cortes.assign(
+        _fuera=(cortes['Payout'] < cortes['Meta_Min']) | (cortes['Payout'] > cortes['Meta_Max']),
+        _x=x, _xx=x * x, _xy=x * cortes['Venta'],
+    )
+    grupos = cortes.groupby('Maquina', sort=False)
+    resumen = grupos.agg(
+        Cortes=('Payout', 'size'),
+        Meta_Min=('Meta_Min', 'last'),
+        Meta_Max=('Meta_Max', 'last'),
+        Semanas_Fuera=('_fuera', 'sum'),
+        Ultimo_Corte=('Semana', 'last'),
+        Ultima_Fecha=('Fecha', 'last'),
+        Ultimo_Payout=('Payout', 'last'),
+        Ultima_Venta=('Venta', 'last'),
+        _sx=('_x', 'sum'), _sxx=('_xx', 'sum'), _sxy=('_xy', 'sum'), _sy=('Venta', 'sum'),
+    )
+    resumen['Payout_Promedio'] = grupos.tail(ventana).groupby('Maquina', sort=False)['Payout'].mean()
+
+    n = resumen['Cortes']
+    denominador = n * resumen['_sxx'] - resumen['_sx'] ** 2
+    resumen['Tendencia_Venta'] = (
+        (n * resumen['_sxy'] - resumen['_sx'] * resumen['_sy']) / denominador.where(denominador > 0)
+    )
+    resumen['Semanas_Fuera'] = resumen['Semanas_Fuera'].astype(int)
+    resumen['Pct_Fuera'] = resumen['Semanas_Fuera'] / n * 100
+
+    promedio = resumen['Payout_Promedio']
+    resumen['Desviacion'] = (
+        (promedio - resumen['Meta_Min']).clip(upper=0)
+        + (promedio - resumen['Meta_Max']).clip(lower=0)
+    )
+
+    resumen = (
+        resumen.assign(_orden=resumen['Desviacion'].abs())
+        .sort_values(['_orden', 'Semanas_Fuera'], ascending=False, kind='stable')
+        .reset_index()
+    )
+    resumen['Ranking'] = range(1, len(resumen) + 1)
+    return resumen[columnas]
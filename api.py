@@ -0,0 +1,192 @@
+"""API HTTP local para cargar cortes y evaluaciones sin pasar por la interfaz.
+
+Corre junto a la app (mismo directorio de datos) y escribe por la misma capa
+de almacenamiento, así que la app ve los datos nuevos en su siguiente
+lectura. Solo usa la biblioteca estándar:
+
+    python api.py [--host 127.0.0.1] [--puerto 8502]
+
+Endpoints (JSON):
+
+    GET  /salud          -> {"ok": true, "backend": "csv"} (503 si faltan archivos o tablas)
+    POST /cortes         -> {"cortes": [{Maquina, Semana, Venta, Payout, Fecha?, Cambios?}, ...]}
+    POST /evaluaciones   -> {"evaluaciones": [{Maquina, Usuario, Criterio_ID, Calificacion,
+                                              Criterio?, Peso?, Comentarios?, Fecha?,
+                                              Meta_Min?, Meta_Max?}, ...]}
+
+Meta_Min/Meta_Max (solo en el criterio 2) registran el rango meta de payout
+de la máquina, igual que el formulario de evaluación de la app.
+
+El cuerpo también puede ser directamente la lista de registros. Si algún
+registro es inválido no se guarda nada y se responde 422 con los errores,
+salvo con ``?omitir_invalidos=1``. Cualquier otro fallo responde 500 con
+un JSON de error. Con la variable de entorno QPP_API_TOKEN se exige
+``Authorization: Bearer <token>``.
+
+Las cargas simultáneas se serializan con ``importacion._IMPORTACION_LOCK``,
+que solo excluye dentro de un proceso: la API y la app (u otra réplica de la
+API) pueden validar a la vez contra el mismo historial y colar una semana
+repetida. Corre una sola instancia de la API por directorio de datos.
+"""
+import argparse
+import hmac
+import json
+import os
+import sqlite3
+import traceback
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pandas as pd
+
+from almacenamiento import BACKEND, faltantes_almacenamiento, iniciar_archivos
+from importacion import importar_cortes, importar_evaluaciones
+
+MAX_BYTES_CUERPO = 20 * 1024 * 1024
+TOKEN = os.environ.get('QPP_API_TOKEN', '')
+
+
+class ErrorSolicitud(Exception):
+    """Solicitud mal formada; se responde con ``estado`` y el mensaje"""
+
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+# ==================== CARGAS ====================
+
+def _cargar_cortes(registros, omitir_invalidos):
+    importados, errores, cerradas = importar_cortes(pd.DataFrame(registros), omitir_invalidos)
+    return importados, errores, {'importados': importados, 'tareas_cerradas': len(cerradas)}
+
+
+def _cargar_evaluaciones(registros, omitir_invalidos):
+    importadas, errores = importar_evaluaciones(pd.DataFrame(registros), omitir_invalidos)
+    return importadas, errores, {'importados': importadas}
+
+
+CARGAS = {
+    '/cortes': ('cortes', _cargar_cortes),
+    '/evaluaciones': ('evaluaciones', _cargar_evaluaciones),
+}
+
+
+# ==================== SERVIDOR ====================
+
+class ManejadorAPI(BaseHTTPRequestHandler):
+    server_version = "QPP-API/1.0"
+
+    def do_GET(self):
+        if urlsplit(self.path).path == '/salud':
+            self._salud()
+        else:
+            self._responder(HTTPStatus.NOT_FOUND, {'error': "Ruta desconocida"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        try:
+            self._autorizar()
+            if url.path not in CARGAS:
+                raise ErrorSolicitud(HTTPStatus.NOT_FOUND, "Ruta desconocida")
+            clave, cargar = CARGAS[url.path]
+            registros = self._registros(clave)
+            omitir = parse_qs(url.query).get('omitir_invalidos', ['0'])[0] in ('1', 'true', 'si')
+            guardados, errores, respuesta = cargar(registros, omitir)
+        except ErrorSolicitud as e:
+            self._responder(e.estado, {'error': str(e)})
+            return
+        except ValueError as e:
+            self._responder(HTTPStatus.BAD_REQUEST, {'error': str(e)})
+            return
+        except Exception:
+            # Sin esto el manejador de la biblioteca corta la conexión sin respuesta
+            self.log_error("Error interno en %s", url.path)
+            traceback.print_exc()
+            self._responder(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': "Error interno del servidor"})
+            return
+
+        # En la API la fila es la posición del registro en la lista (desde 0)
+        errores = errores.assign(Fila=errores['Fila'] - 2).rename(columns={'Fila': 'Indice'})
+        respuesta['errores'] = errores.to_dict('records')
+        estado = HTTPStatus.OK if guardados or errores.empty else HTTPStatus.UNPROCESSABLE_ENTITY
+        self._responder(estado, respuesta)
+
+    def _salud(self):
+        try:
+            faltantes = faltantes_almacenamiento()
+        except (OSError, sqlite3.Error) as e:
+            faltantes = [f"almacenamiento inaccesible: {e}"]
+        if faltantes:
+            self._responder(HTTPStatus.SERVICE_UNAVAILABLE, {
+                'ok': False, 'backend': BACKEND, 'error': f"Faltan datos: {', '.join(faltantes)}"
+            })
+        else:
+            self._responder(HTTPStatus.OK, {'ok': True, 'backend': BACKEND})
+
+    def _autorizar(self):
+        if not TOKEN:
+            return
+        esperado = f"Bearer {TOKEN}"
+        if not hmac.compare_digest(self.headers.get('Authorization', ''), esperado):
+            raise ErrorSolicitud(HTTPStatus.UNAUTHORIZED, "Token inválido")
+
+    def _registros(self, clave):
+        """Lista de registros del cuerpo JSON (``[...]`` o ``{clave: [...]}``)"""
+        try:
+            largo = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            raise ErrorSolicitud(HTTPStatus.BAD_REQUEST, "Content-Length inválido")
+        if largo > MAX_BYTES_CUERPO:
+            raise ErrorSolicitud(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Cuerpo demasiado grande")
+        try:
+            cuerpo = json.loads(self.rfile.read(largo) or b'null')
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ErrorSolicitud(HTTPStatus.BAD_REQUEST, f"JSON inválido: {e}")
+
+        registros = cuerpo.get(clave) if isinstance(cuerpo, dict) else cuerpo
+        if not isinstance(registros, list) or not all(isinstance(r, dict) for r in registros):
+            raise ErrorSolicitud(
+                HTTPStatus.BAD_REQUEST, f"Se espera una lista de registros o {{\"{clave}\": [...]}}"
+            )
+        if not registros:
+            raise ErrorSolicitud(HTTPStatus.BAD_REQUEST, "Sin registros")
+        return registros
+
+    def _responder(self, estado, datos):
+        contenido = json.dumps(datos, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(contenido)))
+        self.end_headers()
+        self.wfile.write(contenido)
+
+
+def crear_servidor(host='127.0.0.1', puerto=8502):
+    """Servidor HTTP con un hilo por conexión (sin arrancar).
+
+    Crea antes los archivos o tablas de datos que falten, como la app al iniciar.
+    """
+    iniciar_archivos()
+    return ThreadingHTTPServer((host, puerto), ManejadorAPI)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP local de carga de datos")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8502)
+    args = parser.parse_args()
+
+    servidor = crear_servidor(args.host, args.puerto)
+    print(f"✅ API escuchando en http://{args.host}:{args.puerto} (backend {BACKEND})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
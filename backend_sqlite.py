@@ -0,0 +1,400 @@
+"""Backend SQLite opcional (QPP_BACKEND=sqlite).
+
+Guarda evaluaciones, cortes de payout, máquinas y tareas en un solo archivo
+SQLite en modo WAL. Las consultas por máquina usan índices en lugar de leer
+todo el historial.
+
+Importación única desde los CSV/JSON actuales:
+
+    python backend_sqlite.py importar [--reemplazar]
+"""
+import argparse
+import json
+import sqlite3
+import threading
+
+import almacenamiento
+from rendimiento import medir_io
+
+# ==================== ESQUEMA ====================
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS resultados (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Maquina TEXT NOT NULL,
+    Usuario TEXT,
+    Criterio_ID TEXT,
+    Criterio TEXT,
+    Peso REAL,
+    Calificacion INTEGER,
+    Comentarios TEXT,
+    Fecha TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_resultados_maquina ON resultados (Maquina);
+CREATE INDEX IF NOT EXISTS idx_resultados_usuario ON resultados (Usuario);
+CREATE INDEX IF NOT EXISTS idx_resultados_criterio ON resultados (Criterio_ID);
+CREATE INDEX IF NOT EXISTS idx_resultados_fecha ON resultados (Fecha);
+
+CREATE TABLE IF NOT EXISTS payout (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Maquina TEXT NOT NULL,
+    Fecha TEXT,
+    Semana TEXT,
+    Venta REAL,
+    Payout REAL,
+    Cambios TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_payout_maquina ON payout (Maquina);
+CREATE INDEX IF NOT EXISTS idx_payout_fecha ON payout (Fecha);
+
+CREATE TABLE IF NOT EXISTS metas_payout (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Maquina TEXT NOT NULL,
+    Meta_Min REAL,
+    Meta_Max REAL,
+    Usuario TEXT,
+    Fecha TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_metas_payout_maquina ON metas_payout (Maquina);
+
+CREATE TABLE IF NOT EXISTS maquinas (
+    orden INTEGER NOT NULL,
+    nombre TEXT NOT NULL,
+    datos TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS tareas (
+    orden INTEGER NOT NULL,
+    id TEXT,
+    asignado_a TEXT,
+    completada INTEGER NOT NULL DEFAULT 0,
+    datos TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tareas_asignado ON tareas (asignado_a, completada);
+
+CREATE TABLE IF NOT EXISTS meta (
+    clave TEXT PRIMARY KEY,
+    valor INTEGER NOT NULL
+);
+"""
+
+COLUMNAS = {
+    'resultados': almacenamiento.COLUMNAS_RESULTADOS,
+    'payout': almacenamiento.COLUMNAS_PAYOUT,
+    'metas_payout': almacenamiento.COLUMNAS_METAS,
+}
+
+TABLAS = ['resultados', 'payout', 'metas_payout', 'maquinas', 'tareas', 'meta']
+
+_local = threading.local()
+
+
+def conectar():
+    """Conexión SQLite por hilo (Streamlit atiende cada sesión en un hilo)"""
+    con = getattr(_local, 'con', None)
+    if con is None:
+        con = sqlite3.connect(almacenamiento.ARCHIVO_DB, timeout=30)
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        _local.con = con
+    return con
+
+
+def tablas_faltantes():
+    """Tablas del esquema que no existen en la base"""
+    existentes = {
+        fila[0] for fila in conectar().execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+    return [tabla for tabla in TABLAS if tabla not in existentes]
+
+
+def iniciar_db():
+    """Crea tablas e índices; siembra la máquina por defecto en una base nueva"""
+    con = conectar()
+    with con:
+        con.executescript(ESQUEMA)
+        vacia = con.execute("SELECT COUNT(*) FROM maquinas").fetchone()[0] == 0
+    if vacia:
+        guardar_maquinas(almacenamiento.maquinas_por_defecto())
+
+
+# ==================== RESULTADOS Y PAYOUT ====================
+
+def leer_tabla(tabla, maquina=None):
+    """Lee una tabla del historial; con máquina usa el índice por Maquina"""
+    import pandas as pd
+
+    columnas = ", ".join(COLUMNAS[tabla])
+    consulta = f"SELECT {columnas} FROM {tabla}"
+    parametros = ()
+    if maquina is not None:
+        consulta += " WHERE Maquina = ?"
+        parametros = (maquina,)
+    consulta += " ORDER BY id"
+    with medir_io('leer', f"sqlite:{tabla}") as io_:
+        df = pd.read_sql_query(consulta, conectar(), params=parametros)
+        io_['filas'] = len(df)
+    return df
+
+
+def hay_filas(tabla):
+    """True si la tabla tiene al menos una fila (consulta de costo constante)"""
+    return conectar().execute(f"SELECT 1 FROM {tabla} LIMIT 1").fetchone() is not None
+
+
+def insertar_filas(tabla, filas):
+    """Inserta filas (lista de dicts) en una sola transacción"""
+    columnas = COLUMNAS[tabla]
+    marcadores = ", ".join("?" for _ in columnas)
+    valores = [
+        tuple(_valor_sql(fila.get(c)) for c in columnas)
+        for fila in filas
+    ]
+    con = conectar()
+    with medir_io('anexar', f"sqlite:{tabla}") as io_, con:
+        con.executemany(
+            f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({marcadores})",
+            valores
+        )
+        io_['filas'] = len(valores)
+
+
+def eliminar_maquina(nombre):
+    """Borra evaluaciones, payout y metas de una máquina"""
+    con = conectar()
+    with con:
+        con.execute("DELETE FROM resultados WHERE Maquina = ?", (nombre,))
+        con.execute("DELETE FROM payout WHERE Maquina = ?", (nombre,))
+        con.execute("DELETE FROM metas_payout WHERE Maquina = ?", (nombre,))
+        _nueva_generacion(con)
+
+
+def contar_metas_rango():
+    """Filas META_RANGO heredadas en la tabla de payout"""
+    return conectar().execute(
+        "SELECT COUNT(*) FROM payout WHERE Semana = ?", (almacenamiento.SEMANA_META_RANGO,)
+    ).fetchone()[0]
+
+
+def compactar_metas_rango():
+    """Mismo contrato que almacenamiento.compactar_metas_rango, en una transacción"""
+    con = conectar()
+    with con:
+        migradas = con.execute(
+            "INSERT INTO metas_payout (Maquina, Meta_Min, Meta_Max, Usuario, Fecha) "
+            "SELECT Maquina, Venta, Payout, '', Fecha FROM payout WHERE id IN ("
+            "  SELECT MAX(id) FROM payout WHERE Semana = ? GROUP BY Maquina"
+            ") AND Maquina NOT IN (SELECT Maquina FROM metas_payout) ORDER BY id",
+            (almacenamiento.SEMANA_META_RANGO,)
+        ).rowcount
+        eliminadas = con.execute(
+            "DELETE FROM payout WHERE Semana = ?", (almacenamiento.SEMANA_META_RANGO,)
+        ).rowcount
+        if eliminadas:
+            _nueva_generacion(con)
+    return eliminadas, migradas
+
+
+def filas_desde(tabla, cursor=None):
+    """Filas con id posterior al cursor; mismo contrato que almacenamiento.resultados_desde.
+
+    El cursor es (generación, último id). Los borrados abren una generación
+    nueva, lo que invalida los cursores anteriores.
+    """
+    import pandas as pd
+
+    con = conectar()
+    fila = con.execute("SELECT valor FROM meta WHERE clave = 'generacion'").fetchone()
+    generacion = fila[0] if fila else 0
+    completo = cursor is None or cursor[0] != generacion
+    desde = 0 if completo else cursor[1]
+
+    columnas = ", ".join(['id'] + COLUMNAS[tabla])
+    with medir_io('leer (incremental)', f"sqlite:{tabla}") as io_:
+        df = pd.read_sql_query(
+            f"SELECT {columnas} FROM {tabla} WHERE id > ? ORDER BY id", con, params=(desde,)
+        )
+        io_['filas'] = len(df)
+    ultimo = int(df['id'].iloc[-1]) if not df.empty else desde
+    return df.drop(columns='id'), (generacion, ultimo), completo
+
+
+def _nueva_generacion(con):
+    con.execute(
+        "INSERT INTO meta (clave, valor) VALUES ('generacion', 1) "
+        "ON CONFLICT(clave) DO UPDATE SET valor = valor + 1"
+    )
+
+
+def _valor_sql(valor):
+    """Normaliza valores de pandas/numpy a tipos que acepta sqlite3"""
+    if valor is None:
+        return None
+    if hasattr(valor, 'item'):
+        valor = valor.item()
+    if isinstance(valor, float) and valor != valor:
+        return None
+    if isinstance(valor, (int, float, str)):
+        return valor
+    return str(valor)
+
+
+# ==================== MÁQUINAS Y TAREAS ====================
+
+def cargar_maquinas():
+    """Lista completa de máquinas en el orden guardado"""
+    with medir_io('leer', "sqlite:maquinas") as io_:
+        filas = conectar().execute("SELECT datos FROM maquinas ORDER BY orden").fetchall()
+        io_['filas'] = len(filas)
+    return [json.loads(datos) for (datos,) in filas]
+
+
+def guardar_maquinas(lista):
+    """Reemplaza la lista de máquinas en una transacción"""
+    con = conectar()
+    with con:
+        con.execute("DELETE FROM maquinas")
+        con.executemany(
+            "INSERT INTO maquinas (orden, nombre, datos) VALUES (?, ?, ?)",
+            [
+                (i, m.get('nombre'), json.dumps(m, ensure_ascii=False))
+                for i, m in enumerate(lista)
+            ]
+        )
+
+
+def cargar_tareas():
+    """Lista completa de tareas en el orden guardado"""
+    with medir_io('leer', "sqlite:tareas") as io_:
+        filas = conectar().execute("SELECT datos FROM tareas ORDER BY orden").fetchall()
+        io_['filas'] = len(filas)
+    return [json.loads(datos) for (datos,) in filas]
+
+
+def guardar_tareas(lista):
+    """Reemplaza la lista de tareas en una transacción"""
+    con = conectar()
+    with con:
+        _reemplazar_tareas(con, lista)
+
+
+def actualizar_tareas(funcion):
+    """Lee, modifica (``funcion(lista)``) y guarda las tareas en una transacción exclusiva"""
+    con = conectar()
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        tareas = cargar_tareas()
+        funcion(tareas)
+        _reemplazar_tareas(con, tareas)
+    except BaseException:
+        con.rollback()
+        raise
+    con.commit()
+
+
+def _reemplazar_tareas(con, lista):
+    with medir_io('reescribir', "sqlite:tareas") as io_:
+        con.execute("DELETE FROM tareas")
+        con.executemany(
+            "INSERT INTO tareas (orden, id, asignado_a, completada, datos) VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    i, t.get('id'), t.get('asignado_a'),
+                    int(bool(t.get('completada', False))),
+                    json.dumps(t, ensure_ascii=False)
+                )
+                for i, t in enumerate(lista)
+            ]
+        )
+        io_['filas'] = len(lista)
+
+
+# ==================== IMPORTACIÓN ====================
+
+def importar_desde_archivos(reemplazar=False):
+    """Copia el historial CSV/JSON actual a la base SQLite.
+
+    Las filas ocultas por bajas pendientes de compactar no se copian. Con
+    ``reemplazar`` vacía antes las tablas; sin él se niega a importar sobre
+    una base que ya tiene evaluaciones o cortes, para no duplicarlos.
+    Devuelve un dict con el número de registros importados por tabla.
+    """
+    import pandas as pd
+
+    con = conectar()
+    with con:
+        con.executescript(ESQUEMA)
+
+    existentes = sum(
+        con.execute(f"SELECT COUNT(*) FROM {tabla}").fetchone()[0]
+        for tabla in COLUMNAS
+    )
+    if existentes and not reemplazar:
+        raise RuntimeError(
+            "La base ya contiene datos; usa reemplazar=True (--reemplazar) para reimportar"
+        )
+
+    with con:
+        for tabla in ('resultados', 'payout', 'metas_payout', 'maquinas', 'tareas'):
+            con.execute(f"DELETE FROM {tabla}")
+        _nueva_generacion(con)
+
+    conteo = {}
+    for tabla, ruta, clave_baja in (
+        ('resultados', almacenamiento.ARCHIVO_RESULTADOS, 'filas_resultados'),
+        ('payout', almacenamiento.ARCHIVO_PAYOUT, 'filas_payout'),
+        ('metas_payout', almacenamiento.ARCHIVO_METAS, 'filas_metas'),
+    ):
+        if ruta.exists():
+            # Todo como texto: SQLite convierte Peso/Venta/etc. según la afinidad de la columna
+            df = pd.read_csv(ruta, encoding='utf-8-sig', dtype=str, keep_default_na=False)
+            # Sin las filas de máquinas dadas de baja y aún no compactadas
+            limites = almacenamiento._limites_baja(clave_baja)
+            if limites and not df.empty:
+                df = df[~almacenamiento._mascara_muertas(df, limites)]
+            df = df.reindex(columns=COLUMNAS[tabla])
+            filas = [
+                {c: (v if v != '' else None) for c, v in fila.items()}
+                for fila in df.to_dict('records')
+            ]
+            insertar_filas(tabla, filas)
+            conteo[tabla] = len(filas)
+        else:
+            conteo[tabla] = 0
+
+    maquinas = []
+    if almacenamiento.ARCHIVO_MAQUINAS.exists():
+        with open(almacenamiento.ARCHIVO_MAQUINAS, 'r', encoding='utf-8') as f:
+            maquinas = json.load(f)
+    guardar_maquinas(maquinas)
+    conteo['maquinas'] = len(maquinas)
+
+    tareas = []
+    if almacenamiento.ARCHIVO_TAREAS.exists():
+        with open(almacenamiento.ARCHIVO_TAREAS, 'r', encoding='utf-8') as f:
+            tareas = json.load(f)
+    guardar_tareas(tareas)
+    conteo['tareas'] = len(tareas)
+
+    return conteo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Utilidades del backend SQLite")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    imp = sub.add_parser('importar', help="Importa los CSV/JSON actuales a la base SQLite")
+    imp.add_argument('--reemplazar', action='store_true', help="Vacía la base antes de importar")
+    args = parser.parse_args()
+
+    if args.comando == 'importar':
+        try:
+            conteo = importar_desde_archivos(reemplazar=args.reemplazar)
+        except RuntimeError as e:
+            parser.exit(1, f"❌ {e}\n")
+        print(f"✅ Importado a {almacenamiento.ARCHIVO_DB}")
+        for tabla, n in conteo.items():
+            print(f"  {tabla}: {n}")
+
+
+if __name__ == "__main__":
+    main()
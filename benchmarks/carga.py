@@ -0,0 +1,286 @@
+"""Prueba de carga: muchas sesiones enviando formularios a la vez.
+
+Cada sesión simulada hace lo mismo que los manejadores de envío de la app
+sobre la capa de almacenamiento: evaluaciones (agregar_resultados con los
+criterios de su usuario y, si define la meta de payout, agregar_metas_payout), misiones (agregar_resultados + completar_tarea) y
+cortes (agregar_payout + completar_tarea). Las sesiones son hilos de un
+mismo proceso, como en el servidor de Streamlit; con ``--procesos`` se
+reparten además entre varios procesos, como réplicas sobre la misma carpeta.
+
+Todo corre sobre una carpeta de datos temporal. Al final se mide envíos por
+segundo y latencias (p50/p95/p99/máx) y se verifica que no se perdió ni
+duplicó ninguna fila ni ninguna tarea completada, y que ninguna fila del CSV
+quedó entreverada con otra:
+
+    python benchmarks/carga.py [--sesiones 48] [--envios 20] [--procesos 2]
+    QPP_BACKEND=sqlite python benchmarks/carga.py
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import queue
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+TIPOS = ['evaluacion', 'mision', 'corte']
+PATRON_MARCA = r'(carga:\d+:\d+)'
+
+
+def _almacenamiento(carpeta):
+    """Importa almacenamiento apuntando a ``carpeta`` (QPP_DATA_DIR se lee al importar)"""
+    os.environ['QPP_DATA_DIR'] = str(carpeta)
+    if str(RAIZ) not in sys.path:
+        sys.path.insert(0, str(RAIZ))
+    import almacenamiento
+    return almacenamiento
+
+
+# ==================== PLAN ====================
+
+def planificar(sesiones, envios, maquinas):
+    """Envíos de cada sesión: [(tipo, marca, máquina, id de tarea)], alternando tipos"""
+    from calificacion import CRITERIOS_ESTANDAR
+
+    usuarios = sorted({c['responsable'] for c in CRITERIOS_ESTANDAR})
+    plan = []
+    for s in range(sesiones):
+        maquina = maquinas[s % len(maquinas)]
+        envios_sesion = []
+        for n in range(envios):
+            tipo = TIPOS[(s + n) % len(TIPOS)]
+            tarea = f"carga-{s}-{n}" if tipo != 'evaluacion' else None
+            envios_sesion.append((tipo, f"carga:{s}:{n}", maquina, tarea))
+        plan.append({'usuario': usuarios[s % len(usuarios)], 'envios': envios_sesion})
+    return plan
+
+
+def preparar(almacenamiento, plan, maquinas):
+    """Crea las máquinas y las tareas pendientes que completarán las sesiones"""
+    almacenamiento.iniciar_archivos()
+    almacenamiento.save_maquinas([
+        {"nombre": m, "asignada_a": [], "foto": None, "activa": True} for m in maquinas
+    ])
+    almacenamiento.guardar_tareas([
+        {
+            'id': tarea, 'tipo': 'CORTE' if tipo == 'corte' else 'MISION',
+            'asignado_a': sesion['usuario'], 'maquina': maquina, 'titulo': marca,
+            'pregunta': "Prueba de carga", 'completada': False
+        }
+        for sesion in plan for tipo, marca, maquina, tarea in sesion['envios'] if tarea
+    ])
+
+
+# ==================== SESIONES ====================
+
+def _enviar(almacenamiento, criterios, usuario, tipo, marca, maquina, tarea):
+    """Lo que hace la app al enviar cada formulario"""
+    ahora = datetime.now()
+    if tipo == 'evaluacion':
+        almacenamiento.agregar_resultados([
+            {
+                'Maquina': maquina, 'Usuario': usuario,
+                'Criterio_ID': c['id'], 'Criterio': c['criterio'],
+                'Peso': c['peso'], 'Calificacion': 3,
+                'Comentarios': f"[{c['sub_items'][0]}: 9] {marca}",
+                'Fecha': ahora.strftime("%Y-%m-%d %H:%M")
+            }
+            for c in criterios
+        ])
+        if any(c['id'] == 2 for c in criterios):
+            almacenamiento.agregar_metas_payout([{
+                'Maquina': maquina, 'Meta_Min': 15.0, 'Meta_Max': 25.0,
+                'Usuario': usuario, 'Fecha': ahora.strftime("%Y-%m-%d %H:%M")
+            }])
+    elif tipo == 'mision':
+        almacenamiento.agregar_resultados([{
+            'Maquina': maquina, 'Usuario': usuario,
+            'Criterio_ID': 'MISION', 'Criterio': f"MISION: {marca}",
+            'Peso': 0, 'Calificacion': 3,
+            'Comentarios': f"Pregunta: Prueba de carga | Resp: {marca}",
+            'Fecha': ahora.strftime("%Y-%m-%d %H:%M")
+        }])
+        almacenamiento.completar_tarea(tarea)
+    else:
+        almacenamiento.agregar_payout([{
+            'Maquina': maquina, 'Fecha': ahora.strftime("%Y-%m-%d"), 'Semana': marca,
+            'Venta': 20000.0, 'Payout': 20.0, 'Cambios': marca
+        }])
+        almacenamiento.completar_tarea(tarea)
+
+
+def _sesion(almacenamiento, sesion, barrera, pausa, latencias):
+    from calificacion import CRITERIOS_ESTANDAR
+
+    criterios = [c for c in CRITERIOS_ESTANDAR if c['responsable'] == sesion['usuario']]
+    barrera.wait()
+    for tipo, marca, maquina, tarea in sesion['envios']:
+        inicio = time.perf_counter()
+        try:
+            _enviar(almacenamiento, criterios, sesion['usuario'], tipo, marca, maquina, tarea)
+        except Exception as e:
+            latencias.put(('error', f"{marca}: {e!r}"))
+            continue
+        latencias.put((tipo, (time.perf_counter() - inicio) * 1000))
+        if pausa:
+            time.sleep(pausa)
+
+
+def correr_sesiones(carpeta, sesiones, barrera, pausa, latencias):
+    """Corre ``sesiones`` en hilos de este proceso; vale como destino de un proceso hijo"""
+    almacenamiento = _almacenamiento(carpeta)
+    hilos = [
+        threading.Thread(target=_sesion, args=(almacenamiento, s, barrera, pausa, latencias))
+        for s in sesiones
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+
+# ==================== VERIFICACIÓN ====================
+
+def verificar(almacenamiento, plan):
+    """Lista de problemas encontrados en los datos tras la carga (vacía si todo cuadra)"""
+    from calificacion import CRITERIOS_ESTANDAR
+
+    almacenamiento.invalidar_cache()
+    problemas = []
+
+    esperadas_resultados, esperadas_payout, tareas_esperadas = {}, {}, set()
+    for sesion in plan:
+        n_criterios = sum(1 for c in CRITERIOS_ESTANDAR if c['responsable'] == sesion['usuario'])
+        for tipo, marca, _, tarea in sesion['envios']:
+            if tipo == 'corte':
+                esperadas_payout[marca] = 1
+            else:
+                esperadas_resultados[marca] = n_criterios if tipo == 'evaluacion' else 1
+            if tarea:
+                tareas_esperadas.add(tarea)
+
+    if not almacenamiento.usa_sqlite():
+        # Un anexado entreverado deja filas con otro número de campos
+        for ruta, columnas in (
+            (almacenamiento.ARCHIVO_RESULTADOS, almacenamiento.COLUMNAS_RESULTADOS),
+            (almacenamiento.ARCHIVO_PAYOUT, almacenamiento.COLUMNAS_PAYOUT),
+        ):
+            with open(ruta, encoding='utf-8-sig', newline='') as f:
+                malas = sum(1 for fila in csv.reader(f) if len(fila) != len(columnas))
+            if malas:
+                problemas.append(f"{ruta.name}: {malas} filas corruptas o entreveradas")
+
+    for nombre, leer, columna, esperadas in (
+        ('resultados', almacenamiento.leer_resultados, 'Comentarios', esperadas_resultados),
+        ('payout', almacenamiento.leer_payout, 'Cambios', esperadas_payout),
+    ):
+        try:
+            df = leer()
+        except Exception as e:
+            problemas.append(f"{nombre}: la app no puede leer el historial ({e})")
+            continue
+        conteo = df[columna].astype(str).str.extract(PATRON_MARCA)[0].value_counts().to_dict()
+        perdidas = sum(max(0, n - conteo.get(m, 0)) for m, n in esperadas.items())
+        sobrantes = sum(max(0, n - esperadas.get(m, 0)) for m, n in conteo.items())
+        if perdidas:
+            problemas.append(f"{nombre}: {perdidas} filas perdidas")
+        if sobrantes:
+            problemas.append(f"{nombre}: {sobrantes} filas duplicadas o inesperadas")
+
+    tareas = almacenamiento.cargar_tareas()
+    if len(tareas) != len(tareas_esperadas):
+        problemas.append(f"tareas: {len(tareas)} en el archivo, se esperaban {len(tareas_esperadas)}")
+    sin_completar = tareas_esperadas - {t['id'] for t in tareas if t.get('completada')}
+    if sin_completar:
+        problemas.append(f"tareas: {len(sin_completar)} completadas que se perdieron")
+    return problemas
+
+
+# ==================== REPORTE ====================
+
+def percentil(valores, p):
+    """Percentil ``p`` (0-100) por rango más cercano"""
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))]
+
+
+def reporte(latencias, segundos):
+    lineas = [f"{'Tipo':<12} {'envíos':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'máx ms':>8}"]
+    for tipo in TIPOS + ['total']:
+        valores = [ms for t, ms in latencias if t == tipo or tipo == 'total']
+        if not valores:
+            continue
+        lineas.append(
+            f"{tipo:<12} {len(valores):7d} {statistics.median(valores):8.1f} "
+            f"{percentil(valores, 95):8.1f} {percentil(valores, 99):8.1f} {max(valores):8.1f}"
+        )
+    lineas.append(f"{len(latencias)} envíos en {segundos:.2f} s: {len(latencias) / segundos:.1f} envíos/s")
+    return "\n".join(lineas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de los envíos de formularios")
+    parser.add_argument('--sesiones', type=int, default=48, help="Sesiones simultáneas")
+    parser.add_argument('--envios', type=int, default=20, help="Envíos por sesión")
+    parser.add_argument('--procesos', type=int, default=1, help="Procesos entre los que se reparten")
+    parser.add_argument('--maquinas', type=int, default=20)
+    parser.add_argument('--pausa-ms', type=float, default=0, help="Pausa entre envíos de una sesión")
+    parser.add_argument('--carpeta', help="Carpeta de datos (por defecto, una temporal)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temporal:
+        carpeta = args.carpeta or temporal
+        almacenamiento = _almacenamiento(carpeta)
+        maquinas = [f"Máquina Carga #{i:03d}" for i in range(1, args.maquinas + 1)]
+        plan = planificar(args.sesiones, args.envios, maquinas)
+        preparar(almacenamiento, plan, maquinas)
+        pausa = args.pausa_ms / 1000
+
+        grupos = [plan[i::args.procesos] for i in range(args.procesos)]
+        if args.procesos == 1:
+            latencias = queue.Queue()
+            barrera = threading.Barrier(args.sesiones + 1)
+            trabajadores = [threading.Thread(
+                target=correr_sesiones, args=(carpeta, plan, barrera, pausa, latencias)
+            )]
+        else:
+            contexto = multiprocessing.get_context('spawn')
+            latencias = contexto.Queue()
+            barrera = contexto.Barrier(args.sesiones + 1)
+            trabajadores = [
+                contexto.Process(target=correr_sesiones, args=(carpeta, g, barrera, pausa, latencias))
+                for g in grupos
+            ]
+        for trabajador in trabajadores:
+            trabajador.start()
+        barrera.wait()
+        inicio = time.perf_counter()
+
+        total = sum(len(s['envios']) for s in plan)
+        # Vaciar la cola mientras se envía: la de multiprocessing puede bloquear al hijo si se llena
+        muestras = [latencias.get() for _ in range(total)]
+        segundos = time.perf_counter() - inicio
+        for trabajador in trabajadores:
+            trabajador.join()
+
+        print(f"Backend {'sqlite' if almacenamiento.usa_sqlite() else 'csv'}, "
+              f"{args.sesiones} sesiones en {args.procesos} proceso(s)")
+        errores = [detalle for tipo, detalle in muestras if tipo == 'error']
+        muestras = [m for m in muestras if m[0] != 'error']
+        print(reporte(muestras, segundos))
+        problemas = [f"envío fallido {e}" for e in errores[:10]] + verificar(almacenamiento, plan)
+
+    if problemas:
+        print("❌ " + "\n❌ ".join(problemas))
+        sys.exit(1)
+    print("✅ Sin filas ni tareas perdidas, duplicadas o entreveradas")
+
+
+if __name__ == "__main__":
+    main()
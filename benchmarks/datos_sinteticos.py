@@ -0,0 +1,213 @@
+"""Generador de datos sintéticos con los mismos formatos que escribe la app.
+
+Crea N máquinas, M rondas de evaluación por máquina (cada ronda es una fila
+por criterio estándar, de su responsable, más una misión cada
+``CADA_MISION`` rondas) y W cortes semanales de payout por máquina, con las
+tareas CORTE/MISION correspondientes. Escribe a través de almacenamiento, así
+que el resultado es idéntico al de la app para el backend activo. Con
+``--meta-rango-legado`` la meta de payout de cada ronda va, como en versiones
+anteriores, a una fila META_RANGO del historial de payout (para probar
+``almacenamiento.py compactar-metas``):
+
+    QPP_BACKEND=sqlite python benchmarks/datos_sinteticos.py datos/ --maquinas 300 --evaluaciones 20 --semanas 104
+"""
+import argparse
+import os
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+INICIO = datetime(2024, 1, 1, 9, 0)
+CADA_MISION = 5
+# Probabilidades de sub-criterio marcado N/A y con comentario
+PROB_NO_APLICA = 0.05
+PROB_COMENTARIO = 0.2
+
+
+def _almacenamiento(carpeta):
+    """Importa almacenamiento apuntando a ``carpeta`` (QPP_DATA_DIR se lee al importar)"""
+    os.environ['QPP_DATA_DIR'] = str(carpeta)
+    if str(RAIZ) not in sys.path:
+        sys.path.insert(0, str(RAIZ))
+    import almacenamiento
+    if Path(almacenamiento.BASE_DIR) != Path(carpeta):
+        raise RuntimeError("almacenamiento ya estaba importado con otra carpeta de datos")
+    return almacenamiento
+
+
+def _id(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _fila_evaluacion(rng, maquina, criterio, fecha):
+    """Fila de resultados como la arma pagina_evaluar al enviar el formulario"""
+    from calificacion import calificar_subitems
+
+    fila = {
+        'Maquina': maquina, 'Usuario': criterio['responsable'],
+        'Criterio_ID': criterio['id'], 'Criterio': criterio['criterio'],
+        'Peso': criterio['peso'], 'Calificacion': 3,
+        'Fecha': fecha.strftime("%Y-%m-%d %H:%M")
+    }
+    if criterio['id'] == 1:
+        fila['Comentarios'] = f"Meta establecida: ${float(rng.randrange(10, 60) * 1000)}"
+        return fila
+    if criterio['id'] == 2:
+        fila['Comentarios'] = f"Meta establecida: {float(rng.randrange(150, 250)) / 10}%"
+        return fila
+
+    calificaciones = []
+    detalles = []
+    for sub_item in criterio['sub_items']:
+        if rng.random() < PROB_NO_APLICA:
+            detalles.append(f"[{sub_item}: NO APLICA]")
+            continue
+        calif = min(10, max(1, round(rng.gauss(8, 1.5))))
+        calificaciones.append(calif)
+        comentario = f"observación {rng.randrange(1000)}" if rng.random() < PROB_COMENTARIO else ''
+        detalles.append(f"[{sub_item}: {calif}{' - ' + comentario if comentario else ''}]")
+    if not calificaciones:
+        detalles.append("(Todos los sub-criterios marcados como NO APLICA)")
+    fila['Calificacion'] = calificar_subitems(calificaciones)[1]
+    fila['Comentarios'] = " ".join(detalles)
+    return fila
+
+
+def _meta_payout(maquina, usuario, comentario_meta, fecha):
+    """Rango meta que pagina_evaluar guarda al enviar el formulario"""
+    meta = float(comentario_meta.split(': ')[1].rstrip('%'))
+    return {
+        'Maquina': maquina, 'Meta_Min': meta - 5.0, 'Meta_Max': meta + 5.0,
+        'Usuario': usuario, 'Fecha': fecha.strftime("%Y-%m-%d %H:%M")
+    }
+
+
+def _meta_rango(meta):
+    """La misma meta como fila META_RANGO del historial de payout (formato anterior)"""
+    return {
+        'Maquina': meta['Maquina'], 'Fecha': meta['Fecha'][:10], 'Semana': 'META_RANGO',
+        'Venta': meta['Meta_Min'], 'Payout': meta['Meta_Max'],
+        'Cambios': f"Meta Payout definida: {meta['Meta_Min'] + 5.0}%"
+    }
+
+
+def _tarea(rng, tipo, asignado_a, maquina, titulo, pregunta, completada):
+    return {
+        'id': _id(rng), 'tipo': tipo, 'asignado_a': asignado_a, 'maquina': maquina,
+        'titulo': titulo, 'pregunta': pregunta, 'completada': completada
+    }
+
+
+def generar(carpeta, maquinas, evaluaciones, semanas, semilla=0, meta_rango_legado=False):
+    """Escribe el conjunto de datos en ``carpeta`` (vacía) y devuelve el conteo por archivo"""
+    carpeta = Path(carpeta)
+    carpeta.mkdir(parents=True, exist_ok=True)
+    if any(carpeta.iterdir()):
+        raise ValueError(f"{carpeta} no está vacía: los datos se anexarían a los existentes")
+
+    almacenamiento = _almacenamiento(carpeta)
+    from calificacion import CRITERIOS_ESTANDAR
+
+    rng = random.Random(semilla)
+    almacenamiento.iniciar_archivos()
+    evaluadores = sorted({c['responsable'] for c in CRITERIOS_ESTANDAR})
+    responsable_corte = next(c['responsable'] for c in CRITERIOS_ESTANDAR if c['id'] == 2)
+
+    nombres = [f"Máquina Sintética #{i:04d}" for i in range(1, maquinas + 1)]
+    almacenamiento.save_maquinas([
+        {"nombre": nombre, "asignada_a": evaluadores, "foto": None, "activa": True}
+        for nombre in nombres
+    ])
+
+    resultados, payout, metas, tareas = [], [], [], []
+    # Las rondas de evaluación se reparten a lo largo de las semanas de cortes
+    dias_por_ronda = max(1, semanas) * 7 / max(1, evaluaciones)
+    for ronda in range(evaluaciones):
+        fecha = INICIO + timedelta(days=ronda * dias_por_ronda)
+        for i, maquina in enumerate(nombres):
+            momento = fecha + timedelta(minutes=i)
+            for criterio in CRITERIOS_ESTANDAR:
+                fila = _fila_evaluacion(rng, maquina, criterio, momento)
+                resultados.append(fila)
+                if criterio['id'] == 2:
+                    meta = _meta_payout(maquina, fila['Usuario'], fila['Comentarios'], momento)
+                    if meta_rango_legado:
+                        payout.append(_meta_rango(meta))
+                    else:
+                        metas.append(meta)
+            if ronda % CADA_MISION == CADA_MISION - 1:
+                tarea = _tarea(
+                    rng, 'MISION', rng.choice(evaluadores), maquina, f"Revisión {ronda + 1}",
+                    "¿La máquina opera sin fallas?", True
+                )
+                tareas.append(tarea)
+                resultados.append({
+                    'Maquina': maquina, 'Usuario': tarea['asignado_a'], 'Criterio_ID': 'MISION',
+                    'Criterio': f"MISION: {tarea['titulo']}", 'Peso': 0,
+                    'Calificacion': rng.choice([1, 2, 3, 3, 3]),
+                    'Comentarios': f"Pregunta: {tarea['pregunta']} | Resp: sin novedades",
+                    'Fecha': momento.strftime("%Y-%m-%d %H:%M")
+                })
+
+    for semana in range(1, semanas + 1):
+        fecha = (INICIO + timedelta(weeks=semana)).strftime("%Y-%m-%d")
+        for maquina in nombres:
+            tareas.append(_tarea(
+                rng, 'CORTE', responsable_corte, maquina, f"Semana {semana}", "Registro de Payout", True
+            ))
+            payout.append({
+                'Maquina': maquina, 'Fecha': fecha, 'Semana': f"Semana {semana}",
+                'Venta': round(max(0.0, rng.gauss(20000, 4000)), 2),
+                'Payout': round(min(100.0, max(0.0, rng.gauss(20, 3))), 1),
+                'Cambios': "Ajuste de fuerza de garra" if rng.random() < 0.05 else ''
+            })
+
+    # Pendientes: el corte de la semana siguiente y una misión por máquina
+    for maquina in nombres:
+        tareas.append(_tarea(
+            rng, 'CORTE', responsable_corte, maquina, f"Semana {semanas + 1}", "Registro de Payout", False
+        ))
+        tareas.append(_tarea(
+            rng, 'MISION', rng.choice(evaluadores), maquina, "Revisión pendiente",
+            "Revisar el estado de la carcasa", False
+        ))
+
+    almacenamiento.guardar_tareas(tareas)
+    if resultados:
+        almacenamiento.agregar_resultados(resultados)
+    if payout:
+        almacenamiento.agregar_payout(payout)
+    almacenamiento.agregar_metas_payout(metas)
+    return {
+        'maquinas': len(nombres), 'resultados': len(resultados),
+        'payout': len(payout), 'metas': len(metas), 'tareas': len(tareas)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera datos sintéticos para benchmarks")
+    parser.add_argument('carpeta', help="Carpeta de datos de destino (vacía)")
+    parser.add_argument('--maquinas', type=int, default=100)
+    parser.add_argument('--evaluaciones', type=int, default=10, help="Rondas de evaluación por máquina")
+    parser.add_argument('--semanas', type=int, default=52, help="Cortes semanales por máquina")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--meta-rango-legado', action='store_true',
+                        help="Guarda las metas de payout como filas META_RANGO del historial de payout")
+    args = parser.parse_args()
+
+    try:
+        conteo = generar(
+            args.carpeta, args.maquinas, args.evaluaciones, args.semanas, args.semilla,
+            args.meta_rango_legado
+        )
+    except ValueError as e:
+        parser.exit(1, f"❌ {e}\n")
+    print("✅ " + ", ".join(f"{v} {k}" for k, v in conteo.items()) + f" en {args.carpeta}")
+
+
+if __name__ == "__main__":
+    main()
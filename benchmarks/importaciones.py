@@ -0,0 +1,136 @@
+"""Tiempo de importación de los módulos de la app y del primer render del login.
+
+Cada medición corre en un proceso nuevo (arranque en frío) sobre una copia de
+los módulos en una carpeta temporal, para no crear archivos de datos en el
+repositorio. Con ``--comparar`` mide también otra revisión de git:
+
+    python benchmarks/importaciones.py [--repeticiones 5] [--comparar HEAD~1]
+"""
+import argparse
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+MODULOS = ['almacenamiento', 'calificacion', 'analitica', 'importacion', 'reportes', 'api']
+PESADOS = ['pandas', 'numpy', 'pyarrow', 'plotly.graph_objects', 'plotly.express', 'plotly.io']
+
+# Importa un módulo y reporta qué paquetes pesados quedaron cargados
+SCRIPT_MODULO = """
+import sys
+import {modulo}
+print(','.join(p for p in {pesados!r} if p in sys.modules))
+"""
+
+# Primer render de la página de login (sesión nueva) con AppTest; los
+# paquetes pesados se cuentan como diferencia de sys.modules, porque AppTest
+# ya importa parte de plotly por su cuenta
+SCRIPT_LOGIN = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+antes = set(sys.modules)
+at = AppTest.from_file('qpp_streamlit.py', default_timeout=120)
+inicio = time.perf_counter()
+at.run()
+ms = (time.perf_counter() - inicio) * 1000
+nuevos = set(sys.modules) - antes
+print(json.dumps({{
+    'ms': ms,
+    'pesados': [p for p in {pesados!r} if p in nuevos],
+    'errores': [e.message for e in at.exception],
+}}))
+"""
+
+
+def copiar_modulos(destino, revision=None):
+    """Copia los .py de la app (del árbol actual o de una revisión) a ``destino``"""
+    if revision is None:
+        for ruta in RAIZ.glob('*.py'):
+            shutil.copy(ruta, destino)
+        return
+    archivo = subprocess.run(
+        ['git', 'archive', revision, '--', '*.py'], cwd=RAIZ, check=True, capture_output=True
+    ).stdout
+    subprocess.run(['tar', '-x', '-C', str(destino)], input=archivo, check=True)
+
+
+def tiempo_importacion(carpeta, modulo):
+    """(ms acumulados de ``import modulo`` según -X importtime, paquetes pesados cargados)"""
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         SCRIPT_MODULO.format(modulo=modulo, pesados=PESADOS)],
+        cwd=carpeta, capture_output=True, text=True
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {modulo}:\n{proceso.stderr[-2000:]}")
+
+    # "import time: self [us] | cumulative | imported package"; sin sangría = nivel superior
+    for linea in proceso.stderr.splitlines():
+        partes = linea.split('|')
+        if len(partes) == 3 and partes[2].rstrip() == f" {modulo}":
+            return int(partes[1]) / 1000, proceso.stdout.strip()
+    return 0.0, proceso.stdout.strip()
+
+
+def tiempo_login(carpeta):
+    """ms del primer render del login y paquetes pesados que cargó la app"""
+    proceso = subprocess.run(
+        [sys.executable, '-c', SCRIPT_LOGIN.format(pesados=PESADOS)],
+        cwd=carpeta, capture_output=True, text=True
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f"Falló el render del login:\n{proceso.stderr[-2000:]}")
+    medicion = json.loads(proceso.stdout.strip().splitlines()[-1])
+    if medicion['errores']:
+        raise RuntimeError(f"La página de login lanzó errores: {medicion['errores']}")
+    return medicion['ms'], ','.join(medicion['pesados'])
+
+
+def medir(revision, repeticiones):
+    """{nombre: (mediana ms, paquetes pesados)} de cada módulo y del login"""
+    resultados = {}
+    with tempfile.TemporaryDirectory() as carpeta:
+        copiar_modulos(carpeta, revision)
+        # Una revisión anterior puede no tener todos los módulos
+        mediciones = [
+            (m, lambda m=m: tiempo_importacion(carpeta, m))
+            for m in MODULOS if (Path(carpeta) / f"{m}.py").exists()
+        ]
+        mediciones.append(('login (primer render)', lambda: tiempo_login(carpeta)))
+        for nombre, funcion in mediciones:
+            tiempos = []
+            for _ in range(repeticiones):
+                ms, pesados = funcion()
+                tiempos.append(ms)
+            resultados[nombre] = (statistics.median(tiempos), pesados)
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempos de importación y de arranque en frío")
+    parser.add_argument('--repeticiones', type=int, default=3, help="Procesos por medición (mediana)")
+    parser.add_argument('--comparar', metavar='REVISION', help="Revisión de git para comparar")
+    args = parser.parse_args()
+
+    actual = medir(None, args.repeticiones)
+    anterior = medir(args.comparar, args.repeticiones) if args.comparar else {}
+
+    ancho = max(len(n) for n in actual)
+    encabezado = f"{'Módulo':<{ancho}}  {'ms':>8}"
+    if anterior:
+        encabezado += f"  {args.comparar:>10}  {'Δ':>7}"
+    print(encabezado + "  Carga")
+    for nombre, (ms, pesados) in sorted(actual.items(), key=lambda x: -x[1][0]):
+        linea = f"{nombre:<{ancho}}  {ms:8.1f}"
+        if anterior:
+            previo = anterior.get(nombre, (float('nan'), ''))[0]
+            linea += f"  {previo:10.1f}  {ms - previo:+7.1f}"
+        print(f"{linea}  {pesados or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Benchmark de las páginas de la app sobre datos sintéticos a varias escalas.
+
+Para cada escala genera un conjunto de datos (datos_sinteticos.py) en una
+carpeta temporal y renderiza cada página con AppTest en un proceso nuevo:
+la primera ejecución mide el arranque en frío (lectura y parseo de los datos,
+figuras sin caché) y la segunda un rerun con las cachés del proceso ya
+cargadas. Por página se reporta tiempo, memoria pico adicional (ru_maxrss) y
+bytes leídos (/proc/self/io, solo Linux; en frío incluyen el código de la app):
+
+    python benchmarks/paginas.py [--escalas chica,mediana,grande] [--json salida.json]
+    QPP_BACKEND=sqlite python benchmarks/paginas.py --escala 500,10,52
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# (máquinas, rondas de evaluación por máquina, semanas de cortes)
+ESCALAS = {
+    'chica': (20, 5, 12),
+    'mediana': (100, 10, 52),
+    'grande': (300, 20, 104),
+}
+
+# Estado de sesión que lleva a cada página; los radios van por su key
+PAGINAS = {
+    'pagina_menu': {'usuario': 'Gina', 'pagina': 'menu'},
+    'mostrar_resumen_general': {'pagina': 'dashboard', 'is_admin': True},
+    'gestionar_tareas': {'pagina': 'dashboard', 'is_admin': True, 'seccion_dashboard': "📋 Tareas"},
+    'mostrar_detalle_evaluaciones': {
+        'pagina': 'dashboard', 'is_admin': True,
+        'seccion_dashboard': "📈 Reportes", 'vista_reporte': "📊 Evaluaciones"
+    },
+    'mostrar_detalle_payout': {
+        'pagina': 'dashboard', 'is_admin': True,
+        'seccion_dashboard': "📈 Reportes", 'vista_reporte': "💰 Payout"
+    },
+}
+
+# Corre en un proceso nuevo con QPP_DATA_DIR apuntando a los datos sintéticos.
+# pandas y plotly se importan antes de medir: el tiempo en frío es el de los
+# datos, no el de importar bibliotecas (eso lo mide importaciones.py)
+SCRIPT_PAGINA = """
+import json, resource, sys, time
+sys.path.insert(0, {raiz!r})
+import pandas, plotly.graph_objects, plotly.express
+from streamlit.testing.v1 import AppTest
+
+def bytes_leidos():
+    try:
+        with open('/proc/self/io') as f:
+            return next(int(l.split()[1]) for l in f if l.startswith('rchar:'))
+    except OSError:
+        return None
+
+def memoria_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+at = AppTest.from_file({app!r}, default_timeout=600)
+for clave, valor in {estado!r}.items():
+    at.session_state[clave] = valor
+
+medicion = {{}}
+for etapa in ('frio', 'caliente'):
+    leidos, memoria = bytes_leidos(), memoria_kb()
+    inicio = time.perf_counter()
+    at.run()
+    medicion[etapa] = {{
+        'ms': (time.perf_counter() - inicio) * 1000,
+        'memoria_mb': (memoria_kb() - memoria) / 1024,
+        'bytes_leidos': None if leidos is None else bytes_leidos() - leidos,
+    }}
+medicion['errores'] = [e.message for e in at.exception]
+print(json.dumps(medicion))
+"""
+
+
+def medir_pagina(carpeta, estado):
+    """Mediciones en frío y en caliente de una página en un proceso nuevo"""
+    script = SCRIPT_PAGINA.format(
+        raiz=str(RAIZ), app=str(RAIZ / 'qpp_streamlit.py'), estado=estado
+    )
+    proceso = subprocess.run(
+        [sys.executable, '-c', script], cwd=carpeta, capture_output=True, text=True,
+        env={**os.environ, 'QPP_DATA_DIR': str(carpeta)}
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f"Falló la medición:\n{proceso.stderr[-2000:]}")
+    medicion = json.loads(proceso.stdout.strip().splitlines()[-1])
+    if medicion['errores']:
+        raise RuntimeError(f"La página lanzó errores: {medicion['errores']}")
+    return medicion
+
+
+def medir_escala(nombre, maquinas, evaluaciones, semanas, paginas):
+    """Filas del reporte de una escala: una por página"""
+    filas = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        # El generador importa almacenamiento, que fija la carpeta al importarse:
+        # cada escala se genera en su propio proceso
+        subprocess.run(
+            [sys.executable, str(RAIZ / 'benchmarks' / 'datos_sinteticos.py'), carpeta,
+             '--maquinas', str(maquinas), '--evaluaciones', str(evaluaciones),
+             '--semanas', str(semanas)],
+            check=True, capture_output=True
+        )
+        tamano = sum(p.stat().st_size for p in Path(carpeta).iterdir() if p.is_file())
+        for pagina in paginas:
+            medicion = medir_pagina(carpeta, PAGINAS[pagina])
+            filas.append({
+                'escala': nombre, 'maquinas': maquinas, 'evaluaciones': evaluaciones,
+                'semanas': semanas, 'bytes_datos': tamano, 'pagina': pagina,
+                'frio': medicion['frio'], 'caliente': medicion['caliente'],
+            })
+            print(_linea(filas[-1]), flush=True)
+    return filas
+
+
+def _kb(valor):
+    return "-" if valor is None else f"{valor / 1e3:.0f}"
+
+
+def _linea(fila):
+    frio, caliente = fila['frio'], fila['caliente']
+    return (
+        f"{fila['escala']:<10} {fila['pagina']:<30} {frio['ms']:9.0f} {caliente['ms']:9.0f} "
+        f"{frio['memoria_mb']:8.1f} {_kb(frio['bytes_leidos']):>9} {_kb(caliente['bytes_leidos']):>9}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de páginas con datos sintéticos")
+    parser.add_argument('--escalas', default='chica,mediana',
+                        help=f"Escalas separadas por coma ({', '.join(ESCALAS)})")
+    parser.add_argument('--escala', action='append', default=[], metavar='N,M,W',
+                        help="Escala propia: máquinas, rondas de evaluación, semanas (repetible)")
+    parser.add_argument('--paginas', default=','.join(PAGINAS),
+                        help="Páginas separadas por coma (por defecto todas)")
+    parser.add_argument('--json', help="Guarda las mediciones en este archivo JSON")
+    args = parser.parse_args()
+
+    try:
+        escalas = [(e, *ESCALAS[e]) for e in args.escalas.split(',') if e] if not args.escala else []
+        escalas += [
+            (f"{n}x{m}x{w}", n, m, w)
+            for n, m, w in (map(int, e.split(',')) for e in args.escala)
+        ]
+    except (KeyError, ValueError) as e:
+        parser.exit(1, f"❌ Escala inválida: {e}\n")
+    paginas = [p for p in args.paginas.split(',') if p]
+    desconocidas = set(paginas) - set(PAGINAS)
+    if desconocidas:
+        parser.exit(1, f"❌ Páginas desconocidas: {', '.join(sorted(desconocidas))}\n")
+
+    print(
+        f"{'Escala':<10} {'Página':<30} {'frío ms':>9} {'rerun ms':>9} "
+        f"{'+MB pico':>8} {'KB leídos':>9} {'rerun KB':>9}"
+    )
+    filas = []
+    for nombre, maquinas, evaluaciones, semanas in escalas:
+        filas += medir_escala(nombre, maquinas, evaluaciones, semanas, paginas)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(filas, f, indent=2, ensure_ascii=False)
+        print(f"✅ Mediciones guardadas en {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""Reglas de calificación de criterios y recalificación del historial en lote.
+
+Una evaluación normal promedia sus sub-criterios (1-10, sin contar los N/A)
+y lo convierte en 1/2/3 con los umbrales 9 y 6; el puntaje de la máquina
+pondera la última calificación de cada criterio con su peso. El formulario
+de evaluación usa estas reglas fila por fila y ``recalificar`` las vuelve a
+aplicar a todo el historial, con otros umbrales o pesos, sin reevaluar:
+
+    python calificacion.py recalificar --umbral-3 8 --umbral-2 5 --peso 3=0.25
+"""
+# Criterios de evaluación
+CRITERIOS_ESTANDAR = [
+    {
+        "id": 1, "criterio": "VENTA (Presupuesto)", "peso": 0.20, "responsable": "Leonel",
+        "sub_items": ["¿La máquina cumple o supera el presupuesto de venta?"]
+    },
+    {
+        "id": 2, "criterio": "VENTA (Payout)", "peso": 0.20, "responsable": "Gina",
+        "sub_items": ["¿La máquina cumple el payout/recaudación estipulado?"]
+    },
+    {
+        "id": 3, "criterio": "FUNCIONALIDAD", "peso": 0.20, "responsable": "Christian",
+        "sub_items": [
+            "¿El voltaje está especificado?",
+            "¿Las palancas son mecánicas?",
+            "¿Funciones operan correctamente?",
+            "¿Estabilidad encendido?",
+            "¿Sin calibración constante?",
+            "¿Sin desajustes frecuentes?"
+        ]
+    },
+    {
+        "id": 4, "criterio": "CALIDAD DE MATERIALES", "peso": 0.10, "responsable": "Eduardo",
+        "sub_items": [
+            "¿Carcasa metal?", "¿Firmeza?", "¿Ensamblaje?",
+            "¿Piezas flojas?", "¿Portacandado?", "¿Chapa alcancía?",
+            "¿Bloqueo puertas?", "¿Fuente MEAN WELL?", "¿Cables calibre 14?"
+        ]
+    },
+    {
+        "id": 5, "criterio": "LOOK & FEEL", "peso": 0.10, "responsable": "Gina",
+        "sub_items": [
+            "¿Diseño moderno?", "¿Etiquetas bien?", "¿Sin filos?",
+            "¿Estado exterior?", "¿Controles alcanzables?",
+            "¿Botones visibles?", "¿Instrucciones claras?", "¿Flujo lógico?"
+        ]
+    },
+    {
+        "id": 6, "criterio": "MANTENIMIENTO", "peso": 0.10, "responsable": "Christian",
+        "sub_items": [
+            "¿Apertura fácil?", "¿Espacio interior?",
+            "¿Refacciones comunes?", "¿Modelos identificables?",
+            "¿Manual incluido?", "¿Esquema eléctrico?"
+        ]
+    },
+    {
+        "id": 7, "criterio": "SOPORTE", "peso": 0.10, "responsable": "Daniel",
+        "sub_items": [
+            "¿Ajustes clave?",
+            "¿Disponibilidad refacciones?",
+            "¿Documentación?"
+        ]
+    }
+]
+
+# Promedio mínimo de sub-criterios para calificar 3 y para calificar 2
+UMBRALES = (9, 6)
+# % de aprobación mínimo para RECOMPRAR y para REVISAR
+UMBRALES_VEREDICTO = (80, 60)
+CALIFICACION_MAXIMA = 3
+# Calificación cuando todos los sub-criterios se marcan como NO APLICA
+CALIFICACION_TODO_NA = 3
+
+CLAVE_EVALUACION = ['Maquina', 'Usuario', 'Criterio_ID']
+
+# Comentarios guarda los sub-criterios como "[nombre: 7]", "[nombre: 7 - comentario]"
+# o "[nombre: NO APLICA]", separados por un espacio. Nombre y comentario pueden
+# traer corchetes o ": ": un sub-criterio solo empieza al inicio o tras "] " y
+# solo termina antes de " [" o del final del texto.
+_TEXTO_SUBITEM = r"(?:[^\]]|\](?! \[))*?"
+PATRON_SUBITEM = rf"(?:^|(?<=\] ))\[{_TEXTO_SUBITEM}: (10|[1-9])(?: - {_TEXTO_SUBITEM})?\](?= \[|$)"
+
+
+# ==================== CALIFICACIÓN DE UN CRITERIO ====================
+
+def calificar_subitems(calificaciones, umbrales=UMBRALES):
+    """(promedio, calificación 1-3) de las calificaciones 1-10 que aplican"""
+    if len(calificaciones) == 0:
+        return 0, CALIFICACION_TODO_NA
+    promedio = sum(calificaciones) / len(calificaciones)
+    return promedio, int(calificar_promedios(promedio, umbrales))
+
+
+def calificar_promedios(promedios, umbrales=UMBRALES):
+    """Convierte promedios 1-10 (escalar o arreglo) en calificaciones 1/2/3"""
+    import numpy as np
+
+    umbral_3, umbral_2 = umbrales
+    promedios = np.asarray(promedios, dtype=float)
+    return np.select([promedios >= umbral_3, promedios >= umbral_2], [3, 2], 1)
+
+
+def porcentaje_aprobacion(puntaje_ponderado):
+    """% de aprobación a partir del puntaje ponderado (máximo CALIFICACION_MAXIMA)"""
+    return puntaje_ponderado / CALIFICACION_MAXIMA * 100
+
+
+def veredicto(score, umbrales=UMBRALES_VEREDICTO):
+    """Conclusión ejecutiva según el % de aprobación"""
+    recomprar, revisar = umbrales
+    return "✔ RECOMPRAR" if score >= recomprar else "⚠ REVISAR" if score >= revisar else "❌ NO RECOMPRAR"
+
+
+def veredictos(scores, umbrales=UMBRALES_VEREDICTO):
+    """veredicto() de un arreglo de % de aprobación"""
+    import numpy as np
+
+    recomprar, revisar = umbrales
+    scores = np.asarray(scores, dtype=float)
+    return np.select(
+        [scores >= recomprar, scores >= revisar], ["✔ RECOMPRAR", "⚠ REVISAR"], "❌ NO RECOMPRAR"
+    )
+
+
+def simular_porcentajes(matriz, pesos):
+    """% de aprobación de cada máquina con otros pesos: un producto matriz × vector.
+
+    ``matriz`` es máquinas × criterios con la suma de las últimas
+    calificaciones (analitica.matriz_calificaciones) y ``pesos`` el peso de
+    cada columna en el mismo orden.
+    """
+    import numpy as np
+
+    return porcentaje_aprobacion(np.asarray(matriz, dtype=float) @ np.asarray(pesos, dtype=float))
+
+
+def pesos_estandar(criterios=CRITERIOS_ESTANDAR):
+    """Peso de cada criterio por Criterio_ID (texto, como en el historial)"""
+    return {str(c['id']): c['peso'] for c in criterios}
+
+
+# ==================== RECALIFICACIÓN EN LOTE ====================
+
+def promedios_subitems(comentarios):
+    """Promedio de los sub-criterios registrados en cada comentario (NaN si no hay)"""
+    notas = comentarios.astype(str).str.extractall(PATRON_SUBITEM)[0].astype(int)
+    return notas.groupby(level=0).mean().reindex(comentarios.index)
+
+
+def recalificar(df, umbrales=UMBRALES, pesos=None):
+    """Historial con Calificacion (y Peso) recalculados con otras reglas.
+
+    La calificación se recalcula desde los sub-criterios guardados en
+    Comentarios; las filas sin sub-criterios (metas de venta/payout, todo
+    N/A) conservan la suya. ``pesos`` ({Criterio_ID: peso}) reemplaza el peso
+    de los criterios indicados. Las misiones no se tocan.
+    """
+    resultado = df.reset_index(drop=True)
+    estandar = resultado['Criterio_ID'].astype(str) != 'MISION'
+
+    promedios = promedios_subitems(resultado.loc[estandar, 'Comentarios']).dropna()
+    calificacion = resultado['Calificacion'].astype(int)
+    calificacion.loc[promedios.index] = calificar_promedios(promedios.to_numpy(), umbrales)
+    resultado['Calificacion'] = calificacion
+
+    if pesos:
+        pesos = {str(k): v for k, v in pesos.items()}
+        nuevos = resultado.loc[estandar, 'Criterio_ID'].astype(str).map(pesos)
+        resultado.loc[nuevos.dropna().index, 'Peso'] = nuevos.dropna()
+    return resultado
+
+
+def puntajes_por_maquina(df):
+    """Puntaje ponderado y % de aprobación por máquina (última evaluación de cada criterio)"""
+    vigentes = (
+        df[df['Criterio_ID'].astype(str) != 'MISION']
+        .assign(Criterio_ID=lambda d: d['Criterio_ID'].astype(str))
+        .drop_duplicates(CLAVE_EVALUACION, keep='last')
+    )
+    resumen = (
+        vigentes.assign(Puntaje_Ponderado=vigentes['Calificacion'] * vigentes['Peso'])
+        .groupby('Maquina')['Puntaje_Ponderado'].sum()
+        .reset_index()
+    )
+    resumen['Porcentaje'] = porcentaje_aprobacion(resumen['Puntaje_Ponderado'])
+    return resumen
+
+
+def recalificar_puntajes(df, umbrales=UMBRALES, pesos=None):
+    """Puntajes por máquina del historial recalificado con ``umbrales`` y ``pesos``"""
+    return puntajes_por_maquina(recalificar(df, umbrales, pesos))
+
+
+def main():
+    import argparse
+
+    from almacenamiento import leer_resultados
+
+    parser = argparse.ArgumentParser(description="Recalificación del historial de evaluaciones")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    rec = sub.add_parser('recalificar', help="Puntajes por máquina con otros umbrales o pesos")
+    rec.add_argument('--umbral-3', type=float, default=UMBRALES[0], help="Promedio mínimo para 3")
+    rec.add_argument('--umbral-2', type=float, default=UMBRALES[1], help="Promedio mínimo para 2")
+    rec.add_argument('--peso', action='append', default=[], metavar='ID=PESO',
+                     help="Peso nuevo de un criterio (repetible)")
+    rec.add_argument('--salida', help="CSV de salida (por defecto se imprime)")
+    args = parser.parse_args()
+
+    if args.comando == 'recalificar':
+        try:
+            pesos = {k: float(v) for k, v in (p.split('=', 1) for p in args.peso)}
+        except ValueError:
+            parser.exit(1, "❌ --peso debe tener la forma ID=PESO, p. ej. 3=0.25\n")
+        df = leer_resultados()
+        nuevos = recalificar_puntajes(df, (args.umbral_3, args.umbral_2), pesos)
+        actuales = puntajes_por_maquina(df)[['Maquina', 'Porcentaje']]
+        comparacion = actuales.merge(
+            nuevos, on='Maquina', how='outer', suffixes=('_Actual', '')
+        ).rename(columns={'Porcentaje': 'Porcentaje_Nuevo'})
+        if args.salida:
+            comparacion.to_csv(args.salida, index=False, encoding='utf-8-sig')
+            print(f"✅ {len(comparacion)} máquinas recalificadas en {args.salida}")
+        else:
+            print(comparacion.to_string(index=False, float_format=lambda v: f"{v:.1f}"))
+
+
+if __name__ == "__main__":
+    main()
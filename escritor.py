@@ -0,0 +1,139 @@
+"""Escritura segura del historial compartido entre sesiones.
+
+- Anexados: un hilo escritor por archivo serializa las filas que llegan de
+  todas las sesiones, agrupa las que llegan juntas en una sola escritura y
+  hace un único fsync por grupo.
+- Reescrituras completas (JSON de máquinas/tareas, compactación): archivo
+  temporal + os.replace, siempre bajo el bloqueo del archivo.
+- El bloqueo combina un RLock del proceso con flock sobre ``<archivo>.lock``
+  para excluir también a otros procesos (CLI, API, otra réplica).
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo exclusión dentro del proceso
+    fcntl = None
+
+# Tiempo que el escritor espera más filas antes de escribir un grupo
+VENTANA_SEGUNDOS = 0.005
+# Tope de filas por grupo, para no retrasar indefinidamente a las primeras
+MAX_POR_GRUPO = 500
+
+_REGISTRO_LOCK = threading.Lock()
+_BLOQUEOS = {}
+_ESCRITORES = {}
+
+
+# ==================== BLOQUEO ====================
+
+def _estado_bloqueo(ruta):
+    with _REGISTRO_LOCK:
+        estado = _BLOQUEOS.get(ruta)
+        if estado is None:
+            estado = {'rlock': threading.RLock(), 'profundidad': 0, 'archivo': None}
+            _BLOQUEOS[ruta] = estado
+        return estado
+
+
+@contextmanager
+def bloqueo(ruta):
+    """Exclusión sobre ``ruta`` entre hilos y procesos (reentrante por hilo)"""
+    estado = _estado_bloqueo(ruta)
+    with estado['rlock']:
+        if estado['profundidad'] == 0 and fcntl is not None:
+            archivo = open(ruta.with_name(ruta.name + '.lock'), 'a+')
+            fcntl.flock(archivo.fileno(), fcntl.LOCK_EX)
+            estado['archivo'] = archivo
+        estado['profundidad'] += 1
+        try:
+            yield
+        finally:
+            estado['profundidad'] -= 1
+            if estado['profundidad'] == 0 and estado['archivo'] is not None:
+                fcntl.flock(estado['archivo'].fileno(), fcntl.LOCK_UN)
+                estado['archivo'].close()
+                estado['archivo'] = None
+
+
+# ==================== REESCRITURA ATÓMICA ====================
+
+def reescribir_atomico(ruta, escribir, modo='w', **kwargs_open):
+    """Reemplaza ``ruta`` de forma atómica.
+
+    ``escribir(f)`` recibe el archivo temporal abierto con ``modo`` y
+    ``kwargs_open``; al terminar se hace fsync y os.replace, todo bajo el
+    bloqueo del archivo. Devuelve lo que devuelva ``escribir``.
+    """
+    temporal = ruta.with_name(f"{ruta.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with bloqueo(ruta):
+        try:
+            with open(temporal, modo, **kwargs_open) as f:
+                resultado = escribir(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporal, ruta)
+        finally:
+            if temporal.exists():
+                temporal.unlink()
+    return resultado
+
+
+# ==================== COLA DE ANEXADOS ====================
+
+def anexar(ruta, datos):
+    """Anexa ``datos`` (bytes) al final de ``ruta`` y espera a que estén en disco"""
+    return encolar(ruta, datos).result()
+
+
+def encolar(ruta, datos):
+    """Encola ``datos`` para el escritor de ``ruta``; devuelve un Future"""
+    futuro = Future()
+    _escritor(ruta).put((datos, futuro))
+    return futuro
+
+
+def _escritor(ruta):
+    """Cola del hilo escritor de ``ruta`` (lo arranca la primera vez)"""
+    with _REGISTRO_LOCK:
+        cola = _ESCRITORES.get(ruta)
+        if cola is None:
+            cola = queue.Queue()
+            hilo = threading.Thread(
+                target=_bucle_escritor, args=(ruta, cola),
+                name=f"escritor-{ruta.name}", daemon=True
+            )
+            hilo.start()
+            _ESCRITORES[ruta] = cola
+        return cola
+
+
+def _bucle_escritor(ruta, cola):
+    """Toma grupos de la cola y los escribe con un solo write + fsync"""
+    while True:
+        grupo = [cola.get()]
+        limite = time.monotonic() + VENTANA_SEGUNDOS
+        while len(grupo) < MAX_POR_GRUPO:
+            restante = limite - time.monotonic()
+            try:
+                grupo.append(cola.get(timeout=restante) if restante > 0 else cola.get_nowait())
+            except queue.Empty:
+                break
+
+        try:
+            with bloqueo(ruta):
+                with open(ruta, 'ab') as f:
+                    f.write(b''.join(datos for datos, _ in grupo))
+                    f.flush()
+                    os.fsync(f.fileno())
+        except Exception as e:
+            for _, futuro in grupo:
+                futuro.set_exception(e)
+        else:
+            for _, futuro in grupo:
+                futuro.set_result(None)
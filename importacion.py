@@ -0,0 +1,281 @@
+"""Importación masiva de cortes semanales de payout y de evaluaciones.
+
+Todas las filas se validan juntas (operaciones vectorizadas de pandas), las
+válidas se anexan al historial en una sola escritura y las tareas CORTE
+pendientes de las mismas (máquina, semana) se cierran en una sola
+actualización del archivo de tareas. La usan la carga desde CSV/Excel del
+panel de administración, la API HTTP (api.py) y la línea de comandos:
+
+    python importacion.py cortes cortes_octubre.xlsx [--omitir-invalidos]
+"""
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from almacenamiento import (
+    COLUMNAS_METAS, COLUMNAS_PAYOUT, COLUMNAS_RESULTADOS, SEMANA_META_RANGO,
+    actualizar_tareas, agregar_metas_payout, agregar_payout, agregar_resultados,
+    get_maquinas, iniciar_archivos, leer_payout
+)
+from calificacion import CRITERIOS_ESTANDAR
+
+COLUMNAS_OBLIGATORIAS = ['Maquina', 'Semana', 'Venta', 'Payout']
+COLUMNAS_OBLIGATORIAS_EVALUACION = ['Maquina', 'Usuario', 'Criterio_ID', 'Calificacion']
+
+# Validar contra el historial y anexar deben ser una sola operación: dos
+# cargas simultáneas (p. ej. en la API) no pueden colar la misma semana.
+# Solo excluye dentro de este proceso, no entre la app y la API
+_IMPORTACION_LOCK = threading.Lock()
+
+
+# ==================== LECTURA ====================
+
+def leer_archivo_cortes(origen, nombre=None):
+    """DataFrame de cortes desde un CSV o Excel (ruta o archivo subido).
+
+    ``nombre`` decide el formato por la extensión cuando ``origen`` no es una
+    ruta (p. ej. el UploadedFile de Streamlit).
+    """
+    extension = Path(nombre or getattr(origen, 'name', None) or str(origen)).suffix.lower()
+    texto = {c: str for c in ['Maquina', 'Semana', 'Fecha', 'Cambios']}
+    if extension in ('.xlsx', '.xlsm', '.xls'):
+        try:
+            df = pd.read_excel(origen, dtype=texto)
+        except ImportError as e:
+            raise ValueError(f"Leer Excel requiere una dependencia opcional: {e}") from e
+    elif extension in ('.csv', '.txt'):
+        df = pd.read_csv(origen, dtype=texto, encoding='utf-8-sig')
+    else:
+        raise ValueError(f"Formato no soportado: '{extension}' (usa .csv o .xlsx)")
+    df.columns = [str(c).strip() for c in df.columns]
+    return df
+
+
+# ==================== VALIDACIÓN ====================
+
+def _motivos(reglas, indice):
+    """Une en un texto los motivos de las reglas (máscara, motivo) que cumple cada fila"""
+    motivos = pd.Series('', index=indice)
+    for mascara, motivo in reglas:
+        motivos = motivos.where(~mascara, motivos + '; ' + motivo)
+    return motivos.str.removeprefix('; ')
+
+
+def validar_cortes(df, maquinas, df_pay=None):
+    """Valida todas las filas de una vez.
+
+    Devuelve ``(validos, errores)``: ``validos`` con las columnas del
+    historial de payout listo para anexar, y ``errores`` con Fila (número de
+    fila en la hoja, contando el encabezado), Maquina, Semana y Motivo. Una
+    fila es inválida si la máquina no existe o está inactiva, el payout no
+    está entre 0 y 100, la venta es negativa o no numérica, falta la semana,
+    la fecha no se entiende, o la semana ya está registrada para esa máquina
+    (en ``df_pay`` o antes en el mismo archivo).
+    """
+    faltantes = [c for c in COLUMNAS_OBLIGATORIAS if c not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas obligatorias: {', '.join(faltantes)}")
+    df = df.reset_index(drop=True)
+
+    cortes = pd.DataFrame({
+        'Maquina': df['Maquina'].fillna('').astype(str).str.strip(),
+        'Semana': df['Semana'].fillna('').astype(str).str.strip(),
+        'Venta': pd.to_numeric(df['Venta'], errors='coerce'),
+        'Payout': pd.to_numeric(df['Payout'], errors='coerce'),
+        'Cambios': df['Cambios'].fillna('').astype(str) if 'Cambios' in df else '',
+    })
+    hoy = datetime.now().strftime("%Y-%m-%d")
+    if 'Fecha' in df:
+        fecha_texto = df['Fecha'].fillna('').astype(str).str.strip()
+        fecha = pd.to_datetime(fecha_texto.where(fecha_texto != ''), errors='coerce')
+        fecha_invalida = (fecha_texto != '') & fecha.isna()
+        cortes['Fecha'] = fecha.dt.strftime("%Y-%m-%d").fillna(hoy)
+    else:
+        fecha_invalida = pd.Series(False, index=df.index)
+        cortes['Fecha'] = hoy
+
+    # Claves como object: isin sobre texto de Arrow compara elemento a elemento en Python
+    clave = (cortes['Maquina'] + '\x00' + cortes['Semana']).astype(object)
+    registradas = pd.Series(dtype=object)
+    if df_pay is not None and not df_pay.empty:
+        previos = df_pay[df_pay['Semana'] != SEMANA_META_RANGO]
+        registradas = (previos['Maquina'].astype(str) + '\x00' + previos['Semana'].astype(str)).astype(object)
+
+    reglas = [
+        (~cortes['Maquina'].isin(list(maquinas)), "máquina desconocida o inactiva"),
+        (cortes['Semana'].isin(['', SEMANA_META_RANGO]), "semana vacía o reservada"),
+        (cortes['Venta'].isna(), "venta no numérica"),
+        (cortes['Venta'] < 0, "venta negativa"),
+        (cortes['Payout'].isna(), "payout no numérico"),
+        ((cortes['Payout'] < 0) | (cortes['Payout'] > 100), "payout fuera de 0-100"),
+        (fecha_invalida, "fecha no válida"),
+        (clave.isin(registradas), "semana ya registrada"),
+        (clave.duplicated(keep='first'), "semana repetida en el archivo"),
+    ]
+    motivos = _motivos(reglas, cortes.index)
+    invalidas = motivos != ''
+
+    errores = cortes.loc[invalidas, ['Maquina', 'Semana']].assign(Motivo=motivos[invalidas])
+    errores.insert(0, 'Fila', errores.index + 2)
+    return cortes.loc[~invalidas, COLUMNAS_PAYOUT].reset_index(drop=True), errores.reset_index(drop=True)
+
+
+def validar_evaluaciones(df, maquinas, criterios=CRITERIOS_ESTANDAR):
+    """Valida evaluaciones con el esquema de resultados_evaluacion.csv.
+
+    Devuelve ``(validos, errores)`` como validar_cortes. Criterio y Peso se
+    completan desde ``criterios`` si no vienen; Fecha, con la hora actual.
+    Una fila es inválida si la máquina no existe, el criterio no existe
+    (salvo 'MISION'), el usuario no es su responsable, la calificación no es
+    1, 2 o 3, el peso no está entre 0 y 1, o la fecha no se entiende.
+
+    Las evaluaciones del criterio 2 pueden traer el rango meta de payout
+    (Meta_Min y Meta_Max, juntos y con Meta_Min <= Meta_Max); ``validos``
+    incluye ambas columnas, vacías cuando la fila no trae meta.
+    """
+    faltantes = [c for c in COLUMNAS_OBLIGATORIAS_EVALUACION if c not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas obligatorias: {', '.join(faltantes)}")
+    df = df.reset_index(drop=True)
+
+    por_id = pd.DataFrame(criterios).assign(Criterio_ID=lambda d: d['id'].astype(str)).set_index('Criterio_ID')
+    evaluaciones = pd.DataFrame({
+        'Maquina': df['Maquina'].fillna('').astype(str).str.strip(),
+        'Usuario': df['Usuario'].fillna('').astype(str).str.strip(),
+        'Criterio_ID': df['Criterio_ID'].fillna('').astype(str).str.strip(),
+        'Calificacion': pd.to_numeric(df['Calificacion'], errors='coerce'),
+    })
+    ids = evaluaciones['Criterio_ID']
+    mision = ids == 'MISION'
+    criterio = df['Criterio'] if 'Criterio' in df else pd.Series(None, index=df.index, dtype=object)
+    evaluaciones['Criterio'] = criterio.fillna(ids.map(por_id['criterio'])).fillna('')
+    peso = pd.to_numeric(df['Peso'], errors='coerce') if 'Peso' in df else pd.Series(float('nan'), index=df.index)
+    evaluaciones['Peso'] = peso.fillna(ids.map(por_id['peso'])).fillna(0.0)
+    evaluaciones['Comentarios'] = df['Comentarios'].fillna('').astype(str) if 'Comentarios' in df else ''
+    ahora = datetime.now().strftime("%Y-%m-%d %H:%M")
+    if 'Fecha' in df:
+        # Mismo formato que escribe la app; 'mixed' admite fechas con y sin hora en el mismo archivo
+        fecha_texto = df['Fecha'].fillna('').astype(str).str.strip()
+        fecha = pd.to_datetime(fecha_texto.where(fecha_texto != ''), errors='coerce', format='mixed')
+        fecha_invalida = (fecha_texto != '') & fecha.isna()
+        evaluaciones['Fecha'] = fecha.dt.strftime("%Y-%m-%d %H:%M").fillna(ahora)
+    else:
+        fecha_invalida = pd.Series(False, index=df.index)
+        evaluaciones['Fecha'] = ahora
+
+    meta_invalida = pd.Series(False, index=df.index)
+    for columna in ('Meta_Min', 'Meta_Max'):
+        texto = df[columna].fillna('').astype(str).str.strip() if columna in df else pd.Series('', index=df.index)
+        evaluaciones[columna] = pd.to_numeric(texto.where(texto != ''), errors='coerce')
+        meta_invalida |= (texto != '') & evaluaciones[columna].isna()
+    con_meta = evaluaciones['Meta_Min'].notna() | evaluaciones['Meta_Max'].notna()
+
+    responsable = ids.map(por_id['responsable'])
+    reglas = [
+        (~evaluaciones['Maquina'].isin(list(maquinas)), "máquina desconocida o inactiva"),
+        (evaluaciones['Usuario'] == '', "usuario vacío"),
+        (~mision & responsable.isna(), "criterio desconocido"),
+        (responsable.notna() & (responsable != evaluaciones['Usuario']), "el usuario no es responsable del criterio"),
+        (~evaluaciones['Calificacion'].isin([1, 2, 3]), "calificación fuera de 1/2/3"),
+        ((evaluaciones['Peso'] < 0) | (evaluaciones['Peso'] > 1), "peso fuera de 0-1"),
+        (fecha_invalida, "fecha no válida"),
+        (meta_invalida, "meta no numérica"),
+        (con_meta & (evaluaciones['Meta_Min'].isna() | evaluaciones['Meta_Max'].isna()),
+         "Meta_Min y Meta_Max van juntas"),
+        (evaluaciones['Meta_Min'] > evaluaciones['Meta_Max'], "Meta_Min mayor que Meta_Max"),
+        (con_meta & (ids != '2'), "la meta de payout solo va con el criterio 2"),
+    ]
+    motivos = _motivos(reglas, evaluaciones.index)
+    invalidas = motivos != ''
+
+    evaluaciones['Calificacion'] = evaluaciones['Calificacion'].fillna(0).astype(int)
+    errores = evaluaciones.loc[invalidas, ['Maquina', 'Usuario', 'Criterio_ID']].assign(Motivo=motivos[invalidas])
+    errores.insert(0, 'Fila', errores.index + 2)
+    return (
+        evaluaciones.loc[~invalidas, COLUMNAS_RESULTADOS + ['Meta_Min', 'Meta_Max']].reset_index(drop=True),
+        errores.reset_index(drop=True)
+    )
+
+
+# ==================== IMPORTACIÓN ====================
+
+def cerrar_tareas_corte(cortes):
+    """Completa las tareas CORTE pendientes de (Maquina, Semana) en una sola actualización"""
+    pares = set(zip(cortes['Maquina'], cortes['Semana']))
+    cerradas = []
+
+    def marcar(tareas):
+        for t in tareas:
+            if (t.get('tipo') == 'CORTE' and not t.get('completada', False)
+                    and (t.get('maquina'), t.get('titulo')) in pares):
+                t['completada'] = True
+                cerradas.append(t['id'])
+
+    if pares:
+        actualizar_tareas(marcar)
+    return cerradas
+
+
+def importar_cortes(df, omitir_invalidos=False):
+    """Valida e importa cortes; devuelve ``(importados, errores, tareas_cerradas)``.
+
+    Si hay filas inválidas y no se pide ``omitir_invalidos`` no se importa
+    nada, para que el archivo se corrija y se vuelva a subir completo.
+    """
+    maquinas = [m['nombre'] for m in get_maquinas("ADMIN")]
+    with _IMPORTACION_LOCK:
+        validos, errores = validar_cortes(df, maquinas, leer_payout())
+        if validos.empty or (not errores.empty and not omitir_invalidos):
+            return 0, errores, []
+        agregar_payout(validos.to_dict('records'))
+    return len(validos), errores, cerrar_tareas_corte(validos)
+
+
+def importar_evaluaciones(df, omitir_invalidos=False):
+    """Valida e importa evaluaciones y sus metas de payout; devuelve ``(importadas, errores)``"""
+    maquinas = [m['nombre'] for m in get_maquinas("ADMIN")]
+    validos, errores = validar_evaluaciones(df, maquinas)
+    if validos.empty or (not errores.empty and not omitir_invalidos):
+        return 0, errores
+    agregar_resultados(validos[COLUMNAS_RESULTADOS].to_dict('records'))
+    metas = validos.dropna(subset=['Meta_Min', 'Meta_Max'])
+    agregar_metas_payout(metas[COLUMNAS_METAS].to_dict('records'))
+    return len(validos), errores
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Importación masiva de datos")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    cortes = sub.add_parser('cortes', help="Importa cortes semanales desde CSV o Excel")
+    cortes.add_argument('archivo', help="Archivo .csv o .xlsx con Maquina, Semana, Venta, Payout")
+    cortes.add_argument('--omitir-invalidos', action='store_true',
+                        help="Importa las filas válidas aunque haya inválidas")
+    args = parser.parse_args()
+
+    if args.comando == 'cortes':
+        try:
+            df = leer_archivo_cortes(args.archivo)
+            iniciar_archivos()
+            importados, errores, cerradas = importar_cortes(df, args.omitir_invalidos)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            parser.exit(1, f"❌ {e}\n")
+        if not errores.empty:
+            print(f"⚠ {len(errores)} filas inválidas:")
+            print(errores.to_string(index=False))
+        if importados:
+            print(f"✅ {importados} cortes importados, {len(cerradas)} tareas de corte cerradas")
+        elif not errores.empty and not args.omitir_invalidos:
+            parser.exit(1, "❌ No se importó nada (usa --omitir-invalidos para importar las filas válidas)\n")
+        elif not errores.empty:
+            parser.exit(1, "❌ No hay filas válidas para importar\n")
+        else:
+            print("Sin filas para importar")
+
+
+if __name__ == "__main__":
+    main()
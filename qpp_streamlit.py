@@ -1,14 +1,24 @@
 import streamlit as st
-import pandas as pd
-import json
-import os
 from datetime import datetime
-import plotly.graph_objects as go
-import plotly.express as px
-from pathlib import Path
-import io
 import base64
-import plotly.io as pio
+import os
+import tempfile
+from almacenamiento import (
+    UPLOAD_FOLDER, iniciar_archivos, get_maquinas, save_maquinas,
+    cargar_tareas, agregar_tarea, completar_tarea, leer_resultados, leer_payout, hay_resultados,
+    agregar_resultados, agregar_payout, eliminar_datos_maquina,
+    usa_sqlite, estado_compactacion, compactar, huella_datos,
+    SEMANA_META_RANGO, agregar_metas_payout,
+    contar_metas_rango, compactar_metas_rango
+)
+from rendimiento import cronometrado
+from calificacion import (
+    CRITERIOS_ESTANDAR, UMBRALES_VEREDICTO, calificar_subitems, porcentaje_aprobacion,
+    simular_porcentajes, veredictos
+)
+
+# pandas, plotly, reportes, analitica e importacion se importan dentro de las
+# páginas que los usan: login y menú no los cargan (ver benchmarks/importaciones.py)
 
 # ==================== CONFIGURACIÓN ====================
 st.set_page_config(
@@ -18,14 +28,6 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-BASE_DIR = Path(__file__).parent
-ARCHIVO_RESULTADOS = BASE_DIR / 'resultados_evaluacion.csv'
-ARCHIVO_MAQUINAS = BASE_DIR / 'maquinas.json'  # Cambiado a JSON para más flexibilidad
-ARCHIVO_TAREAS = BASE_DIR / 'tareas.json'
-ARCHIVO_PAYOUT = BASE_DIR / 'historial_payout.csv'
-UPLOAD_FOLDER = BASE_DIR / 'static' / 'uploads'
-UPLOAD_FOLDER.mkdir(parents=True, exist_ok=True)
-
 # Usuarios y sus roles
 USUARIOS = {
     "Leonel": {"rol": "Ventas", "password": None},
@@ -37,136 +39,32 @@ USUARIOS = {
 
 ADMIN_PASSWORD = "181025"
 
-# Criterios de evaluación
-CRITERIOS_ESTANDAR = [
-    {
-        "id": 1, "criterio": "VENTA (Presupuesto)", "peso": 0.20, "responsable": "Leonel",
-        "sub_items": ["¿La máquina cumple o supera el presupuesto de venta?"]
-    },
-    {
-        "id": 2, "criterio": "VENTA (Payout)", "peso": 0.20, "responsable": "Gina",
-        "sub_items": ["¿La máquina cumple el payout/recaudación estipulado?"]
-    },
-    {
-        "id": 3, "criterio": "FUNCIONALIDAD", "peso": 0.20, "responsable": "Christian",
-        "sub_items": [
-            "¿El voltaje está especificado?",
-            "¿Las palancas son mecánicas?",
-            "¿Funciones operan correctamente?",
-            "¿Estabilidad encendido?",
-            "¿Sin calibración constante?",
-            "¿Sin desajustes frecuentes?"
-        ]
-    },
-    {
-        "id": 4, "criterio": "CALIDAD DE MATERIALES", "peso": 0.10, "responsable": "Eduardo",
-        "sub_items": [
-            "¿Carcasa metal?", "¿Firmeza?", "¿Ensamblaje?",
-            "¿Piezas flojas?", "¿Portacandado?", "¿Chapa alcancía?",
-            "¿Bloqueo puertas?", "¿Fuente MEAN WELL?", "¿Cables calibre 14?"
-        ]
-    },
-    {
-        "id": 5, "criterio": "LOOK & FEEL", "peso": 0.10, "responsable": "Gina",
-        "sub_items": [
-            "¿Diseño moderno?", "¿Etiquetas bien?", "¿Sin filos?",
-            "¿Estado exterior?", "¿Controles alcanzables?",
-            "¿Botones visibles?", "¿Instrucciones claras?", "¿Flujo lógico?"
-        ]
-    },
-    {
-        "id": 6, "criterio": "MANTENIMIENTO", "peso": 0.10, "responsable": "Christian",
-        "sub_items": [
-            "¿Apertura fácil?", "¿Espacio interior?",
-            "¿Refacciones comunes?", "¿Modelos identificables?",
-            "¿Manual incluido?", "¿Esquema eléctrico?"
-        ]
-    },
-    {
-        "id": 7, "criterio": "SOPORTE", "peso": 0.10, "responsable": "Daniel",
-        "sub_items": [
-            "¿Ajustes clave?",
-            "¿Disponibilidad refacciones?",
-            "¿Documentación?"
-        ]
-    }
-]
-
 # ==================== FUNCIONES AUXILIARES ====================
 
-def iniciar_archivos():
-    """Inicializa archivos si no existen"""
-    if not ARCHIVO_RESULTADOS.exists():
-        pd.DataFrame(columns=[
-            'Maquina', 'Usuario', 'Criterio_ID', 'Criterio',
-            'Peso', 'Calificacion', 'Comentarios', 'Fecha'
-        ]).to_csv(ARCHIVO_RESULTADOS, index=False, encoding='utf-8-sig')
-    
-    if not ARCHIVO_PAYOUT.exists():
-        pd.DataFrame(columns=[
-            'Maquina', 'Fecha', 'Semana', 'Venta', 'Payout', 'Cambios'
-        ]).to_csv(ARCHIVO_PAYOUT, index=False, encoding='utf-8-sig')
-    
-    if not ARCHIVO_MAQUINAS.exists():
-        maquinas_default = [
-            {
-                "nombre": "Clip Machine 4P - #001",
-                "asignada_a": ["Leonel", "Gina"],  # Nueva propiedad
-                "foto": None,
-                "activa": True
-            }
-        ]
-        with open(ARCHIVO_MAQUINAS, 'w', encoding='utf-8') as f:
-            json.dump(maquinas_default, f, indent=4, ensure_ascii=False)
-    
-    if not ARCHIVO_TAREAS.exists():
-        with open(ARCHIVO_TAREAS, 'w', encoding='utf-8') as f:
-            json.dump([], f, indent=4)
-
-def get_maquinas(usuario=None):
-    """Obtiene lista de máquinas, filtradas por usuario si se especifica"""
-    with open(ARCHIVO_MAQUINAS, 'r', encoding='utf-8') as f:
-        maquinas = json.load(f)
-    
-    if usuario and usuario != "ADMIN":
-        # Filtrar solo máquinas asignadas al usuario
-        maquinas = [m for m in maquinas if usuario in m.get('asignada_a', [])]
-    
-    return [m for m in maquinas if m.get('activa', True)]
-
-def save_maquinas(lista):
-    """Guarda lista de máquinas"""
-    with open(ARCHIVO_MAQUINAS, 'w', encoding='utf-8') as f:
-        json.dump(lista, f, indent=4, ensure_ascii=False)
-
-def cargar_tareas():
-    """Carga tareas desde archivo"""
-    if not ARCHIVO_TAREAS.exists():
-        return []
-    with open(ARCHIVO_TAREAS, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-def guardar_tareas(lista):
-    """Guarda tareas en archivo"""
-    with open(ARCHIVO_TAREAS, 'w', encoding='utf-8') as f:
-        json.dump(lista, f, indent=4, ensure_ascii=False)
-
-def generar_grafica_payout(df_maquina):
-    """Genera gráfica interactiva de Payout con Plotly - VERSIÓN MEJORADA"""
+# Fragmentos: la interacción dentro de una sección re-ejecuta solo esa sección
+# (st.fragment desde Streamlit 1.37; en versiones anteriores no hay efecto)
+fragmento = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda f: f)
+
+@cronometrado
+def generar_grafica_payout(df_maquina, rango=None, max_puntos=None):
+    """Genera gráfica interactiva de Payout con Plotly - VERSIÓN MEJORADA
+
+    Con más de ``max_puntos`` cortes la serie se reduce (LTTB) conservando
+    siempre los cortes fuera del rango ideal; ``max_puntos=None`` grafica todos.
+    """
+    import pandas as pd
+    import plotly.graph_objects as go
+    from analitica import rango_payout
+    from reportes import reducir_serie, traza_dispersion
+
     if df_maquina.empty:
         return None
     
-    # Obtener rango objetivo
-    fila_rango = df_maquina[df_maquina['Semana'] == 'META_RANGO']
-    target_min = 18.0
-    target_max = 22.0
-    
-    if not fila_rango.empty:
-        target_min = float(fila_rango.iloc[-1]['Venta'])
-        target_max = float(fila_rango.iloc[-1]['Payout'])
+    # Obtener rango objetivo (índice de metas)
+    target_min, target_max = rango or rango_payout(df_maquina['Maquina'].iloc[0])
     
     # Datos reales
-    datos = df_maquina[df_maquina['Semana'] != 'META_RANGO'].copy()
+    datos = df_maquina[df_maquina['Semana'] != SEMANA_META_RANGO].copy()
     if datos.empty:
         return None
     
@@ -174,6 +72,12 @@ def generar_grafica_payout(df_maquina):
     datos['Fecha'] = pd.to_datetime(datos['Fecha'])
     datos = datos.sort_values('Fecha')
     
+    total_cortes = len(datos)
+    payout = datos['Payout'].astype(float)
+    fuera_de_rango = (payout < target_min) | (payout > target_max)
+    datos = datos.iloc[reducir_serie(payout, max_puntos, conservar=fuera_de_rango)]
+    Traza = traza_dispersion(len(datos))
+    
     semanas = datos['Semana'].tolist()
     porcentajes = datos['Payout'].astype(float).tolist()
     ventas = datos['Venta'].astype(float).tolist()
@@ -193,7 +97,7 @@ def generar_grafica_payout(df_maquina):
     # Línea de Payout (eje izquierdo)
     colores = ['red' if (p < target_min or p > target_max) else '#28a745' for p in porcentajes]
     
-    fig.add_trace(go.Scatter(
+    fig.add_trace(Traza(
         x=semanas, y=porcentajes,
         mode='lines+markers',
         name='Payout (%)',
@@ -204,7 +108,7 @@ def generar_grafica_payout(df_maquina):
     ))
     
     # Línea de Ventas (eje derecho)
-    fig.add_trace(go.Scatter(
+    fig.add_trace(Traza(
         x=semanas, y=ventas,
         mode='lines+markers',
         name='Ventas ($)',
@@ -214,21 +118,23 @@ def generar_grafica_payout(df_maquina):
         yaxis='y2'
     ))
     
+    titulo = "Comportamiento de Payout vs Ventas"
+    if len(datos) < total_cortes:
+        titulo += f" ({len(datos)} de {total_cortes} cortes)"
+    
     fig.update_layout(
         title={
-            'text': "Comportamiento de Payout vs Ventas",
+            'text': titulo,
             'x': 0.5,
             'xanchor': 'center'
         },
         xaxis=dict(title="Semana", tickangle=-45),
         yaxis=dict(
-            title="Payout (%)",
-            titlefont=dict(color="#007bff"),
+            title=dict(text="Payout (%)", font=dict(color="#007bff")),
             tickfont=dict(color="#007bff")
         ),
         yaxis2=dict(
-            title="Ventas ($)",
-            titlefont=dict(color="#ffc107"),
+            title=dict(text="Ventas ($)", font=dict(color="#ffc107")),
             tickfont=dict(color="#ffc107"),
             overlaying='y',
             side='right'
@@ -245,8 +151,76 @@ def generar_grafica_payout(df_maquina):
     )
     
     return fig
+
+
+# Figuras memoizadas por (máquina, huella de los datos[, rango objetivo]):
+# cambiar de vista o volver a elegir la máquina reutiliza la figura ya
+# construida. cache_resource no copia el resultado (reconstruir una figura
+# desde JSON cuesta lo mismo que generarla), así que nadie debe modificarlas;
+# max_entries acota la caché y desaloja la menos usada.
+MAX_FIGURAS = 128
+
+
+@st.cache_resource(max_entries=MAX_FIGURAS, show_spinner=False)
+def grafica_payout(maquina, huella, rango, max_puntos, _df_pay):
+    """generar_grafica_payout memoizada"""
+    return generar_grafica_payout(_df_pay, rango, max_puntos)
+
+
+@st.cache_resource(max_entries=MAX_FIGURAS, show_spinner=False)
+def grafica_radar(maquina, huella, _agrupado):
+    """Radar de criterios memoizado"""
+    from reportes import figura_radar
+
+    return figura_radar(_agrupado)
+
+
+@st.cache_resource(max_entries=MAX_FIGURAS, show_spinner=False)
+def grafica_historico_payout(maquina, huella, _df_pay):
+    """Histórico de payout del One Page memoizado"""
+    from reportes import figura_historico_payout
+
+    return figura_historico_payout(_df_pay)
+
+
+def exportacion_solicitada(tipo, maquina, huella, etiqueta):
+    """True si el usuario ya pidió esta exportación para esta versión de los datos"""
+    clave = (tipo, maquina, huella)
+    preparadas = st.session_state.setdefault('exportaciones', set())
+    if clave in preparadas:
+        return True
+    if st.button(etiqueta, key=f"preparar_{tipo}_{maquina}"):
+        preparadas.add(clave)
+        return True
+    return False
+
+
+@st.cache_data(max_entries=64, show_spinner="Generando Excel...")
+def excel_maquina(maquina, huella, _df_eval, _df_pay):
+    """Excel de una máquina; cacheado por (máquina, huella de los datos)"""
+    from reportes import generar_excel_maquina
+
+    return generar_excel_maquina(_df_eval, _df_pay)
+
+
+@st.cache_data(max_entries=64, show_spinner="Generando One Page...")
+def onepage_maquina(maquina, huella, score, _fig_radar, _df_pay):
+    """One Page de una máquina; cacheado por (máquina, huella de los datos)"""
+    from reportes import crear_onepage
+
+    fig_payout = grafica_historico_payout(maquina, huella_datos(_df_pay), _df_pay)
+    return crear_onepage(maquina, score, _fig_radar, fig_payout)
+
 # ==================== INICIALIZACIÓN ====================
-iniciar_archivos()
+
+@st.cache_resource(show_spinner=False)
+def inicializar():
+    """Crea carpetas y archivos de datos una sola vez por proceso, no en cada rerun"""
+    iniciar_archivos()
+    return True
+
+
+inicializar()
 
 # ==================== ESTADO DE SESIÓN ====================
 if 'usuario' not in st.session_state:
@@ -258,6 +232,7 @@ if 'pagina' not in st.session_state:
 
 # ==================== PÁGINAS ====================
 
+@cronometrado
 def pagina_login():
     """Página de inicio de sesión"""
     st.title("🎰 Sistema de Evaluación de Máquinas")
@@ -285,6 +260,7 @@ def pagina_login():
             st.session_state.pagina = 'admin_login'
             st.rerun()
 
+@cronometrado
 def pagina_admin_login():
     """Página de login de administrador"""
     st.title("🔐 Panel de Dirección")
@@ -310,6 +286,7 @@ def pagina_admin_login():
                 st.session_state.pagina = 'login'
                 st.rerun()
 
+@cronometrado
 def pagina_menu():
     """Página de menú principal para usuarios"""
     usuario = st.session_state.usuario
@@ -352,13 +329,10 @@ def pagina_menu():
                                 'Payout': payout,
                                 'Cambios': cambios
                             }
-                            pd.DataFrame([nuevo_corte]).to_csv(
-                                ARCHIVO_PAYOUT, mode='a', header=False, index=False, encoding='utf-8-sig'
-                            )
+                            agregar_payout([nuevo_corte])
                             
                             # Marcar tarea como completada
-                            tarea['completada'] = True
-                            guardar_tareas(todas_tareas)
+                            completar_tarea(tarea['id'])
                             
                             st.success("✅ Corte registrado")
                             st.rerun()
@@ -400,6 +374,7 @@ def pagina_menu():
                     st.session_state.pagina = 'evaluar'
                     st.rerun()
 
+@cronometrado
 def pagina_evaluar():
     """Página de evaluación de máquina"""
     maquina = st.session_state.maquina_actual
@@ -422,6 +397,7 @@ def pagina_evaluar():
     
     with st.form("form_evaluacion"):
         datos_evaluacion = []
+        metas_payout = []
         
         for criterio in mis_criterios:
             st.markdown(f"## {criterio['criterio']}")
@@ -447,18 +423,14 @@ def pagina_evaluar():
                     min_value=0.0, max_value=100.0, step=0.1, key=f"meta_{criterio['id']}"
                 )
                 
-                # Guardar rango en archivo payout
-                payout_row = {
+                # Rango ideal de la máquina: se guarda solo al enviar el formulario
+                metas_payout.append({
                     'Maquina': maquina,
-                    'Fecha': datetime.now().strftime("%Y-%m-%d"),
-                    'Semana': 'META_RANGO',
-                    'Venta': meta - 5.0,  # Min
-                    'Payout': meta + 5.0,  # Max
-                    'Cambios': f"Meta Payout definida: {meta}%"
-                }
-                pd.DataFrame([payout_row]).to_csv(
-                    ARCHIVO_PAYOUT, mode='a', header=False, index=False, encoding='utf-8-sig'
-                )
+                    'Meta_Min': meta - 5.0,
+                    'Meta_Max': meta + 5.0,
+                    'Usuario': usuario,
+                    'Fecha': datetime.now().strftime("%Y-%m-%d %H:%M")
+                })
                 
                 datos_evaluacion.append({
                     'Maquina': maquina, 'Usuario': usuario,
@@ -518,18 +490,9 @@ def pagina_evaluar():
                         detalles.append(f"[{sub_item}: {calif}{' - ' + comentario if comentario else ''}]")
 
                 # Calcular calificación general
+                promedio, calif_final = calificar_subitems(calificaciones)
                 if len(calificaciones) == 0:
-                    calif_final = 3  # O dime si lo quieres en 0
-                    promedio = 0
                     detalles.append("(Todos los sub-criterios marcados como NO APLICA)")
-                else:
-                    promedio = sum(calificaciones) / len(calificaciones)
-                    if promedio >= 9:
-                        calif_final = 3
-                    elif promedio >= 6:
-                        calif_final = 2
-                    else:
-                        calif_final = 1
 
                 st.markdown(f"**Promedio:** {promedio:.1f} → **Calificación:** {calif_final}")
 
@@ -546,13 +509,13 @@ def pagina_evaluar():
         
         if st.form_submit_button("💾 Guardar Evaluación", use_container_width=True):
             if datos_evaluacion:
-                pd.DataFrame(datos_evaluacion).to_csv(
-                    ARCHIVO_RESULTADOS, mode='a', header=False, index=False, encoding='utf-8-sig'
-                )
+                agregar_resultados(datos_evaluacion)
+                agregar_metas_payout(metas_payout)
                 st.success("✅ Evaluación guardada correctamente")
                 st.session_state.pagina = 'menu'
                 st.rerun()
 
+@cronometrado
 def pagina_mision():
     """Página para completar misión"""
     tarea = st.session_state.tarea_actual
@@ -586,16 +549,10 @@ def pagina_mision():
                 'Fecha': datetime.now().strftime("%Y-%m-%d %H:%M")
             }
             
-            pd.DataFrame([nuevo]).to_csv(
-                ARCHIVO_RESULTADOS, mode='a', header=False, index=False, encoding='utf-8-sig'
-            )
+            agregar_resultados([nuevo])
             
             # Marcar como completada
-            todas_tareas = cargar_tareas()
-            for t in todas_tareas:
-                if t['id'] == tarea['id']:
-                    t['completada'] = True
-            guardar_tareas(todas_tareas)
+            completar_tarea(tarea['id'])
             
             st.success("✅ Misión completada")
             st.session_state.pagina = 'menu'
@@ -605,6 +562,7 @@ def pagina_mision():
         st.session_state.pagina = 'menu'
         st.rerun()
 
+@cronometrado
 def pagina_dashboard():
     """Dashboard administrativo"""
     st.title("🚀 Panel de Dirección")
@@ -617,68 +575,76 @@ def pagina_dashboard():
             st.session_state.pagina = 'login'
             st.rerun()
     
-    # Tabs principales
-    tab1, tab2, tab3, tab4 = st.tabs(["📊 Resumen", "🎰 Máquinas", "📋 Tareas", "📈 Reportes"])
-    
-    with tab1:
-        mostrar_resumen_general()
-    
-    with tab2:
-        gestionar_maquinas()
-    
-    with tab3:
-        gestionar_tareas()
+    # Secciones principales: st.tabs ejecutaría las cuatro en cada clic,
+    # así que solo se calcula la sección seleccionada
+    secciones = {
+        "📊 Resumen": mostrar_resumen_general,
+        "🎰 Máquinas": gestionar_maquinas,
+        "📋 Tareas": gestionar_tareas,
+        "📈 Reportes": mostrar_reportes_detallados,
+        "💰 Payout Flota": mostrar_payout_flota,
+        "🧪 Simulador": mostrar_simulador_pesos,
+        "⏱️ Rendimiento": mostrar_rendimiento,
+    }
+    seccion = st.radio(
+        "Sección", list(secciones), horizontal=True,
+        key="seccion_dashboard", label_visibility="collapsed"
+    )
     
-    with tab4:
-        mostrar_reportes_detallados()
+    secciones[seccion]()
 
+@fragmento
+@cronometrado
 def mostrar_resumen_general():
     """Muestra resumen general de evaluaciones"""
-    if not ARCHIVO_RESULTADOS.exists():
-        st.info("No hay evaluaciones registradas aún")
-        return
-    
-    df = pd.read_csv(ARCHIVO_RESULTADOS, encoding='utf-8-sig')
-    
-    if df.empty:
+    import plotly.express as px
+    from analitica import (
+        matriz_progreso, tabla_matriz_progreso, criterios_pendientes,
+        agregados_por_maquina, reconstruir_agregados, ultimas_evaluaciones
+    )
+
+    if not hay_resultados():
         st.info("No hay evaluaciones registradas aún")
         return
     
-    # Gráfica de rendimiento general
-    df_std = df[df['Criterio_ID'] != 'MISION'].copy()
+    # Gráfica de rendimiento general (agregados precalculados)
+    resumen = agregados_por_maquina()
     
-    if not df_std.empty:
-        df_std['Puntaje_Ponderado'] = df_std['Calificacion'] * df_std['Peso']
-        resumen = df_std.groupby('Maquina')['Puntaje_Ponderado'].sum().reset_index()
-        resumen['Porcentaje'] = (resumen['Puntaje_Ponderado'] / 3.0) * 100
-        
+    if not resumen.empty:
         fig = px.bar(
             resumen, x='Maquina', y='Porcentaje',
             title="Rendimiento General (% Aprobación)",
             labels={'Porcentaje': '% Aprobación', 'Maquina': 'Máquina'}
         )
         st.plotly_chart(fig, use_container_width=True)
+        
+        if st.button("🔄 Recalcular agregados", key="btn_recalcular_agregados",
+                     help="Reconstruye los puntajes desde el historial completo"):
+            reconstruir_agregados()
+            st.rerun()
     
     # Matriz de progreso
     st.subheader("Matriz de Progreso")
     
     maquinas_lista = [m['nombre'] for m in get_maquinas()]
-    matriz_data = []
-    
-    for maquina in maquinas_lista:
-        fila = {'Máquina': maquina}
-        for usuario in USUARIOS.keys():
-            evaluaciones = df[
-                (df['Maquina'] == maquina) &
-                (df['Usuario'] == usuario) &
-                (df['Criterio_ID'] != 'MISION')
-            ]
-            fila[usuario] = '✅' if not evaluaciones.empty else '⏳'
-        matriz_data.append(fila)
-    
-    if matriz_data:
-        st.dataframe(pd.DataFrame(matriz_data), use_container_width=True)
+    
+    if maquinas_lista:
+        # Basta con la última evaluación de cada criterio, no todo el historial
+        ultimas = ultimas_evaluaciones()
+        progreso = matriz_progreso(ultimas, maquinas_lista, USUARIOS.keys(), CRITERIOS_ESTANDAR)
+        st.dataframe(tabla_matriz_progreso(progreso), use_container_width=True)
+        st.caption("✅ fecha de la última evaluación | ⏳ % de criterios evaluados | — sin criterios asignados")
+        
+        pendientes = criterios_pendientes(ultimas, maquinas_lista, CRITERIOS_ESTANDAR)
+        if not pendientes.empty:
+            with st.expander(f"📋 Criterios pendientes ({len(pendientes)})"):
+                st.dataframe(
+                    pendientes.rename(columns={'Maquina': 'Máquina', 'Usuario': 'Responsable'}),
+                    use_container_width=True, hide_index=True
+                )
 
+@fragmento
+@cronometrado
 def gestionar_maquinas():
     """Gestión de máquinas"""
     st.subheader("Gestión de Máquinas")
@@ -754,22 +720,50 @@ def gestionar_maquinas():
                     maquina['activa'] = False
                     save_maquinas(maquinas)
 
-                    # Borrar evaluaciones de esa máquina
-                    if ARCHIVO_RESULTADOS.exists():
-                        df_res = pd.read_csv(ARCHIVO_RESULTADOS, encoding='utf-8-sig')
-                        df_res = df_res[df_res['Maquina'] != nombre_maq]
-                        df_res.to_csv(ARCHIVO_RESULTADOS, index=False, encoding='utf-8-sig')
-
-                    # Borrar payout de esa máquina
-                    if ARCHIVO_PAYOUT.exists():
-                        df_pay = pd.read_csv(ARCHIVO_PAYOUT, encoding='utf-8-sig')
-                        df_pay = df_pay[df_pay['Maquina'] != nombre_maq]
-                        df_pay.to_csv(ARCHIVO_PAYOUT, index=False, encoding='utf-8-sig')
+                    # Borrar evaluaciones y payout de esa máquina
+                    eliminar_datos_maquina(nombre_maq)
 
                     st.success(f"Máquina '{nombre_maq}' eliminada completamente")
                     st.rerun()
 
+    # Compactación del historial (las bajas solo ocultan filas hasta compactar)
+    if not usa_sqlite():
+        estado = estado_compactacion()
+        if estado['bajas']:
+            st.markdown("---")
+            with st.expander("🧹 Mantenimiento del Historial"):
+                st.write(
+                    f"**Bajas pendientes:** {estado['bajas']} | "
+                    f"**Filas ocultas:** {estado['filas_muertas']} de {estado['filas_totales']}"
+                )
+                if not estado['conviene']:
+                    st.caption("Aún no conviene compactar: las filas ocultas son pocas")
+                forzar = st.checkbox("Compactar aunque no supere el umbral", key="forzar_compactar")
+                if st.button("Compactar ahora", key="btn_compactar"):
+                    eliminadas = compactar(forzar=forzar)
+                    if eliminadas is None:
+                        st.info("No se compactó")
+                    else:
+                        st.success(f"✅ {eliminadas} filas eliminadas del historial")
+                    st.rerun()
 
+    # Rangos META_RANGO que versiones anteriores anexaban al historial de payout
+    metas_rango = contar_metas_rango()
+    if metas_rango:
+        st.markdown("---")
+        with st.expander("🎯 Metas de Payout heredadas"):
+            st.write(
+                f"**Filas META_RANGO en el historial de payout:** {metas_rango}. "
+                "Se conserva la última de cada máquina como su meta."
+            )
+            if st.button("Compactar metas", key="btn_compactar_metas"):
+                eliminadas, migradas = compactar_metas_rango()
+                st.success(f"✅ {eliminadas} filas eliminadas, {migradas} metas migradas")
+                st.rerun()
+
+
+@fragmento
+@cronometrado
 def gestionar_tareas():
     """Gestión de tareas y misiones"""
     st.subheader("Asignar Tareas")
@@ -798,9 +792,7 @@ def gestionar_tareas():
                     'pregunta': "Registro de Payout",
                     'completada': False
                 }
-                tareas = cargar_tareas()
-                tareas.append(nueva_tarea)
-                guardar_tareas(tareas)
+                agregar_tarea(nueva_tarea)
                 st.success("✅ Tarea de corte asignada")
                 st.rerun()
     
@@ -827,12 +819,12 @@ def gestionar_tareas():
                     'pregunta': pregunta,
                     'completada': False
                 }
-                tareas = cargar_tareas()
-                tareas.append(nueva_tarea)
-                guardar_tareas(tareas)
+                agregar_tarea(nueva_tarea)
                 st.success("✅ Misión asignada")
                 st.rerun()
     
+    importar_cortes_masivo()
+    
     # Tareas pendientes
     st.markdown("---")
     st.subheader("Tareas Pendientes")
@@ -846,6 +838,38 @@ def gestionar_tareas():
     else:
         st.success("No hay tareas pendientes")
 
+@cronometrado
+def importar_cortes_masivo():
+    """Carga de cortes semanales desde una hoja de cálculo"""
+    from importacion import leer_archivo_cortes, importar_cortes
+
+    with st.expander("📥 Importar cortes desde CSV/Excel"):
+        st.caption(
+            "Columnas: Maquina, Semana, Venta, Payout y opcionalmente Fecha y Cambios. "
+            "Las tareas de corte pendientes de la misma máquina y semana se cierran."
+        )
+        archivo = st.file_uploader("Archivo de cortes", type=['csv', 'xlsx'], key="archivo_cortes")
+        omitir = st.checkbox("Importar solo las filas válidas si hay errores", key="omitir_invalidos")
+        
+        if archivo is not None and st.button("Importar cortes", key="btn_importar_cortes"):
+            try:
+                df = leer_archivo_cortes(archivo, archivo.name)
+                importados, errores, cerradas = importar_cortes(df, omitir)
+            except ValueError as e:
+                st.error(f"❌ {e}")
+                return
+            
+            if importados:
+                st.success(f"✅ {importados} cortes importados, {len(cerradas)} tareas de corte cerradas")
+            if not errores.empty:
+                if not importados:
+                    st.error(f"❌ {len(errores)} filas inválidas: no se importó nada")
+                else:
+                    st.warning(f"⚠ {len(errores)} filas inválidas omitidas")
+                st.dataframe(errores, use_container_width=True, hide_index=True)
+
+@fragmento
+@cronometrado
 def mostrar_reportes_detallados():
     """Reportes detallados por máquina"""
     st.subheader("Reportes Detallados")
@@ -856,136 +880,331 @@ def mostrar_reportes_detallados():
         st.info("No hay máquinas registradas")
         return
     
+    exportar_flota(maquinas)
+    
     maquina_sel = st.selectbox("Selecciona una máquina", maquinas)
     
-    tabs = st.tabs(["📊 Evaluaciones", "💰 Payout"])
+    vista = st.radio(
+        "Vista", ["📊 Evaluaciones", "💰 Payout"], horizontal=True,
+        key="vista_reporte", label_visibility="collapsed"
+    )
     
-    with tabs[0]:
+    if vista == "📊 Evaluaciones":
         mostrar_detalle_evaluaciones(maquina_sel)
-    
-    with tabs[1]:
+    else:
         mostrar_detalle_payout(maquina_sel)
 
-def mostrar_detalle_evaluaciones(maquina):
-    """Muestra detalle de evaluaciones de una máquina"""
-    if not ARCHIVO_RESULTADOS.exists():
-        st.info("No hay evaluaciones")
+@fragmento
+@cronometrado
+def mostrar_payout_flota():
+    """Payout de toda la flota ordenado por desviación del rango ideal"""
+    import plotly.express as px
+    from analitica import analitica_payout, VENTANA_PAYOUT
+
+    st.subheader("Payout de la Flota")
+    
+    maquinas = [m['nombre'] for m in get_maquinas("ADMIN")]
+    ventana = st.number_input(
+        "Cortes para el promedio móvil", min_value=1, max_value=52,
+        value=VENTANA_PAYOUT, key="ventana_payout_flota"
+    )
+    
+    # Una sola pasada por el historial de cortes para todas las máquinas
+    tabla = analitica_payout(leer_payout(), maquinas, ventana=int(ventana))
+    
+    if tabla.empty:
+        st.info("Sin cortes semanales registrados aún")
         return
     
-    df = pd.read_csv(ARCHIVO_RESULTADOS, encoding='utf-8-sig')
-    df_maq = df[df['Maquina'] == maquina]
+    fuera = tabla[tabla['Desviacion'] != 0]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Máquinas con cortes", len(tabla))
+    col2.metric("Promedio fuera de rango", len(fuera))
+    col3.metric("Cortes fuera de rango", int(tabla['Semanas_Fuera'].sum()))
+    
+    if not fuera.empty:
+        fig = px.bar(
+            fuera, x='Maquina', y='Desviacion',
+            title="Desviación del promedio respecto al rango ideal (pts)",
+            labels={'Desviacion': 'Desviación (pts)', 'Maquina': 'Máquina'}
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    
+    st.dataframe(
+        tabla, use_container_width=True, hide_index=True,
+        column_config={
+            'Payout_Promedio': st.column_config.NumberColumn("Payout Promedio (%)", format="%.1f"),
+            'Meta_Min': st.column_config.NumberColumn("Meta Mín (%)", format="%.1f"),
+            'Meta_Max': st.column_config.NumberColumn("Meta Máx (%)", format="%.1f"),
+            'Desviacion': st.column_config.NumberColumn("Desviación (pts)", format="%+.1f"),
+            'Pct_Fuera': st.column_config.NumberColumn("% Fuera", format="%.0f%%"),
+            'Tendencia_Venta': st.column_config.NumberColumn("Tendencia Venta ($/corte)", format="%+.0f"),
+            'Ultimo_Payout': st.column_config.NumberColumn("Último Payout (%)", format="%.1f"),
+            'Ultima_Venta': st.column_config.NumberColumn("Última Venta ($)", format="%.0f"),
+        }
+    )
+
+@fragmento
+@cronometrado
+def mostrar_simulador_pesos():
+    """¿Qué pasaría si...? Pesos y umbrales de veredicto con recálculo inmediato"""
+    import pandas as pd
+    from analitica import matriz_calificaciones
+
+    st.subheader("Simulador de Pesos")
+    
+    # Matriz máquina × criterio precalculada: cada ajuste es un producto matriz × vector
+    matriz, criterios = matriz_calificaciones()
+    
+    if matriz.empty:
+        st.info("No hay evaluaciones registradas aún")
+        return
+    
+    st.caption("Ajusta pesos y umbrales; los puntajes de la flota se recalculan sin tocar el historial.")
+    
+    col_pesos, col_umbrales = st.columns([2, 1])
+    
+    with col_pesos:
+        st.markdown("**Pesos por criterio**")
+        pesos = [
+            st.slider(
+                fila['Criterio'], min_value=0.0, max_value=1.0,
+                value=float(fila['Peso']), step=0.05, key=f"sim_peso_{criterio_id}"
+            )
+            for criterio_id, fila in criterios.iterrows()
+        ]
+        suma = sum(pesos)
+        if abs(suma - 1.0) > 1e-9:
+            st.warning(f"Los pesos suman {suma:.2f} (los actuales suman {criterios['Peso'].sum():.2f})")
+    
+    with col_umbrales:
+        st.markdown("**Umbrales de veredicto**")
+        recomprar = st.slider("✔ RECOMPRAR desde (%)", 0, 100, UMBRALES_VEREDICTO[0], key="sim_recomprar")
+        revisar = st.slider("⚠ REVISAR desde (%)", 0, 100, UMBRALES_VEREDICTO[1], key="sim_revisar")
+        if revisar > recomprar:
+            st.warning("El umbral de REVISAR es mayor que el de RECOMPRAR")
+    
+    actual = simular_porcentajes(matriz.to_numpy(), criterios['Peso'].to_numpy())
+    simulado = simular_porcentajes(matriz.to_numpy(), pesos)
+    
+    resultado = pd.DataFrame({
+        'Maquina': matriz.index,
+        'Actual (%)': actual,
+        'Veredicto Actual': veredictos(actual),
+        'Simulado (%)': simulado,
+        'Veredicto Simulado': veredictos(simulado, (recomprar, revisar)),
+    })
+    resultado['Cambio (pts)'] = resultado['Simulado (%)'] - resultado['Actual (%)']
+    
+    cambian = resultado['Veredicto Actual'] != resultado['Veredicto Simulado']
+    conteo = resultado['Veredicto Simulado'].value_counts()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("✔ RECOMPRAR", int(conteo.get("✔ RECOMPRAR", 0)))
+    col2.metric("⚠ REVISAR", int(conteo.get("⚠ REVISAR", 0)))
+    col3.metric("❌ NO RECOMPRAR", int(conteo.get("❌ NO RECOMPRAR", 0)))
+    col4.metric("Cambian de veredicto", int(cambian.sum()))
+    
+    st.dataframe(
+        resultado.sort_values('Simulado (%)', ascending=False),
+        use_container_width=True, hide_index=True,
+        column_config={
+            'Actual (%)': st.column_config.NumberColumn(format="%.1f"),
+            'Simulado (%)': st.column_config.NumberColumn(format="%.1f"),
+            'Cambio (pts)': st.column_config.NumberColumn(format="%+.1f"),
+        }
+    )
+
+@fragmento
+@cronometrado
+def mostrar_rendimiento():
+    """Tiempos por rerun de cada página y de cada lectura/escritura de archivos"""
+    import pandas as pd
+    import rendimiento
+
+    st.subheader("Rendimiento")
+
+    activo = st.toggle(
+        "Instrumentación activa", value=rendimiento.activo(),
+        help="Mide los reruns de todas las sesiones de este proceso (también con QPP_PERFIL=1)"
+    )
+    if activo != rendimiento.activo():
+        rendimiento.activar(activo)
+        st.rerun()
+
+    registros = rendimiento.registros()
+    col_info, col_json, col_vaciar = st.columns([3, 1, 1])
+    col_info.caption(f"Últimos {len(registros)} reruns (máximo {rendimiento.MAX_REGISTROS})")
+    col_json.download_button(
+        "⬇️ JSON", rendimiento.volcado_json(),
+        file_name=f"rendimiento_{datetime.now().strftime('%Y%m%d_%H%M')}.json",
+        mime="application/json", use_container_width=True
+    )
+    if col_vaciar.button("🗑️ Vaciar", key="vaciar_rendimiento", use_container_width=True):
+        rendimiento.vaciar()
+        st.rerun()
+
+    if not registros:
+        st.info("Sin mediciones: activa la instrumentación y navega por la app")
+        return
+
+    duraciones = pd.Series([r['ms'] for r in registros])
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Reruns medidos", len(registros))
+    col2.metric("Mediana (ms)", f"{duraciones.median():.0f}")
+    col3.metric("p95 (ms)", f"{duraciones.quantile(0.95):.0f}")
+
+    resumen = rendimiento.resumen(registros)
+    formato_ms = {
+        c: st.column_config.NumberColumn(format="%.1f")
+        for c in ['ms_total', 'ms_p50', 'ms_p95', 'ms_max']
+    }
+
+    st.markdown("#### Páginas y bloques")
+    st.dataframe(
+        pd.DataFrame(resumen['bloques']), use_container_width=True, hide_index=True,
+        column_config=formato_ms
+    )
+
+    st.markdown("#### Lecturas y escrituras")
+    if resumen['io']:
+        st.dataframe(
+            pd.DataFrame(resumen['io']), use_container_width=True, hide_index=True,
+            column_config={**formato_ms, 'bytes': st.column_config.NumberColumn(format="%d")}
+        )
+    else:
+        st.caption("Sin operaciones de archivo: los datos venían de la caché del proceso")
+
+    st.markdown("#### Últimos reruns")
+    st.dataframe(
+        pd.DataFrame([
+            {
+                'Inicio': r['inicio'], 'Entrada': r['nombre'], 'ms': r['ms'],
+                'Operaciones E/S': len(r['io']),
+                'Bytes': sum(op['bytes'] or 0 for op in r['io']),
+                'ms E/S': sum(op['ms'] for op in r['io']),
+            }
+            for r in reversed(registros[-50:])
+        ]),
+        use_container_width=True, hide_index=True,
+        column_config={
+            'ms': st.column_config.NumberColumn(format="%.1f"),
+            'ms E/S': st.column_config.NumberColumn(format="%.1f"),
+        }
+    )
+
+@cronometrado
+def exportar_flota(maquinas):
+    """Exportación de todas las máquinas en un solo archivo"""
+    from reportes import exportar_flota_excel, exportar_flota_zip, exportar_onepages_zip
+
+    with st.expander(f"🚚 Exportar toda la flota ({len(maquinas)} máquinas)"):
+        formato = st.radio(
+            "Formato",
+            ["Excel único", "ZIP (un Excel por máquina)", "One Page de cada máquina (ZIP HTML)"],
+            horizontal=True, key="formato_flota"
+        )
+        if st.button("Generar exportación", key="btn_exportar_flota"):
+            es_excel = formato == "Excel único"
+            sufijo = '.xlsx' if es_excel else '.zip'
+            # Carpeta propia de la sesión: se borra sola cuando la sesión termina
+            if 'carpeta_exportacion' not in st.session_state:
+                st.session_state.carpeta_exportacion = tempfile.TemporaryDirectory(prefix="qpp_flota_")
+            # La exportación nueva reemplaza a la anterior también en disco
+            if 'exportacion_flota' in st.session_state:
+                anterior = st.session_state.pop('exportacion_flota')[0]
+                if os.path.exists(anterior):
+                    os.remove(anterior)
+            ruta = os.path.join(st.session_state.carpeta_exportacion.name, f"flota{sufijo}")
+            with st.spinner("Exportando..."):
+                if es_excel:
+                    exportar_flota_excel(ruta, maquinas)
+                elif formato.startswith("ZIP"):
+                    exportar_flota_zip(ruta, maquinas)
+                else:
+                    exportar_onepages_zip(ruta, maquinas)
+            st.session_state.exportacion_flota = (ruta, sufijo)
+        
+        if 'exportacion_flota' in st.session_state:
+            ruta, sufijo = st.session_state.exportacion_flota
+            if os.path.exists(ruta):
+                with open(ruta, 'rb') as f:
+                    st.download_button(
+                        label="📥 Descargar exportación de la flota",
+                        data=f,
+                        file_name=f"flota_{datetime.now().strftime('%Y%m%d')}{sufijo}",
+                        mime=(
+                            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                            if sufijo == '.xlsx' else "application/zip"
+                        )
+                    )
+
+@cronometrado
+def mostrar_detalle_evaluaciones(maquina):
+    """Muestra detalle de evaluaciones de una máquina"""
+    import pandas as pd
+    from analitica import agregados_por_criterio, ultimas_evaluaciones
+
+    df_maq = leer_resultados(maquina)
     
     if df_maq.empty:
         st.info("No hay evaluaciones para esta máquina")
         return
     
-    # Score global
-    df_std = df_maq[df_maq['Criterio_ID'] != 'MISION']
-    if not df_std.empty:
-        puntaje = (df_std['Calificacion'] * df_std['Peso']).sum()
-        score = (puntaje / 3.0) * 100
+    # Score global y radar desde los agregados precalculados
+    agrupado = agregados_por_criterio(maquina)
+    if not agrupado.empty:
+        puntaje = agrupado['Puntaje_Ponderado'].sum()
+        score = porcentaje_aprobacion(puntaje)
         
         st.metric("Nivel de Aprobación Global", f"{score:.1f}%")
 
     # Radar chart
-    agrupado = df_std.groupby('Criterio')['Calificacion'].mean().reset_index()
-    
-    # Si no hay nada que graficar → gráfica vacía para evitar NameError
-    if agrupado.empty:
-        fig_radar = go.Figure()
-        fig_radar.update_layout(
-            title="Radar no disponible (sin evaluaciones)",
-            polar=dict(radialaxis=dict(visible=True, range=[0, 3]))
-        )
-    else:
-        fig_radar = go.Figure(data=go.Scatterpolar(
-            r=agrupado['Calificacion'],
-            theta=agrupado['Criterio'],
-            fill='toself'
-        ))
-        fig_radar.update_layout(
-            polar=dict(radialaxis=dict(visible=True, range=[0, 3])),
-            showlegend=False,
-            title="Fortalezas y Debilidades"
-        )
+    fig_radar = grafica_radar(maquina, huella_datos(agrupado), agrupado)
 
     st.plotly_chart(fig_radar, use_container_width=True)
     
     # ===========================
-    # 4. CARGAR PAYOUT (para OnePage)
-    # ===========================
-    if ARCHIVO_PAYOUT.exists():
-        df_pay = pd.read_csv(ARCHIVO_PAYOUT, encoding='utf-8-sig')
-        df_pay_maq = df_pay[df_pay['Maquina'] == maquina]
-    else:
-        df_pay_maq = pd.DataFrame()
-
-    # Gráfica payout sólo si hay datos
-    if not df_pay_maq.empty:
-        fig_payout = go.Figure()
-        fig_payout.add_trace(go.Scatter(
-            x=df_pay_maq['Fecha'],
-            y=df_pay_maq['Payout'],
-            mode="lines+markers"
-        ))
-        fig_payout.update_layout(title="Histórico de Payout (%)")
-    else:
-        fig_payout = go.Figure()  # vacío para onepage
-
-    # ===========================
-    # 5. DESCARGAR EXCEL
+    # 4. EXPORTACIONES (bajo demanda, cacheadas por versión de los datos)
     # ===========================
-    def generar_excel_maquina(df_eval, df_pay, maquina):
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df_eval.to_excel(writer, index=False, sheet_name='Evaluaciones')
-            df_pay.to_excel(writer, index=False, sheet_name='Payout')
-        output.seek(0)
-        return output
-
-    excel_buffer = generar_excel_maquina(df_maq, df_pay_maq, maquina)
-
-    st.download_button(
-        label="📥 Descargar Excel Completo",
-        data=excel_buffer,
-        file_name=f"{maquina}_evaluacion.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
+    df_pay_maq = leer_payout(maquina)
+    huella = huella_datos(df_maq, df_pay_maq)
+
+    col_excel, col_onepage = st.columns(2)
+
+    with col_excel:
+        if exportacion_solicitada('excel', maquina, huella, "📊 Preparar Excel"):
+            st.download_button(
+                label="📥 Descargar Excel Completo",
+                data=excel_maquina(maquina, huella, df_maq, df_pay_maq),
+                file_name=f"{maquina}_evaluacion.xlsx",
+                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
 
-    # ===========================
-    # 6. ONE PAGE EJECUTIVO
-    # ===========================
-    def crear_onepage(maquina, score, fig_radar, fig_payout):
-        html = f"""
-        <h1 style="text-align:center;">Reporte Ejecutivo – {maquina}</h1>
-        <h2>Aprobación Global: {score:.1f}%</h2>
-        <hr>
-        <h3>Radar de Criterios</h3>
-        {pio.to_html(fig_radar, include_plotlyjs='cdn', full_html=False)}
-        <hr>
-        <h3>Histórico de Payout</h3>
-        {pio.to_html(fig_payout, include_plotlyjs='cdn', full_html=False)}
-        <hr>
-        <h3>Conclusión Ejecutiva</h3>
-        <p><strong>
-        {"✔ RECOMPRAR" if score >= 80 else "⚠ REVISAR" if score >= 60 else "❌ NO RECOMPRAR"}
-        </strong></p>
-        """
-        return html
-
-    onepage_html = crear_onepage(maquina, score, fig_radar, fig_payout)
-
-    st.download_button(
-        label="📄 Descargar One Page (HTML)",
-        data=onepage_html,
-        file_name=f"{maquina}_onepage.html",
-        mime="text/html"
-    )
+    # One Page ejecutivo: requiere un puntaje global
+    if not agrupado.empty:
+        with col_onepage:
+            if exportacion_solicitada('onepage', maquina, huella, "📄 Preparar One Page"):
+                st.download_button(
+                    label="📄 Descargar One Page (HTML)",
+                    data=onepage_maquina(maquina, huella, score, fig_radar, df_pay_maq),
+                    file_name=f"{maquina}_onepage.html",
+                    mime="text/html"
+                )
     
-    # Detalles por criterio
+    # Detalles por criterio (última evaluación vigente + misiones)
     st.markdown("### Auditoría Desglosada")
     
-    for _, row in df_maq.iterrows():
+    ver_historial = st.checkbox(
+        "Ver historial completo (incluye evaluaciones reemplazadas)",
+        key=f"historial_{maquina}"
+    )
+    if ver_historial:
+        df_auditoria = df_maq
+    else:
+        partes = [ultimas_evaluaciones(maquina), df_maq[df_maq['Criterio_ID'] == 'MISION']]
+        df_auditoria = pd.concat([p for p in partes if not p.empty])
+    
+    for _, row in df_auditoria.iterrows():
         color = "green" if row['Calificacion'] == 3 else "orange" if row['Calificacion'] == 2 else "red"
         
         with st.container():
@@ -996,14 +1215,14 @@ def mostrar_detalle_evaluaciones(maquina):
             </div>
             """, unsafe_allow_html=True)
             
+@cronometrado
 def mostrar_detalle_payout(maquina):
     """Muestra detalle de payout de una máquina"""
-    if not ARCHIVO_PAYOUT.exists():
-        st.info("No hay registros de payout")
-        return
-    
-    df = pd.read_csv(ARCHIVO_PAYOUT, encoding='utf-8-sig')
-    df_maq = df[df['Maquina'] == maquina]
+    import pandas as pd
+    from analitica import historial_metas_payout, meta_payout, rango_payout
+    from reportes import MAX_PUNTOS_GRAFICA
+
+    df_maq = leer_payout(maquina)
     
     if df_maq.empty:
         st.warning("No hay datos de payout para esta máquina")
@@ -1014,28 +1233,46 @@ def mostrar_detalle_payout(maquina):
         """)
         return
     
-    # Gráfica
-    fig = generar_grafica_payout(df_maq)
+    # Gráfica (series largas reducidas salvo que se pidan todos los cortes)
+    todos = st.checkbox("Graficar todos los cortes", key=f"payout_completo_{maquina}")
+    max_puntos = None if todos else MAX_PUNTOS_GRAFICA
+    target_min, target_max = rango_payout(maquina)
+    fig = grafica_payout(maquina, huella_datos(df_maq), (target_min, target_max), max_puntos, df_maq)
     
     if fig:
         st.plotly_chart(fig, use_container_width=True)
+
+    # Meta vigente e historial de metas de la máquina
+    meta = meta_payout(maquina)
+    if meta is None:
+        st.caption(f"Sin meta definida: se usa el rango {target_min:.1f}% - {target_max:.1f}%")
+    else:
+        definida = f" por {meta[2]}" if meta[2] else ""
+        st.caption(f"🎯 Meta vigente: {target_min:.1f}% - {target_max:.1f}% (definida{definida} el {meta[3]})")
+    historial = historial_metas_payout(maquina)
+    if len(historial) > 1:
+        with st.expander(f"Historial de metas ({len(historial)})"):
+            st.dataframe(
+                pd.DataFrame(historial, columns=['Meta_Min', 'Meta_Max', 'Usuario', 'Fecha']).iloc[::-1],
+                use_container_width=True, hide_index=True
+            )
     
     # Tabla de historial
     st.subheader("Historial de Cortes Semanales")
     
-    df_view = df_maq[df_maq['Semana'] != 'META_RANGO'].copy()
+    df_view = df_maq[df_maq['Semana'] != SEMANA_META_RANGO].copy()
     
     if not df_view.empty:
-        # Aplicar colores según el payout
+        # Aplicar colores según el payout y el rango de la máquina
         def colorear_payout(val):
-            if val > 22:
+            if val > target_max:
                 return 'background-color: #ffcccc'
-            elif val < 18:
+            elif val < target_min:
                 return 'background-color: #fff3cd'
             else:
                 return 'background-color: #d4edda'
         
-        styled_df = df_view[['Semana', 'Fecha', 'Venta', 'Payout', 'Cambios']].style.applymap(
+        styled_df = df_view[['Semana', 'Fecha', 'Venta', 'Payout', 'Cambios']].style.map(
             colorear_payout, subset=['Payout']
         )
         
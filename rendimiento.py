@@ -0,0 +1,164 @@
+"""Instrumentación opcional por rerun: tiempos de páginas y de E/S de archivos.
+
+Se activa con QPP_PERFIL=1 o desde la sección Rendimiento del panel de
+dirección. Cada rerun de la app (o de un fragmento) deja un registro con la
+duración de cada bloque medido y de cada lectura/escritura de archivo
+(bytes, filas, ms). Se guardan los últimos MAX_REGISTROS en memoria,
+compartidos por todas las sesiones del proceso. Desactivada, cada punto de
+medición cuesta una comprobación de un booleano.
+"""
+import json
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+MAX_REGISTROS = 500
+
+_ACTIVO = os.environ.get('QPP_PERFIL', '').strip().lower() in ('1', 'true', 'si')
+_REGISTROS = deque(maxlen=MAX_REGISTROS)
+_REGISTROS_LOCK = threading.Lock()
+# Registro del rerun en curso: Streamlit ejecuta cada rerun en un hilo de la sesión
+_LOCAL = threading.local()
+
+
+def activo():
+    """Indica si la instrumentación está encendida"""
+    return _ACTIVO
+
+
+def activar(valor=True):
+    """Enciende o apaga la instrumentación para todo el proceso"""
+    global _ACTIVO
+    _ACTIVO = bool(valor)
+
+
+# ==================== MEDICIÓN ====================
+
+@contextmanager
+def medir(nombre):
+    """Mide un bloque; el más externo de cada hilo abre y cierra el registro del rerun"""
+    if not _ACTIVO:
+        yield
+        return
+
+    registro = getattr(_LOCAL, 'registro', None)
+    propio = registro is None
+    if propio:
+        registro = {
+            'inicio': datetime.now().isoformat(timespec='milliseconds'),
+            'nombre': nombre, 'ms': 0.0, 'bloques': [], 'io': []
+        }
+        _LOCAL.registro = registro
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        # st.rerun()/st.stop() salen por excepción: también se registran
+        ms = (time.perf_counter() - inicio) * 1000
+        registro['bloques'].append({'nombre': nombre, 'ms': ms})
+        if propio:
+            registro['ms'] = ms
+            _LOCAL.registro = None
+            with _REGISTROS_LOCK:
+                _REGISTROS.append(registro)
+
+
+def cronometrado(funcion):
+    """Decorador: mide cada llamada a ``funcion`` con su nombre"""
+    @wraps(funcion)
+    def envoltura(*args, **kwargs):
+        with medir(funcion.__name__):
+            return funcion(*args, **kwargs)
+    return envoltura
+
+
+@contextmanager
+def medir_io(operacion, archivo):
+    """Mide una operación de archivo; quien llama completa 'bytes' y 'filas' del dict.
+
+    Fuera de un rerun medido (API, línea de comandos, hilo escritor) no se registra.
+    """
+    datos = {'operacion': operacion, 'archivo': getattr(archivo, 'name', str(archivo)),
+             'bytes': None, 'filas': None}
+    registro = getattr(_LOCAL, 'registro', None) if _ACTIVO else None
+    if registro is None:
+        yield datos
+        return
+
+    inicio = time.perf_counter()
+    try:
+        yield datos
+    finally:
+        datos['ms'] = (time.perf_counter() - inicio) * 1000
+        registro['io'].append(datos)
+
+
+# ==================== CONSULTA ====================
+
+def registros():
+    """Copia de los registros de la ventana, del más antiguo al más reciente"""
+    with _REGISTROS_LOCK:
+        return list(_REGISTROS)
+
+
+def vaciar():
+    """Descarta los registros acumulados"""
+    with _REGISTROS_LOCK:
+        _REGISTROS.clear()
+
+
+def _estadisticas(valores):
+    ordenados = sorted(valores)
+    return {
+        'llamadas': len(ordenados),
+        'ms_total': sum(ordenados),
+        'ms_p50': statistics.median(ordenados),
+        'ms_p95': ordenados[min(len(ordenados) - 1, int(0.95 * len(ordenados)))],
+        'ms_max': ordenados[-1],
+    }
+
+
+def resumen(lista=None):
+    """Estadísticas de la ventana por bloque medido y por (operación, archivo)"""
+    lista = registros() if lista is None else lista
+    bloques, io = {}, {}
+    for registro in lista:
+        for bloque in registro['bloques']:
+            bloques.setdefault(bloque['nombre'], []).append(bloque['ms'])
+        for op in registro['io']:
+            entrada = io.setdefault((op['operacion'], op['archivo']), {'ms': [], 'bytes': 0, 'filas': 0})
+            entrada['ms'].append(op['ms'])
+            entrada['bytes'] += op['bytes'] or 0
+            entrada['filas'] += op['filas'] or 0
+
+    return {
+        'bloques': sorted(
+            ({'nombre': nombre, **_estadisticas(ms)} for nombre, ms in bloques.items()),
+            key=lambda b: -b['ms_total']
+        ),
+        'io': sorted(
+            (
+                {'operacion': operacion, 'archivo': archivo, 'bytes': e['bytes'],
+                 'filas': e['filas'], **_estadisticas(e['ms'])}
+                for (operacion, archivo), e in io.items()
+            ),
+            key=lambda o: -o['ms_total']
+        ),
+    }
+
+
+def volcado_json():
+    """Ventana completa y su resumen, en JSON"""
+    lista = registros()
+    return json.dumps({
+        'generado': datetime.now().isoformat(timespec='seconds'),
+        'activo': _ACTIVO,
+        'max_registros': MAX_REGISTROS,
+        'resumen': resumen(lista),
+        'registros': lista,
+    }, ensure_ascii=False, indent=2)
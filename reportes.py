@@ -0,0 +1,427 @@
+"""Exportaciones de reportes por máquina: Excel y One Page ejecutivo"""
+import html
+import io
+import os
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from almacenamiento import SEMANA_META_RANGO
+from calificacion import porcentaje_aprobacion, veredicto
+from rendimiento import cronometrado
+
+
+@cronometrado
+def generar_excel_maquina(df_eval, df_pay):
+    """Libro Excel con las hojas Evaluaciones y Payout (bytes)"""
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df_eval.to_excel(writer, index=False, sheet_name='Evaluaciones')
+        df_pay.to_excel(writer, index=False, sheet_name='Payout')
+    return output.getvalue()
+
+
+@cronometrado
+def figura_radar(agrupado):
+    """Radar de promedios por criterio (salida de agregados_por_criterio)"""
+    # Si no hay nada que graficar → gráfica vacía para evitar NameError
+    if agrupado.empty:
+        fig_radar = go.Figure()
+        fig_radar.update_layout(
+            title="Radar no disponible (sin evaluaciones)",
+            polar=dict(radialaxis=dict(visible=True, range=[0, 3]))
+        )
+    else:
+        fig_radar = go.Figure(data=go.Scatterpolar(
+            r=agrupado['Promedio'],
+            theta=agrupado['Criterio'],
+            fill='toself'
+        ))
+        fig_radar.update_layout(
+            polar=dict(radialaxis=dict(visible=True, range=[0, 3])),
+            showlegend=False,
+            title="Fortalezas y Debilidades"
+        )
+    return fig_radar
+
+
+@cronometrado
+def figura_historico_payout(df_pay_maq, max_puntos=None):
+    """Gráfica simple del histórico de payout para el One Page"""
+    fig_payout = go.Figure()
+    # Gráfica payout sólo si hay datos
+    if not df_pay_maq.empty:
+        if max_puntos is None:
+            max_puntos = MAX_PUNTOS_GRAFICA
+        payout = pd.to_numeric(df_pay_maq['Payout'], errors='coerce')
+        posiciones = reducir_serie(payout, max_puntos)
+        fig_payout.add_trace(traza_dispersion(len(posiciones))(
+            x=df_pay_maq['Fecha'].iloc[posiciones],
+            y=payout.iloc[posiciones],
+            mode="lines+markers"
+        ))
+        fig_payout.update_layout(title="Histórico de Payout (%)")
+    return fig_payout
+
+
+# ==================== SERIES LARGAS ====================
+# Con historiales de varios años el JSON de la figura crece con cada corte.
+# Las series se reducen con LTTB (Largest-Triangle-Three-Buckets), que
+# conserva picos y valles, y por encima de UMBRAL_WEBGL puntos se dibujan
+# con Scattergl en lugar de SVG.
+
+MAX_PUNTOS_GRAFICA = 400
+UMBRAL_WEBGL = 1000
+
+
+def indices_lttb(y, n_salida):
+    """Posiciones de los ``n_salida`` puntos que LTTB elige de ``y`` (x equiespaciada)"""
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    n = len(y)
+    if n_salida >= n or n_salida < 3:
+        return np.arange(n)
+
+    # Primer y último punto fijos; el resto en n_salida - 2 cubetas
+    bordes = np.linspace(1, n - 1, n_salida - 1).astype(int)
+    seleccion = np.empty(n_salida, dtype=int)
+    seleccion[0], seleccion[-1] = 0, n - 1
+    anterior = 0
+    for i in range(n_salida - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        siguiente_fin = bordes[i + 2] if i + 2 < len(bordes) else n
+        x_sig = (fin + siguiente_fin - 1) / 2.0
+        y_sig = y[fin:siguiente_fin].mean()
+        x = np.arange(inicio, fin)
+        # Área del triángulo (anterior, candidato, promedio de la cubeta siguiente)
+        areas = np.abs(
+            (anterior - x_sig) * (y[inicio:fin] - y[anterior])
+            - (anterior - x) * (y_sig - y[anterior])
+        )
+        anterior = inicio + int(areas.argmax())
+        seleccion[i + 1] = anterior
+    return seleccion
+
+
+def reducir_serie(y, max_puntos, conservar=None):
+    """Posiciones a graficar: LTTB hasta ``max_puntos`` más las marcadas en ``conservar``"""
+    n = len(y)
+    if not max_puntos or n <= max_puntos:
+        return np.arange(n)
+    posiciones = indices_lttb(y, max_puntos)
+    if conservar is not None:
+        posiciones = np.union1d(posiciones, np.flatnonzero(np.asarray(conservar)))
+    return posiciones
+
+
+def traza_dispersion(n_puntos):
+    """go.Scattergl para series grandes, go.Scatter (SVG) para las demás"""
+    return go.Scattergl if n_puntos > UMBRAL_WEBGL else go.Scatter
+
+
+@cronometrado
+def crear_onepage(maquina, score, fig_radar, fig_payout, include_plotlyjs='cdn'):
+    """HTML del Reporte Ejecutivo de una máquina"""
+    html = f"""
+    <h1 style="text-align:center;">Reporte Ejecutivo – {maquina}</h1>
+    <h2>Aprobación Global: {score:.1f}%</h2>
+    <hr>
+    <h3>Radar de Criterios</h3>
+    {pio.to_html(fig_radar, include_plotlyjs=include_plotlyjs, full_html=False)}
+    <hr>
+    <h3>Histórico de Payout</h3>
+    {pio.to_html(fig_payout, include_plotlyjs=False, full_html=False)}
+    <hr>
+    <h3>Conclusión Ejecutiva</h3>
+    <p><strong>
+    {veredicto(score)}
+    </strong></p>
+    """
+    return html
+
+
+# ==================== EXPORTACIÓN DE TODA LA FLOTA ====================
+# Una sola pasada por el historial: xlsxwriter en modo constant_memory
+# escribe fila a fila sin retener la hoja en memoria, y el ZIP agrega un
+# libro por máquina generado y liberado de uno en uno.
+
+FILAS_POR_BLOQUE = 10000
+MAX_FILAS_HOJA = 1048575  # límite de Excel sin contar el encabezado
+
+
+def _datos_flota(maquinas=None):
+    """Evaluaciones, payout y resumen de las máquinas activas"""
+    from almacenamiento import get_maquinas, leer_payout, leer_resultados
+    from analitica import agregados_por_maquina
+
+    if maquinas is None:
+        maquinas = [m['nombre'] for m in get_maquinas("ADMIN")]
+    df_eval = leer_resultados()
+    df_pay = leer_payout()
+    df_eval = df_eval[df_eval['Maquina'].isin(maquinas)]
+    df_pay = df_pay[df_pay['Maquina'].isin(maquinas)]
+    return maquinas, df_eval, df_pay, resumen_flota(maquinas, df_pay, agregados_por_maquina())
+
+
+def resumen_flota(maquinas, df_pay, agregados):
+    """Una fila por máquina: aprobación, veredicto y último corte"""
+    resumen = pd.DataFrame({'Maquina': list(maquinas)})
+    resumen = resumen.merge(
+        agregados[['Maquina', 'Porcentaje', 'Evaluaciones']], on='Maquina', how='left'
+    )
+
+    cortes = df_pay[df_pay['Semana'] != SEMANA_META_RANGO]
+    por_maquina = cortes.groupby('Maquina').agg(
+        Cortes=('Payout', 'size'),
+        Venta_Total=('Venta', 'sum'),
+        Ultimo_Corte=('Semana', 'last'),
+        Ultimo_Payout=('Payout', 'last'),
+    ).reset_index()
+    resumen = resumen.merge(por_maquina, on='Maquina', how='left')
+
+    resumen['Evaluaciones'] = resumen['Evaluaciones'].fillna(0).astype(int)
+    resumen['Cortes'] = resumen['Cortes'].fillna(0).astype(int)
+    resumen['Veredicto'] = resumen['Porcentaje'].map(
+        lambda p: veredicto(p) if pd.notna(p) else "Sin evaluar"
+    )
+    return resumen[[
+        'Maquina', 'Porcentaje', 'Veredicto', 'Evaluaciones',
+        'Cortes', 'Venta_Total', 'Ultimo_Corte', 'Ultimo_Payout'
+    ]]
+
+
+def _escribir_hoja(workbook, nombre, df):
+    """Escribe ``df`` en una o más hojas, por bloques, sin retenerlo completo"""
+    parte = 1
+    hoja = None
+    fila = 0
+    for inicio in range(0, max(len(df), 1), FILAS_POR_BLOQUE):
+        bloque = df.iloc[inicio:inicio + FILAS_POR_BLOQUE]
+        # Copia propia: con copy-on-write (pandas 3) puede ser una vista de solo lectura
+        valores = bloque.to_numpy(dtype=object, copy=True)
+        valores[pd.isna(valores)] = None  # xlsxwriter no acepta NaN
+        for registro in valores.tolist():
+            if hoja is None or fila > MAX_FILAS_HOJA:
+                hoja = workbook.add_worksheet(nombre if parte == 1 else f"{nombre} ({parte})")
+                hoja.write_row(0, 0, list(df.columns))
+                parte += 1
+                fila = 1
+            hoja.write_row(fila, 0, registro)
+            fila += 1
+    if hoja is None:
+        workbook.add_worksheet(nombre).write_row(0, 0, list(df.columns))
+
+
+def _excel_rapido(df_eval, df_pay):
+    """Mismo libro que generar_excel_maquina, escrito directo con xlsxwriter en memoria"""
+    import xlsxwriter
+
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {'in_memory': True})
+    try:
+        _escribir_hoja(workbook, 'Evaluaciones', df_eval)
+        _escribir_hoja(workbook, 'Payout', df_pay)
+    finally:
+        workbook.close()
+    return output.getvalue()
+
+
+@cronometrado
+def exportar_flota_excel(destino, maquinas=None):
+    """Libro único con Resumen, Evaluaciones y Payout de toda la flota.
+
+    ``destino`` es una ruta o un archivo binario abierto. Devuelve el número
+    de máquinas exportadas.
+    """
+    import xlsxwriter
+
+    maquinas, df_eval, df_pay, resumen = _datos_flota(maquinas)
+    workbook = xlsxwriter.Workbook(destino, {'constant_memory': True})
+    try:
+        _escribir_hoja(workbook, 'Resumen', resumen)
+        _escribir_hoja(workbook, 'Evaluaciones', df_eval)
+        _escribir_hoja(workbook, 'Payout', df_pay)
+    finally:
+        workbook.close()
+    return len(maquinas)
+
+
+@cronometrado
+def exportar_flota_zip(destino, maquinas=None):
+    """ZIP con un Excel por máquina más resumen.csv, escrito en streaming.
+
+    ``destino`` es una ruta o un archivo binario abierto. Devuelve el número
+    de máquinas exportadas.
+    """
+    import zipfile
+
+    maquinas, df_eval, df_pay, resumen = _datos_flota(maquinas)
+    # Solo posiciones por máquina; cada subconjunto se materializa al escribirlo
+    pos_eval = df_eval.groupby('Maquina', sort=False).indices
+    pos_pay = df_pay.groupby('Maquina', sort=False).indices
+
+    with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('resumen.csv', resumen.to_csv(index=False).encode('utf-8-sig'))
+        for maquina in maquinas:
+            contenido = _excel_rapido(
+                df_eval.iloc[pos_eval.get(maquina, [])],
+                df_pay.iloc[pos_pay.get(maquina, [])]
+            )
+            # Un .xlsx ya viene comprimido: se guarda tal cual
+            zf.writestr(
+                f"{nombre_archivo(maquina)}_evaluacion.xlsx", contenido,
+                compress_type=zipfile.ZIP_STORED
+            )
+    return len(maquinas)
+
+
+# ==================== ONE PAGE EN LOTE ====================
+# Cada One Page se renderiza en un proceso aparte (la serialización de
+# Plotly a HTML es CPU pura y no escala con hilos). Todas las páginas
+# enlazan un único plotly.min.js escrito en la carpeta de salida en lugar
+# de incrustar ~3.5 MB de JavaScript en cada archivo.
+
+ARCHIVO_PLOTLYJS = 'plotly.min.js'
+
+
+def documento_html(titulo, cuerpo):
+    """Documento HTML completo (UTF-8) alrededor de ``cuerpo``"""
+    return (
+        '<!DOCTYPE html>\n<html lang="es">\n<head>\n<meta charset="utf-8">\n'
+        f'<title>{html.escape(titulo)}</title>\n</head>\n<body>\n{cuerpo}\n</body>\n</html>\n'
+    )
+
+
+def _renderizar_onepage(tarea):
+    """Escribe el One Page de una máquina; se ejecuta en un proceso del pool"""
+    maquina, score, agrupado, df_pay_maq, carpeta, archivo = tarea
+    cuerpo = crear_onepage(
+        maquina, score, figura_radar(agrupado), figura_historico_payout(df_pay_maq),
+        include_plotlyjs='directory'
+    )
+    with open(os.path.join(carpeta, archivo), 'w', encoding='utf-8') as f:
+        f.write(documento_html(f"Reporte Ejecutivo – {maquina}", cuerpo))
+    return archivo
+
+
+def _cuerpo_indice(indice):
+    """Tabla del índice: máquina (con enlace), aprobación y veredicto"""
+    filas = []
+    for item in indice:
+        nombre = html.escape(item['Maquina'])
+        if item['Archivo']:
+            nombre = f'<a href="{quote(item["Archivo"])}">{nombre}</a>'
+        porcentaje = f"{item['Porcentaje']:.1f}%" if item['Porcentaje'] is not None else "—"
+        filas.append(
+            f"<tr><td>{nombre}</td><td>{porcentaje}</td>"
+            f"<td>{html.escape(item['Veredicto'])}</td></tr>"
+        )
+    return (
+        "<h1>Reportes Ejecutivos</h1>\n"
+        "<table border=\"1\" cellpadding=\"6\" style=\"border-collapse:collapse;\">\n"
+        "<tr><th>Máquina</th><th>Aprobación</th><th>Veredicto</th></tr>\n"
+        + "\n".join(filas) + "\n</table>"
+    )
+
+
+def generar_onepages_flota(carpeta, maquinas=None, procesos=None):
+    """One Page de cada máquina activa en ``carpeta``, en paralelo, más index.html.
+
+    Las máquinas sin evaluaciones no generan página y aparecen en el índice
+    como "Sin evaluar". ``procesos`` por defecto es el número de núcleos.
+    Devuelve la lista de entradas del índice.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    from plotly.offline import get_plotlyjs
+
+    from almacenamiento import get_maquinas, leer_payout
+    from analitica import agregados_por_criterio
+
+    if maquinas is None:
+        maquinas = [m['nombre'] for m in get_maquinas("ADMIN")]
+    os.makedirs(carpeta, exist_ok=True)
+    with open(os.path.join(carpeta, ARCHIVO_PLOTLYJS), 'w', encoding='utf-8') as f:
+        f.write(get_plotlyjs())
+
+    agregados = agregados_por_criterio()
+    df_pay = leer_payout()
+    pos_agr = agregados.groupby('Maquina', sort=False).indices
+    pos_pay = df_pay.groupby('Maquina', sort=False).indices
+
+    indice = []
+    tareas = []
+    for maquina in maquinas:
+        agrupado = agregados.iloc[pos_agr.get(maquina, [])]
+        if agrupado.empty:
+            indice.append({'Maquina': maquina, 'Porcentaje': None, 'Veredicto': "Sin evaluar", 'Archivo': None})
+            continue
+        score = float(porcentaje_aprobacion(agrupado['Puntaje_Ponderado'].sum()))
+        archivo = f"{nombre_archivo(maquina)}_onepage.html"
+        indice.append({'Maquina': maquina, 'Porcentaje': score, 'Veredicto': veredicto(score), 'Archivo': archivo})
+        tareas.append((maquina, score, agrupado, df_pay.iloc[pos_pay.get(maquina, [])], carpeta, archivo))
+
+    if tareas:
+        procesos = min(procesos or os.cpu_count() or 1, len(tareas))
+        # spawn: los procesos no heredan hilos ni el estado de Streamlit
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+            list(pool.map(_renderizar_onepage, tareas, chunksize=max(1, len(tareas) // (procesos * 4))))
+
+    with open(os.path.join(carpeta, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(documento_html("Reportes Ejecutivos", _cuerpo_indice(indice)))
+    return indice
+
+
+@cronometrado
+def exportar_onepages_zip(destino, maquinas=None, procesos=None):
+    """ZIP con los One Page de la flota, plotly.min.js e index.html.
+
+    ``destino`` es una ruta o un archivo binario abierto. Devuelve el número
+    de máquinas con One Page.
+    """
+    import tempfile
+    import zipfile
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        indice = generar_onepages_flota(carpeta, maquinas, procesos)
+        with zipfile.ZipFile(destino, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+            for archivo in sorted(os.listdir(carpeta)):
+                zf.write(os.path.join(carpeta, archivo), archivo)
+    return sum(1 for item in indice if item['Archivo'])
+
+
+def nombre_archivo(texto):
+    """Nombre de archivo seguro a partir del nombre de una máquina"""
+    return "".join(c if c.isalnum() or c in " -_#." else "_" for c in texto).strip()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Exportaciones de reportes")
+    sub = parser.add_subparsers(dest='comando', required=True)
+    flota = sub.add_parser('flota', help="Exporta evaluaciones y payout de toda la flota")
+    flota.add_argument('--formato', choices=['excel', 'zip'], default='excel')
+    flota.add_argument('--salida', help="Archivo de salida (por defecto flota.xlsx / flota.zip)")
+    onepages = sub.add_parser('onepages', help="Genera el One Page de cada máquina con un índice")
+    onepages.add_argument('--salida', default='onepages', help="Carpeta de salida (por defecto onepages)")
+    onepages.add_argument('--procesos', type=int, help="Procesos en paralelo (por defecto, núcleos)")
+    args = parser.parse_args()
+
+    if args.comando == 'flota':
+        salida = args.salida or ('flota.xlsx' if args.formato == 'excel' else 'flota.zip')
+        exportar = exportar_flota_excel if args.formato == 'excel' else exportar_flota_zip
+        n = exportar(salida)
+        print(f"✅ {n} máquinas exportadas a {salida}")
+    elif args.comando == 'onepages':
+        indice = generar_onepages_flota(args.salida, procesos=args.procesos)
+        n = sum(1 for item in indice if item['Archivo'])
+        print(f"✅ {n} One Page generados en {os.path.join(args.salida, 'index.html')}")
+
+
+if __name__ == "__main__":
+    main()
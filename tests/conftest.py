@@ -0,0 +1,37 @@
+"""Carpeta de datos temporal para las pruebas que importan los módulos de la app.
+
+almacenamiento fija la carpeta y el backend al importarse, así que se
+configuran aquí, antes de que cualquier prueba lo importe.
+"""
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+CARPETA_DATOS = Path(tempfile.mkdtemp(prefix='qpp_tests_'))
+os.environ['QPP_DATA_DIR'] = str(CARPETA_DATOS)
+os.environ.pop('QPP_BACKEND', None)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def datos():
+    """Carpeta de datos vacía e inicializada (backend CSV) para cada prueba"""
+    import almacenamiento
+
+    for ruta in CARPETA_DATOS.iterdir():
+        if ruta.is_dir():
+            shutil.rmtree(ruta)
+        else:
+            ruta.unlink()
+    almacenamiento.invalidar_cache()
+    almacenamiento._VISTAS.clear()
+    almacenamiento.iniciar_archivos()
+    return CARPETA_DATOS
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(CARPETA_DATOS, ignore_errors=True)
@@ -0,0 +1,67 @@
+"""Índice residente de últimas evaluaciones y agregados por criterio"""
+from almacenamiento import agregar_resultados, eliminar_datos_maquina
+from analitica import agregados_por_criterio, agregados_por_maquina, reconstruir_agregados, ultimas_evaluaciones
+
+
+def _evaluacion(maquina, criterio_id, calificacion, fecha, usuario='Gina'):
+    return {
+        'Maquina': maquina, 'Usuario': usuario, 'Criterio_ID': str(criterio_id),
+        'Criterio': f'C{criterio_id}', 'Peso': 0.5, 'Calificacion': calificacion,
+        'Comentarios': '', 'Fecha': fecha
+    }
+
+
+def _por_criterio(maquina=None):
+    tabla = agregados_por_criterio(maquina)
+    return {
+        (f['Maquina'], f['Criterio']): (f['Puntaje_Ponderado'], f['Promedio'], f['Evaluaciones'], f['Ultima_Fecha'])
+        for f in tabla.to_dict('records')
+    }
+
+
+def test_nueva_evaluacion_reemplaza_a_la_anterior(datos):
+    agregar_resultados([
+        _evaluacion('M1', 1, 1, '2024-01-01 10:00'),
+        _evaluacion('M1', 2, 3, '2024-01-01 10:00'),
+    ])
+    assert _por_criterio()[('M1', 'C1')] == (0.5, 1.0, 1, '2024-01-01 10:00')
+
+    # Llega después de la primera lectura: se aplica de forma incremental
+    agregar_resultados([_evaluacion('M1', 1, 3, '2024-02-01 10:00')])
+
+    assert _por_criterio() == {
+        ('M1', 'C1'): (1.5, 3.0, 2, '2024-02-01 10:00'),
+        ('M1', 'C2'): (1.5, 3.0, 1, '2024-01-01 10:00'),
+    }
+    ultimas = ultimas_evaluaciones('M1')
+    assert sorted(zip(ultimas['Criterio_ID'], ultimas['Calificacion'])) == [('1', 3), ('2', 3)]
+    assert agregados_por_maquina()['Puntaje_Ponderado'].tolist() == [3.0]
+
+
+def test_incremental_coincide_con_reconstruir(datos):
+    agregar_resultados([_evaluacion('M1', 1, 2, '2024-01-01 10:00')])
+    agregados_por_criterio()
+    agregar_resultados([
+        _evaluacion('M1', 1, 1, '2024-01-02 10:00', usuario='Leonel'),
+        _evaluacion('M2', 1, 3, '2024-01-02 10:00'),
+        _evaluacion('M1', 1, 3, '2024-01-03 10:00'),
+    ])
+    incremental = _por_criterio()
+
+    reconstruir_agregados()
+    assert _por_criterio() == incremental
+    # Dos responsables distintos cuentan por separado; el de Gina se reemplazó
+    assert incremental[('M1', 'C1')] == (2.0, 2.0, 3, '2024-01-03 10:00')
+
+
+def test_baja_reconstruye_los_agregados(datos):
+    agregar_resultados([
+        _evaluacion('M1', 1, 3, '2024-01-01 10:00'),
+        _evaluacion('M2', 1, 2, '2024-01-01 10:00'),
+    ])
+    agregados_por_criterio()
+
+    eliminar_datos_maquina('M1')
+
+    assert list(_por_criterio()) == [('M2', 'C1')]
+    assert _por_criterio('M1') == {}
@@ -0,0 +1,124 @@
+"""API HTTP: códigos de respuesta, token y errores internos"""
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+import almacenamiento
+import api
+
+
+@pytest.fixture
+def servidor(datos):
+    """URL base de un servidor de la API en un puerto libre"""
+    srv = api.crear_servidor('127.0.0.1', 0)
+    hilo = threading.Thread(target=srv.serve_forever, daemon=True)
+    hilo.start()
+    yield f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.shutdown()
+    srv.server_close()
+    hilo.join()
+
+
+def _pedir(url, cuerpo=None, token=None):
+    """(estado, JSON de respuesta) de un GET, o de un POST si hay ``cuerpo``"""
+    datos = None if cuerpo is None else (cuerpo if isinstance(cuerpo, bytes) else json.dumps(cuerpo).encode())
+    solicitud = urllib.request.Request(url, data=datos, method='GET' if datos is None else 'POST')
+    if token:
+        solicitud.add_header('Authorization', f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(solicitud) as respuesta:
+            return respuesta.status, json.loads(respuesta.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def _maquina():
+    return almacenamiento.get_maquinas("ADMIN")[0]['nombre']
+
+
+def test_salud(servidor):
+    assert _pedir(f"{servidor}/salud") == (200, {'ok': True, 'backend': 'csv'})
+
+    almacenamiento.ARCHIVO_METAS.unlink()
+    estado, respuesta = _pedir(f"{servidor}/salud")
+    assert estado == 503
+    assert not respuesta['ok'] and 'metas_payout.csv' in respuesta['error']
+
+
+def test_cortes_validos_se_guardan(servidor):
+    estado, respuesta = _pedir(f"{servidor}/cortes", {'cortes': [
+        {'Maquina': _maquina(), 'Semana': 'Semana 1', 'Venta': 1000, 'Payout': 20}
+    ]})
+
+    assert estado == 200
+    assert respuesta == {'importados': 1, 'tareas_cerradas': 0, 'errores': []}
+    assert almacenamiento.leer_payout()['Semana'].tolist() == ['Semana 1']
+
+
+def test_filas_invalidas_responden_422(servidor):
+    registros = [
+        {'Maquina': _maquina(), 'Semana': 'Semana 1', 'Venta': 1000, 'Payout': 20},
+        {'Maquina': _maquina(), 'Semana': 'Semana 2', 'Venta': 1000, 'Payout': 150},
+    ]
+    estado, respuesta = _pedir(f"{servidor}/cortes", registros)
+
+    assert estado == 422
+    assert respuesta['importados'] == 0
+    assert [(e['Indice'], e['Motivo']) for e in respuesta['errores']] == [(1, "payout fuera de 0-100")]
+    assert almacenamiento.leer_payout().empty
+
+    estado, respuesta = _pedir(f"{servidor}/cortes?omitir_invalidos=1", registros)
+    assert (estado, respuesta['importados']) == (200, 1)
+
+
+def test_evaluaciones_con_meta_de_payout(servidor):
+    estado, respuesta = _pedir(f"{servidor}/evaluaciones", {'evaluaciones': [{
+        'Maquina': _maquina(), 'Usuario': 'Gina', 'Criterio_ID': '2', 'Calificacion': 3,
+        'Meta_Min': 15, 'Meta_Max': 25
+    }]})
+
+    assert (estado, respuesta['importados']) == (200, 1)
+    assert almacenamiento.leer_metas_payout()['Meta_Max'].tolist() == [25.0]
+
+
+@pytest.mark.parametrize('cuerpo', [
+    b'{no es json',
+    {'otra_clave': []},
+    {'cortes': {'Maquina': 'M1'}},
+    {'cortes': ['M1']},
+    [],
+    {'cortes': [{'Maquina': 'M1'}]},
+])
+def test_cuerpo_mal_formado_responde_400(servidor, cuerpo):
+    estado, respuesta = _pedir(f"{servidor}/cortes", cuerpo)
+    assert estado == 400
+    assert respuesta['error']
+
+
+def test_ruta_desconocida(servidor):
+    assert _pedir(f"{servidor}/otra", [{}])[0] == 404
+    assert _pedir(f"{servidor}/otra")[0] == 404
+
+
+def test_token(servidor, monkeypatch):
+    monkeypatch.setattr(api, 'TOKEN', 'secreto')
+    corte = [{'Maquina': _maquina(), 'Semana': 'Semana 1', 'Venta': 1000, 'Payout': 20}]
+
+    assert _pedir(f"{servidor}/cortes", corte)[0] == 401
+    assert _pedir(f"{servidor}/cortes", corte, token='otro')[0] == 401
+    assert almacenamiento.leer_payout().empty
+    assert _pedir(f"{servidor}/cortes", corte, token='secreto')[0] == 200
+
+
+def test_error_interno_responde_json_500(servidor, monkeypatch, capsys):
+    def fallar(registros, omitir_invalidos):
+        raise RuntimeError("disco lleno")
+
+    monkeypatch.setitem(api.CARGAS, '/cortes', ('cortes', fallar))
+    estado, respuesta = _pedir(f"{servidor}/cortes", [{'Maquina': 'M1'}])
+
+    assert (estado, respuesta) == (500, {'error': "Error interno del servidor"})
+    assert "disco lleno" in capsys.readouterr().err
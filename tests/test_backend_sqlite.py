@@ -0,0 +1,50 @@
+"""Importación del historial CSV a SQLite"""
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def _correr(carpeta, codigo, backend='csv'):
+    """Corre ``codigo`` en un proceso nuevo: almacenamiento fija la carpeta al importarse"""
+    proceso = subprocess.run(
+        [sys.executable, '-c', textwrap.dedent(codigo)], cwd=RAIZ,
+        capture_output=True, text=True,
+        env={**os.environ, 'QPP_DATA_DIR': str(carpeta), 'QPP_BACKEND': backend}
+    )
+    assert proceso.returncode == 0, proceso.stderr
+    return proceso.stdout
+
+
+def test_importar_omite_maquinas_dadas_de_baja(tmp_path):
+    _correr(tmp_path, """
+        import almacenamiento as a
+        a.iniciar_archivos()
+        for maquina in ('M1', 'M2'):
+            a.agregar_resultados([{
+                'Maquina': maquina, 'Usuario': 'Gina', 'Criterio_ID': '2', 'Criterio': 'Payout',
+                'Peso': 1, 'Calificacion': 3, 'Comentarios': '', 'Fecha': '2024-01-01 10:00'
+            }])
+            a.agregar_payout([{
+                'Maquina': maquina, 'Fecha': '2024-01-08', 'Semana': 'Semana 1',
+                'Venta': 1000.0, 'Payout': 20.0, 'Cambios': ''
+            }])
+            a.agregar_metas_payout([{
+                'Maquina': maquina, 'Meta_Min': 15.0, 'Meta_Max': 25.0,
+                'Usuario': 'Gina', 'Fecha': '2024-01-01 10:00'
+            }])
+        a.eliminar_datos_maquina('M1')
+    """)
+
+    salida = _correr(tmp_path, """
+        import almacenamiento as a, backend_sqlite
+        backend_sqlite.iniciar_db()
+        backend_sqlite.importar_desde_archivos()
+        for leer in (a.leer_resultados, a.leer_payout, a.leer_metas_payout):
+            print(sorted(set(leer()['Maquina'])))
+    """, backend='sqlite')
+
+    assert salida.splitlines() == ["['M2']"] * 3
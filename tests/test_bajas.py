@@ -0,0 +1,123 @@
+"""Bajas de máquinas en CSV (tombstones) y compactación de los historiales"""
+import pytest
+
+import almacenamiento
+from almacenamiento import (
+    ARCHIVO_PAYOUT, ARCHIVO_RESULTADOS, SEMANA_META_RANGO, agregar_metas_payout, agregar_payout,
+    agregar_resultados, cargar_bajas, compactar, compactar_metas_rango, eliminar_datos_maquina,
+    leer_metas_payout, leer_payout, leer_resultados
+)
+
+
+def _evaluacion(maquina, calificacion=3):
+    return {
+        'Maquina': maquina, 'Usuario': 'Gina', 'Criterio_ID': '2', 'Criterio': 'VENTA (Payout)',
+        'Peso': 0.2, 'Calificacion': calificacion, 'Comentarios': '', 'Fecha': '2024-01-01 10:00'
+    }
+
+
+def _corte(maquina, semana, venta=1000.0, payout=20.0):
+    return {
+        'Maquina': maquina, 'Fecha': '2024-01-08', 'Semana': semana,
+        'Venta': venta, 'Payout': payout, 'Cambios': ''
+    }
+
+
+def _cargar(maquina, semana, calificacion=3):
+    agregar_resultados([_evaluacion(maquina, calificacion)])
+    agregar_payout([_corte(maquina, semana)])
+    agregar_metas_payout([{
+        'Maquina': maquina, 'Meta_Min': 15.0, 'Meta_Max': 25.0, 'Usuario': 'Gina', 'Fecha': '2024-01-01 10:00'
+    }])
+
+
+def _filas(leer):
+    df = leer()
+    columna = 'Semana' if 'Semana' in df else 'Calificacion' if 'Calificacion' in df else 'Meta_Min'
+    return list(zip(df['Maquina'], df[columna]))
+
+
+def _lineas(ruta):
+    return len(ruta.read_text(encoding='utf-8-sig').splitlines()) - 1
+
+
+def test_baja_oculta_las_filas_y_la_maquina_recreada_se_ve(datos):
+    _cargar('M1', 'Semana 1', 1)
+    _cargar('M2', 'Semana 1', 2)
+
+    eliminar_datos_maquina('M1')
+    assert _filas(leer_resultados) == [('M2', 2)]
+    assert _filas(leer_payout) == [('M2', 'Semana 1')]
+    assert set(leer_metas_payout()['Maquina']) == {'M2'}
+    assert leer_resultados('M1').empty
+    # No se reescribió nada: las filas siguen en disco
+    assert _lineas(ARCHIVO_RESULTADOS) == 2
+
+    _cargar('M1', 'Semana 2', 3)
+    assert _filas(leer_resultados) == [('M2', 2), ('M1', 3)]
+    assert _filas(leer_payout) == [('M2', 'Semana 1'), ('M1', 'Semana 2')]
+
+
+def test_compactar_elimina_las_filas_ocultas(datos):
+    _cargar('M1', 'Semana 1', 1)
+    _cargar('M2', 'Semana 1', 2)
+    eliminar_datos_maquina('M1')
+    _cargar('M1', 'Semana 2', 3)
+    antes = (_filas(leer_resultados), _filas(leer_payout), _filas(leer_metas_payout))
+
+    assert compactar(forzar=True) == 3
+
+    assert cargar_bajas() == []
+    assert (_lineas(ARCHIVO_RESULTADOS), _lineas(ARCHIVO_PAYOUT)) == (2, 2)
+    assert (_filas(leer_resultados), _filas(leer_payout), _filas(leer_metas_payout)) == antes
+
+    # Las bajas posteriores cuentan con la numeración del archivo compactado
+    eliminar_datos_maquina('M2')
+    _cargar('M3', 'Semana 1')
+    assert _filas(leer_resultados) == [('M1', 3), ('M3', 3)]
+
+
+def test_compactar_interrumpido_deja_los_limites_corregidos(datos, monkeypatch):
+    _cargar('M1', 'Semana 1', 1)
+    _cargar('M2', 'Semana 1', 2)
+    eliminar_datos_maquina('M1')
+    _cargar('M1', 'Semana 2', 3)
+
+    copiar = almacenamiento._copiar_sin_bajas
+
+    def fallar_en_payout(ruta, destino, limites):
+        if ruta == ARCHIVO_PAYOUT:
+            raise OSError("disco lleno")
+        return copiar(ruta, destino, limites)
+
+    monkeypatch.setattr(almacenamiento, '_copiar_sin_bajas', fallar_en_payout)
+    with pytest.raises(OSError):
+        compactar(forzar=True)
+
+    # Resultados ya se compactó y su límite se corrigió; payout conserva el suyo
+    assert _lineas(ARCHIVO_RESULTADOS) == 2
+    assert [(b['filas_resultados'], b['filas_payout']) for b in cargar_bajas()] == [(1, 2)]
+    assert _filas(leer_resultados) == [('M2', 2), ('M1', 3)]
+    assert _filas(leer_payout) == [('M2', 'Semana 1'), ('M1', 'Semana 2')]
+
+    monkeypatch.setattr(almacenamiento, '_copiar_sin_bajas', copiar)
+    assert compactar(forzar=True) == 2
+    assert _filas(leer_payout) == [('M2', 'Semana 1'), ('M1', 'Semana 2')]
+
+
+def test_compactar_metas_rango_corrige_las_bajas_pendientes(datos):
+    agregar_payout([
+        _corte('M1', SEMANA_META_RANGO, 10.0, 30.0),
+        _corte('M1', 'Semana 1'),
+        _corte('M2', SEMANA_META_RANGO, 12.0, 28.0),
+        _corte('M2', 'Semana 1'),
+    ])
+    eliminar_datos_maquina('M1')
+    agregar_payout([_corte('M1', 'Semana 2')])
+
+    assert compactar_metas_rango() == (2, 1)
+
+    assert [b['filas_payout'] for b in cargar_bajas()] == [2]
+    assert _filas(leer_payout) == [('M2', 'Semana 1'), ('M1', 'Semana 2')]
+    # La meta heredada de M1 quedó oculta por la baja: solo migra la de M2
+    assert leer_metas_payout()[['Maquina', 'Meta_Min', 'Meta_Max']].values.tolist() == [['M2', 12.0, 28.0]]
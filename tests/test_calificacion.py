@@ -0,0 +1,56 @@
+"""Lectura de sub-criterios desde Comentarios y recalificación del historial"""
+import pandas as pd
+
+from calificacion import promedios_subitems, recalificar
+
+
+def _comentarios(*textos):
+    return pd.Series(textos)
+
+
+def test_promedio_de_comentarios_normales():
+    promedios = promedios_subitems(_comentarios(
+        "[Limpieza: 8] [Pintura: 10 - impecable] [Cables: NO APLICA] [Luces: 3 - dos fundidas]",
+        "[Limpieza: 9]",
+    ))
+    assert promedios.tolist() == [7.0, 9.0]
+
+
+def test_corchetes_y_dos_puntos_en_nombres_y_comentarios():
+    promedios = promedios_subitems(_comentarios(
+        "[Altura [cm]: 7 - medida: 120] [Garra: 3]",
+        "[Garra: 2 - parece [Luces: 9] pero es texto] [Luces: 4]",
+        "[Garra: 6 - ver [nota]]",
+        "[Garra: NO APLICA] [Luces: 5 - revisar\nsegunda línea]",
+    ))
+    assert promedios.tolist() == [5.0, 3.0, 6.0, 5.0]
+
+
+def test_textos_sin_subitems():
+    promedios = promedios_subitems(_comentarios(
+        "Meta establecida: 20.0%",
+        "[Garra: NO APLICA] (Todos los sub-criterios marcados como NO APLICA)",
+        "calificación manual [sin formato: 9",
+        "",
+    ))
+    assert promedios.isna().all()
+
+
+def test_recalificar_conserva_filas_sin_subitems():
+    df = pd.DataFrame({
+        'Maquina': ['M1'] * 4,
+        'Criterio_ID': ['2', '3', '4', 'MISION'],
+        'Calificacion': [2, 3, 1, 1],
+        'Peso': [0.2, 0.2, 0.1, 0.0],
+        'Comentarios': [
+            "Meta establecida: 20.0%",
+            "[Garra: 4] [Luces: 6]",
+            "[Material [PVC]: 9 - resistente]",
+            "[Garra: 10]",
+        ],
+    })
+
+    resultado = recalificar(df, umbrales=(8, 5), pesos={3: 0.5})
+
+    assert resultado['Calificacion'].tolist() == [2, 2, 3, 1]
+    assert resultado['Peso'].tolist() == [0.2, 0.5, 0.1, 0.0]
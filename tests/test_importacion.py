@@ -0,0 +1,151 @@
+"""Validación e importación masiva de cortes y evaluaciones"""
+import pandas as pd
+import pytest
+
+import almacenamiento
+from almacenamiento import SEMANA_META_RANGO
+from importacion import importar_cortes, importar_evaluaciones, validar_cortes, validar_evaluaciones
+
+MAQUINAS = ['M1', 'M2']
+
+
+def _corte(**campos):
+    return {'Maquina': 'M1', 'Semana': 'Semana 1', 'Venta': 1000, 'Payout': 20, **campos}
+
+
+def _motivos(errores):
+    return dict(zip(errores['Fila'], errores['Motivo']))
+
+
+# ==================== CORTES ====================
+
+def test_validar_cortes_revisa_todas_las_filas():
+    df = pd.DataFrame([
+        _corte(),
+        _corte(Maquina='M9'),
+        _corte(Semana='Semana 2', Venta='mucho'),
+        _corte(Semana='Semana 3', Venta=-1, Payout=120),
+        _corte(Semana='Semana 4', Fecha='no es fecha'),
+    ])
+    validos, errores = validar_cortes(df, MAQUINAS)
+
+    assert list(validos.columns) == almacenamiento.COLUMNAS_PAYOUT
+    assert validos['Semana'].tolist() == ['Semana 1']
+    assert _motivos(errores) == {
+        3: "máquina desconocida o inactiva",
+        4: "venta no numérica",
+        5: "venta negativa; payout fuera de 0-100",
+        6: "fecha no válida",
+    }
+
+
+@pytest.mark.parametrize('semana', ['', '   ', SEMANA_META_RANGO])
+def test_validar_cortes_rechaza_semana_vacia_o_reservada(semana):
+    _, errores = validar_cortes(pd.DataFrame([_corte(Semana=semana)]), MAQUINAS)
+    assert errores['Motivo'].tolist() == ["semana vacía o reservada"]
+
+
+def test_validar_cortes_rechaza_semanas_repetidas():
+    historial = pd.DataFrame([
+        _corte(Semana='Semana 1'),
+        _corte(Maquina='M2', Semana=SEMANA_META_RANGO),
+    ])
+    df = pd.DataFrame([
+        _corte(Semana='Semana 1'),
+        _corte(Semana='Semana 2'),
+        _corte(Semana='Semana 2'),
+        _corte(Maquina='M2', Semana='Semana 1'),
+    ])
+    validos, errores = validar_cortes(df, MAQUINAS, historial)
+
+    assert _motivos(errores) == {2: "semana ya registrada", 4: "semana repetida en el archivo"}
+    assert list(zip(validos['Maquina'], validos['Semana'])) == [('M1', 'Semana 2'), ('M2', 'Semana 1')]
+
+
+def test_validar_cortes_exige_columnas():
+    with pytest.raises(ValueError, match="Payout"):
+        validar_cortes(pd.DataFrame([{'Maquina': 'M1', 'Semana': 'S1', 'Venta': 1}]), MAQUINAS)
+
+
+def test_importar_cortes_es_todo_o_nada(datos):
+    maquina = almacenamiento.get_maquinas("ADMIN")[0]['nombre']
+    df = pd.DataFrame([_corte(Maquina=maquina), _corte(Maquina=maquina, Semana='')])
+
+    importados, errores, _ = importar_cortes(df)
+    assert (importados, len(errores)) == (0, 1)
+    assert almacenamiento.leer_payout().empty
+
+    importados, errores, _ = importar_cortes(df, omitir_invalidos=True)
+    assert (importados, len(errores)) == (1, 1)
+    assert almacenamiento.leer_payout()['Semana'].tolist() == ['Semana 1']
+
+    importados, errores, _ = importar_cortes(df.iloc[:1])
+    assert importados == 0
+    assert errores['Motivo'].tolist() == ["semana ya registrada"]
+
+
+def test_importar_cortes_cierra_tareas_de_corte(datos):
+    maquina = almacenamiento.get_maquinas("ADMIN")[0]['nombre']
+    almacenamiento.agregar_tarea({
+        'id': 't1', 'tipo': 'CORTE', 'maquina': maquina, 'titulo': 'Semana 1', 'completada': False
+    })
+
+    _, _, cerradas = importar_cortes(pd.DataFrame([_corte(Maquina=maquina)]))
+
+    assert cerradas == ['t1']
+    assert almacenamiento.cargar_tareas()[0]['completada']
+
+
+# ==================== EVALUACIONES ====================
+
+def _evaluacion(**campos):
+    return {'Maquina': 'M1', 'Usuario': 'Gina', 'Criterio_ID': '2', 'Calificacion': 3, **campos}
+
+
+def test_validar_evaluaciones_completa_y_normaliza():
+    validos, errores = validar_evaluaciones(
+        pd.DataFrame([_evaluacion(Fecha='2024-03-05'), _evaluacion(Fecha='2024-03-05T14:30:00')]), MAQUINAS
+    )
+
+    assert errores.empty
+    assert validos['Criterio'].tolist() == ['VENTA (Payout)'] * 2
+    assert validos['Peso'].tolist() == [0.2, 0.2]
+    assert validos['Fecha'].tolist() == ['2024-03-05 00:00', '2024-03-05 14:30']
+
+
+def test_validar_evaluaciones_rechaza_filas_invalidas():
+    df = pd.DataFrame([
+        _evaluacion(),
+        _evaluacion(Criterio_ID='99'),
+        _evaluacion(Usuario='Leonel'),
+        _evaluacion(Calificacion=5),
+        _evaluacion(Fecha='ayer por la tarde'),
+        _evaluacion(Meta_Min=25, Meta_Max=15),
+        _evaluacion(Criterio_ID='1', Usuario='Leonel', Meta_Min=15, Meta_Max=25),
+    ])
+    validos, errores = validar_evaluaciones(df, MAQUINAS)
+
+    assert len(validos) == 1
+    assert _motivos(errores) == {
+        3: "criterio desconocido",
+        4: "el usuario no es responsable del criterio",
+        5: "calificación fuera de 1/2/3",
+        6: "fecha no válida",
+        7: "Meta_Min mayor que Meta_Max",
+        8: "la meta de payout solo va con el criterio 2",
+    }
+
+
+def test_importar_evaluaciones_registra_metas_de_payout(datos):
+    maquina = almacenamiento.get_maquinas("ADMIN")[0]['nombre']
+    df = pd.DataFrame([
+        _evaluacion(Maquina=maquina, Meta_Min=15, Meta_Max=25),
+        _evaluacion(Maquina=maquina, Criterio_ID='5'),
+    ])
+
+    importadas, errores = importar_evaluaciones(df)
+
+    assert (importadas, len(errores)) == (2, 0)
+    assert len(almacenamiento.leer_resultados()) == 2
+    metas = almacenamiento.leer_metas_payout()
+    assert metas[['Maquina', 'Meta_Min', 'Meta_Max']].values.tolist() == [[maquina, 15.0, 25.0]]
@@ -0,0 +1,91 @@
+"""Lector incremental de los historiales CSV (solo lee lo anexado)"""
+import almacenamiento
+from almacenamiento import ARCHIVO_RESULTADOS, agregar_resultados, leer_resultados, resultados_desde
+
+
+def _evaluacion(maquina='M1', calificacion=3, comentarios=''):
+    return {
+        'Maquina': maquina, 'Usuario': 'Gina', 'Criterio_ID': '2', 'Criterio': 'VENTA (Payout)',
+        'Peso': 0.2, 'Calificacion': calificacion, 'Comentarios': comentarios, 'Fecha': '2024-01-01 10:00'
+    }
+
+
+def _generacion():
+    return almacenamiento._LECTORES[ARCHIVO_RESULTADOS]['generacion']
+
+
+def test_anexar_lee_solo_lo_nuevo(datos):
+    agregar_resultados([_evaluacion('M1')])
+    df, cursor, completo = resultados_desde()
+    assert completo and df['Maquina'].tolist() == ['M1']
+    generacion = _generacion()
+
+    agregar_resultados([_evaluacion('M2'), _evaluacion('M3')])
+    df, cursor, completo = resultados_desde(cursor)
+
+    assert not completo
+    assert df['Maquina'].tolist() == ['M2', 'M3']
+    assert _generacion() == generacion
+    assert leer_resultados()['Maquina'].tolist() == ['M1', 'M2', 'M3']
+
+    df, _, completo = resultados_desde(cursor)
+    assert not completo and df.empty
+
+
+def test_archivo_truncado_se_recarga_completo(datos):
+    agregar_resultados([_evaluacion('M1'), _evaluacion('M2')])
+    _, cursor, _ = resultados_desde()
+    generacion = _generacion()
+
+    with open(ARCHIVO_RESULTADOS, 'rb') as f:
+        lineas = f.read().splitlines(keepends=True)
+    with open(ARCHIVO_RESULTADOS, 'wb') as f:
+        f.writelines(lineas[:2])
+
+    df, _, completo = resultados_desde(cursor)
+    assert completo
+    assert df['Maquina'].tolist() == ['M1']
+    assert _generacion() != generacion
+
+
+def test_archivo_reescrito_se_recarga_completo(datos):
+    agregar_resultados([_evaluacion('M1')])
+    _, cursor, _ = resultados_desde()
+
+    # Mismo inodo y más largo, pero con otros bytes antes del offset leído
+    contenido = ARCHIVO_RESULTADOS.read_bytes()
+    with open(ARCHIVO_RESULTADOS, 'r+b') as f:
+        f.write(contenido.replace(b'M1,', b'M9,') + contenido.splitlines(keepends=True)[-1])
+
+    df, _, completo = resultados_desde(cursor)
+    assert completo
+    assert df['Maquina'].tolist() == ['M9', 'M1']
+
+
+def test_comentario_entre_comillas_con_saltos_de_linea(datos):
+    agregar_resultados([_evaluacion('M1')])
+    resultados_desde()
+
+    comentario = '[Rango: 3 - dice "bien",\nsigue]\n\n[Otro: 2]'
+    agregar_resultados([_evaluacion('M2', comentarios=comentario), _evaluacion('M3')])
+
+    df = leer_resultados()
+    assert df['Maquina'].tolist() == ['M1', 'M2', 'M3']
+    assert df['Comentarios'].iloc[1] == comentario
+
+
+def test_fila_a_medio_escribir_espera_a_estar_completa(datos):
+    agregar_resultados([_evaluacion('M1')])
+    resultados_desde()
+
+    fila = b'M2,Gina,2,VENTA (Payout),0.2,3,"linea 1\nlinea 2",2024-01-01 10:00\n'
+    corte = fila.index(b'\n') + 1
+    with open(ARCHIVO_RESULTADOS, 'ab') as f:
+        f.write(fila[:corte])
+    assert leer_resultados()['Maquina'].tolist() == ['M1']
+
+    with open(ARCHIVO_RESULTADOS, 'ab') as f:
+        f.write(fila[corte:])
+    df = leer_resultados()
+    assert df['Maquina'].tolist() == ['M1', 'M2']
+    assert df['Comentarios'].iloc[1] == 'linea 1\nlinea 2'
@@ -0,0 +1,61 @@
+"""Reducción de series largas (LTTB) para las gráficas"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from reportes import (
+    MAX_PUNTOS_GRAFICA, UMBRAL_WEBGL, figura_historico_payout, indices_lttb, reducir_serie,
+    traza_dispersion
+)
+
+
+def _serie(n):
+    return np.sin(np.arange(n) / 7.0) * 10 + 20
+
+
+def test_lttb_conserva_extremos_y_largo():
+    y = _serie(5000)
+    posiciones = indices_lttb(y, MAX_PUNTOS_GRAFICA)
+
+    assert len(posiciones) == MAX_PUNTOS_GRAFICA
+    assert posiciones[0] == 0 and posiciones[-1] == len(y) - 1
+    assert np.all(np.diff(posiciones) > 0)
+
+
+def test_lttb_conserva_un_pico_aislado():
+    y = np.full(5000, 20.0)
+    y[2777] = 95.0
+    assert 2777 in reducir_serie(y, MAX_PUNTOS_GRAFICA)
+
+
+def test_series_cortas_pasan_completas():
+    for n in (0, 1, 10, MAX_PUNTOS_GRAFICA):
+        assert reducir_serie(_serie(n), MAX_PUNTOS_GRAFICA).tolist() == list(range(n))
+    assert reducir_serie(_serie(5000), None).tolist() == list(range(5000))
+
+
+def test_reducir_serie_agrega_los_puntos_a_conservar():
+    y = _serie(5000)
+    conservar = np.zeros(len(y), dtype=bool)
+    conservar[[11, 4321]] = True
+
+    posiciones = reducir_serie(y, MAX_PUNTOS_GRAFICA, conservar)
+
+    assert {11, 4321} <= set(posiciones)
+    assert np.all(np.diff(posiciones) > 0)
+
+
+def test_traza_webgl_solo_para_series_grandes():
+    assert traza_dispersion(UMBRAL_WEBGL) is go.Scatter
+    assert traza_dispersion(UMBRAL_WEBGL + 1) is go.Scattergl
+
+
+def test_figura_historico_payout():
+    n = 3000
+    df = pd.DataFrame({'Fecha': pd.date_range('2020-01-01', periods=n).astype(str), 'Payout': _serie(n)})
+
+    reducida = figura_historico_payout(df).data[0]
+    assert isinstance(reducida, go.Scatter) and len(reducida.y) == MAX_PUNTOS_GRAFICA
+
+    completa = figura_historico_payout(df, max_puntos=0).data[0]
+    assert isinstance(completa, go.Scattergl) and len(completa.y) == n